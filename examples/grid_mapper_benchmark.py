@@ -0,0 +1,58 @@
+#   Copyright 2021 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+# pylint: skip-file
+
+"""Benchmark of the compile time and the depth of the swaps of the GridMapper on square grids."""
+
+import random
+import sys
+import time
+
+from projectq import MainEngine
+from projectq.cengines import DummyEngine, GridMapper
+from projectq.ops import CNOT, All, H, Measure
+
+
+def build_circuit(eng, num_qubits, num_gates):
+    """Build a random circuit of CNOT and Hadamard gates."""
+    qureg = eng.allocate_qureg(num_qubits)
+    for _ in range(num_gates):
+        qubit0, qubit1 = random.sample(range(num_qubits), 2)
+        CNOT | (qureg[qubit0], qureg[qubit1])
+        H | qureg[qubit0]
+    All(Measure) | qureg
+
+
+def run_benchmark(num_rows, num_gates):
+    """Return the compile time, the number of mappings and the total depth and number of swaps."""
+    random.seed(1)
+    mapper = GridMapper(num_rows=num_rows, num_columns=num_rows)
+    eng = MainEngine(DummyEngine(), [mapper])
+    start = time.perf_counter()
+    build_circuit(eng, num_rows * num_rows, num_gates)
+    eng.flush()
+    duration = time.perf_counter() - start
+    depth = sum(depth * count for depth, count in mapper.depth_of_swaps.items())
+    num_swaps = sum(num * count for num, count in mapper.num_of_swaps_per_mapping.items())
+    return duration, mapper.num_mappings, depth, num_swaps
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [4, 5, 10, 20]
+    for num_rows in sizes:
+        duration, num_mappings, depth, num_swaps = run_benchmark(num_rows, 5 * num_rows * num_rows)
+        print(
+            f"{num_rows:2d}x{num_rows:<2d} grid  compile time: {duration:7.3f} s  mappings: {num_mappings:4d}  "
+            f"swap depth: {depth:6d}  swaps: {num_swaps:7d}"
+        )
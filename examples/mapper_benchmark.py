@@ -0,0 +1,68 @@
+#   Copyright 2021 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+# pylint: skip-file
+
+"""Benchmark of the compile time and the number of swaps of the LinearMapper on long chains."""
+
+import random
+import time
+
+from projectq import MainEngine
+from projectq.cengines import DummyEngine, LinearMapper
+from projectq.ops import CNOT, All, H, Measure, Rz
+
+
+def build_circuit(eng, num_qubits, circuit):
+    """Build a random, a nearest-neighbour-like or a QFT-like circuit of CNOT and single-qubit gates."""
+    qureg = eng.allocate_qureg(num_qubits)
+    if circuit == 'random':
+        for _ in range(20 * num_qubits):
+            qubit0, qubit1 = random.sample(range(num_qubits), 2)
+            CNOT | (qureg[qubit0], qureg[qubit1])
+            H | qureg[qubit0]
+    elif circuit == 'local':
+        for _ in range(20 * num_qubits):
+            qubit0 = random.randrange(num_qubits - 3)
+            CNOT | (qureg[qubit0], qureg[qubit0 + random.randint(1, 3)])
+    else:
+        for i in range(num_qubits):
+            H | qureg[i]
+            for j in range(i + 1, num_qubits):
+                CNOT | (qureg[j], qureg[i])
+                Rz(0.1) | qureg[i]
+                CNOT | (qureg[j], qureg[i])
+    All(Measure) | qureg
+
+
+def run_benchmark(mapper, num_qubits, circuit):
+    """Return the compile time and the total number of swaps when mapping the circuit."""
+    random.seed(1)
+    eng = MainEngine(DummyEngine(), [mapper])
+    start = time.perf_counter()
+    build_circuit(eng, num_qubits, circuit)
+    eng.flush()
+    num_swaps = sum(num * count for num, count in mapper.num_of_swaps_per_mapping.items())
+    return time.perf_counter() - start, num_swaps
+
+
+if __name__ == "__main__":
+    for num_qubits in (50, 100):
+        for circuit in ('random', 'local', 'qft'):
+            for minimize_swaps in (False, True):
+                mapper = LinearMapper(num_qubits=num_qubits, minimize_swaps=minimize_swaps)
+                duration, num_swaps = run_benchmark(mapper, num_qubits, circuit)
+                print(
+                    f"{num_qubits:4d} qubits  {circuit:7s} minimize_swaps={minimize_swaps!s:5s}  "
+                    f"compile time: {duration:7.3f} s  swaps: {num_swaps:7d}"
+                )
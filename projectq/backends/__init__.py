@@ -17,6 +17,7 @@ Contains back-ends for ProjectQ.
 This includes:
 
 * a debugging tool to print all received commands (CommandPrinter)
+* a recorder writing all received commands to a binary file which can be replayed later on (CommandRecorder)
 * a circuit drawing engine (which can be used anywhere within the compilation
   chain)
 * a simulator with emulation capabilities
@@ -28,6 +29,7 @@ This includes:
 * an interface to the Azure Quantum service devices (and simulators)
 * an interface to the IonQ trapped ionq hardware (and simulator).
 """
+
 from ._aqt import AQTBackend
 from ._awsbraket import AWSBraketBackend
 from ._azure import AzureQuantumBackend
@@ -36,6 +38,7 @@ from ._exceptions import DeviceNotHandledError, DeviceOfflineError, DeviceTooSma
 from ._ibm import IBMBackend
 from ._ionq import IonQBackend
 from ._printer import CommandPrinter
+from ._recorder import CommandRecorder, replay_commands
 from ._resource import ResourceCounter
 from ._sim import ClassicalSimulator, Simulator
 from ._unitary import UnitarySimulator
@@ -0,0 +1,340 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Contains a compiler engine which records commands to a binary file and a function replaying such recordings.
+
+The binary format starts with a header (_MAGIC), followed by a stream of records. Each record starts with a varint
+code: codes below _FIRST_OPCODE define a new entry of the opcode table (a pickled gate or, for rotation and phase
+gates, a pickled gate class) or of the tag table (a pickled tag), all other codes are commands using opcode
+code - _FIRST_OPCODE. A command record consists of the angle of the gate (a little-endian double, only for rotation
+and phase gates), the number of quantum registers followed by their sizes and qubit ids, the number of control qubits
+followed by their ids and the control state (as a bit mask), and the number of tags followed by their indices in the
+tag table. Qubit ids are stored as varints of qubit.id + 1.
+"""
+
+import mmap
+import pickle
+import struct
+
+from projectq.cengines import BasicEngine, LastEngineException
+from projectq.ops import BasicPhaseGate, BasicRotationGate, Command, CtrlAll, FlushGate
+from projectq.ops._basics import _has_value_equality
+from projectq.types import WeakQubitRef
+
+_MAGIC = b'PQCR\x01'
+_GATE = 0
+_PARAMETRIZED_GATE = 1
+_TAG = 2
+_FIRST_OPCODE = 3
+_ANGLE = struct.Struct('<d')
+
+
+def _write_varint(buffer, value):
+    """Append an unsigned integer to the buffer using a variable-length encoding (7 bits per byte)."""
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data, pos):
+    """Return the unsigned integer starting at position pos of data and the position after it."""
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+class CommandEncoder:  # pylint: disable=too-few-public-methods
+    """
+    Encoder of commands in the binary format of the CommandRecorder.
+
+    The encoder keeps track of the gates and tags which have already been defined in the encoded stream, so a single
+    encoder has to be used for all the commands of a stream (which starts with _MAGIC).
+    """
+
+    def __init__(self):
+        """Initialize a CommandEncoder with empty opcode and tag tables."""
+        self._opcodes = {}
+        self._tags = {}
+
+    def _get_opcode(self, buffer, gate):
+        """
+        Return the opcode of the gate, appending its definition to the buffer if it is new.
+
+        Gates are identified by their class for rotation and phase gates (whose angle is part of the command record),
+        by gate equality for gates for which it implies that they are the same operation (see _has_value_equality)
+        and by their pickled representation otherwise.
+        """
+        parametrized = isinstance(gate, (BasicRotationGate, BasicPhaseGate))
+        if parametrized:
+            key = type(gate)
+        elif _has_value_equality(gate):
+            key = (type(gate), gate)
+        else:
+            key = pickle.dumps(gate)
+        try:
+            return self._opcodes[key]
+        except TypeError:
+            key = pickle.dumps(gate)
+            if key in self._opcodes:
+                return self._opcodes[key]
+        except KeyError:
+            pass
+        data = pickle.dumps(type(gate) if parametrized else gate)
+        _write_varint(buffer, _PARAMETRIZED_GATE if parametrized else _GATE)
+        _write_varint(buffer, len(data))
+        buffer += data
+        opcode = len(self._opcodes)
+        self._opcodes[key] = opcode
+        return opcode
+
+    def _get_tag_index(self, buffer, tag):
+        """Return the index of the tag in the tag table, appending its definition to the buffer if it is new."""
+        data = pickle.dumps(tag)
+        if data not in self._tags:
+            _write_varint(buffer, _TAG)
+            _write_varint(buffer, len(data))
+            buffer += data
+            self._tags[data] = len(self._tags)
+        return self._tags[data]
+
+    def encode(self, buffer, cmd):
+        """
+        Append the record of a command to the buffer.
+
+        Args:
+            buffer (bytearray): Buffer to append the record (and the definitions of new gates and tags) to.
+            cmd (Command): Command to encode.
+        """
+        gate = cmd.gate
+        opcode = self._get_opcode(buffer, gate)
+        tag_indices = [self._get_tag_index(buffer, tag) for tag in cmd.tags]
+        _write_varint(buffer, opcode + _FIRST_OPCODE)
+        if isinstance(gate, (BasicRotationGate, BasicPhaseGate)):
+            buffer += _ANGLE.pack(gate.angle)
+        _write_varint(buffer, len(cmd.qubits))
+        for qureg in cmd.qubits:
+            _write_varint(buffer, len(qureg))
+            for qubit in qureg:
+                _write_varint(buffer, qubit.id + 1)
+        control_qubits = cmd.control_qubits
+        _write_varint(buffer, len(control_qubits))
+        if control_qubits:
+            for qubit in control_qubits:
+                _write_varint(buffer, qubit.id + 1)
+            _write_varint(buffer, int(cmd.control_state[::-1], 2))
+        _write_varint(buffer, len(tag_indices))
+        for index in tag_indices:
+            _write_varint(buffer, index)
+
+
+def encode_commands(command_list):
+    """
+    Return the binary representation of a list of commands (including the header).
+
+    Args:
+        command_list (list<Command>): Commands to encode.
+    """
+    buffer = bytearray(_MAGIC)
+    encoder = CommandEncoder()
+    for cmd in command_list:
+        encoder.encode(buffer, cmd)
+    return bytes(buffer)
+
+
+class CommandRecorder(BasicEngine):
+    """
+    Compiler engine which records all commands to a binary file.
+
+    The CommandRecorder writes the commands it receives to a compact binary file prior to sending them on to the next
+    engine (if any). Placed at the end of the compiler engine list, it records the compiled circuit, which can then be
+    executed again (e.g., on a different machine) using replay_commands() without re-running the user code and the
+    compiler engines.
+
+    Gates and tags are stored using pickle and must therefore be picklable. Measurement results are not recorded, and
+    a CommandRecorder used as the last engine does not provide any measurement results.
+
+    Example:
+        .. code-block:: python
+
+            eng = MainEngine(CommandRecorder('circuit.pqc'), engine_list)
+            ...
+            eng.flush()
+            eng.backend.close()
+
+            sim_eng = MainEngine(Simulator(), [])
+            replay_commands('circuit.pqc', sim_eng.backend)
+    """
+
+    def __init__(self, filename):
+        """
+        Initialize a CommandRecorder.
+
+        Args:
+            filename (str): Name of the file to write the commands to (existing files are overwritten).
+        """
+        super().__init__()
+        self._file = open(filename, 'wb', buffering=1 << 20)  # pylint: disable=consider-using-with
+        self._file.write(_MAGIC)
+        self._encoder = CommandEncoder()
+
+    def is_available(self, cmd):
+        """
+        Test whether a Command is supported by a compiler engine.
+
+        Returns True if the CommandRecorder is the last engine (since it can record any command).
+
+        Args:
+            cmd (Command): Command of which to check availability.
+        Returns:
+            availability (bool): True, unless the next engine cannot handle the Command (if there is a next engine).
+        """
+        try:
+            return BasicEngine.is_available(self, cmd)
+        except LastEngineException:
+            return True
+
+    def close(self):
+        """Write all buffered data and close the file (commands received afterwards are no longer recorded)."""
+        if not self._file.closed:
+            self._file.close()
+
+    def receive(self, command_list):
+        """
+        Receive a list of commands.
+
+        Receive a list of commands from the previous engine, record them, and then send them on to the next engine (if
+        any). The file buffer is written to disk whenever a FlushGate is received.
+
+        Args:
+            command_list (list<Command>): List of Commands to record.
+        """
+        if not self._file.closed:
+            buffer = bytearray()
+            flush = False
+            for cmd in command_list:
+                self._encoder.encode(buffer, cmd)
+                flush = flush or isinstance(cmd.gate, FlushGate)
+            self._file.write(buffer)
+            if flush:
+                self._file.flush()
+        if not self.is_last_engine:
+            self.send(command_list)
+
+
+def _read_qubits(data, pos, owner):
+    """Return the list of qubits (preceded by their number) starting at position pos and the position after it."""
+    num_qubits, pos = _read_varint(data, pos)
+    qubits = []
+    for _ in range(num_qubits):
+        qubit_id, pos = _read_varint(data, pos)
+        qubits.append(WeakQubitRef(owner, qubit_id - 1))
+    return qubits, pos
+
+
+def decode_commands(data, owner):  # pylint: disable=too-many-locals
+    """
+    Decode commands in the binary format of the CommandRecorder.
+
+    Args:
+        data (bytes|mmap.mmap): Binary representation of the commands (including the header).
+        owner (BasicEngine): Engine owning the decoded commands.
+
+    Yields:
+        The decoded commands.
+
+    Raises:
+        ValueError: If the data does not start with the header of the binary format.
+    """
+    if data[: len(_MAGIC)] != _MAGIC:
+        raise ValueError("The data is not in the binary format of the CommandRecorder.")
+    opcodes = []
+    tags = []
+    pos = len(_MAGIC)
+    while pos < len(data):
+        code, pos = _read_varint(data, pos)
+        if code < _FIRST_OPCODE:
+            length, pos = _read_varint(data, pos)
+            item = pickle.loads(data[pos : pos + length])  # noqa: E203
+            pos += length
+            if code == _TAG:
+                tags.append(item)
+            else:
+                opcodes.append((code == _PARAMETRIZED_GATE, item))
+            continue
+        parametrized, gate = opcodes[code - _FIRST_OPCODE]
+        if parametrized:
+            gate = gate(_ANGLE.unpack_from(data, pos)[0])
+            pos += _ANGLE.size
+        num_quregs, pos = _read_varint(data, pos)
+        qubits = []
+        for _ in range(num_quregs):
+            qureg, pos = _read_qubits(data, pos, owner)
+            qubits.append(qureg)
+        controls, pos = _read_qubits(data, pos, owner)
+        control_state = CtrlAll.One
+        if controls:
+            state, pos = _read_varint(data, pos)
+            control_state = format(state, f'0{len(controls)}b')[::-1]
+        num_tags, pos = _read_varint(data, pos)
+        cmd_tags = []
+        for _ in range(num_tags):
+            index, pos = _read_varint(data, pos)
+            cmd_tags.append(tags[index])
+        yield Command(owner, gate, tuple(qubits), controls, cmd_tags, control_state)
+
+
+def replay_commands(filename, engine, batch_size=1024):
+    """
+    Replay the commands recorded by a CommandRecorder.
+
+    The commands are sent directly to the given engine (e.g., the backend of a MainEngine) in lists of batch_size
+    commands. Measurement results are registered with the MainEngine of the engine, and can be accessed using, e.g.,
+    ``eng.get_measurement_result(WeakQubitRef(eng, qubit_id))``.
+
+    Note:
+        The gates and tags of a recording are unpickled, so only replay files from trusted sources.
+
+    Args:
+        filename (str): Name of the file written by the CommandRecorder.
+        engine (BasicEngine): Engine to send the commands to.
+        batch_size (int): Maximal number of commands sent to the engine at once.
+
+    Returns:
+        Number of commands replayed.
+
+    Raises:
+        ValueError: If the file is not a recording of a CommandRecorder.
+    """
+    owner = engine.main_engine if engine.main_engine is not None else engine
+    batch = []
+    num_commands = 0
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for cmd in decode_commands(data, owner):
+            batch.append(cmd)
+            if len(batch) >= batch_size:
+                engine.receive(batch)
+                num_commands += len(batch)
+                batch = []
+    if batch:
+        engine.receive(batch)
+        num_commands += len(batch)
+    return num_commands
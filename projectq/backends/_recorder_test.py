@@ -0,0 +1,152 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Tests for projectq.backends._recorder.py.
+"""
+
+import numpy
+import pytest
+
+from projectq import MainEngine
+from projectq.backends import CommandRecorder, Simulator, replay_commands
+from projectq.backends._recorder import decode_commands, encode_commands
+from projectq.cengines import DummyEngine
+from projectq.meta import Compute, Control, LogicalQubitIDTag, Uncompute
+from projectq.ops import (
+    CNOT,
+    All,
+    BasicGate,
+    Command,
+    H,
+    MatrixGate,
+    Measure,
+    Ph,
+    Rx,
+    Rzz,
+    X,
+)
+from projectq.types import WeakQubitRef
+
+
+class ParamGate(BasicGate):
+    """Gate with a parameter, which only compares (and hashes) equal to other ParamGates by class."""
+
+    def __init__(self, param):
+        super().__init__()
+        self.param = param
+
+    def __str__(self):
+        return 'ParamGate'
+
+
+def test_command_recorder_is_available(tmpdir):
+    recorder = CommandRecorder(str(tmpdir.join('circuit.pqc')))
+    backend = DummyEngine()
+    backend.is_available = lambda cmd: cmd.gate == H
+    eng = MainEngine(backend, [recorder])
+    qubit = eng.allocate_qubit()
+    assert recorder.is_available(Command(eng, H, (qubit,)))
+    assert not recorder.is_available(Command(eng, X, (qubit,)))
+
+    last_recorder = CommandRecorder(str(tmpdir.join('circuit2.pqc')))
+    eng = MainEngine(last_recorder, [])
+    qubit = eng.allocate_qubit()
+    assert last_recorder.is_available(Command(eng, X, (qubit,)))
+    recorder.close()
+    last_recorder.close()
+
+
+def test_command_recorder_replay(tmpdir):
+    filename = str(tmpdir.join('circuit.pqc'))
+    recorder = CommandRecorder(filename)
+    saving_backend = DummyEngine(save_commands=True)
+    eng = MainEngine(saving_backend, [recorder])
+    qureg = eng.allocate_qureg(3) + [WeakQubitRef(eng, 300)]
+    with Compute(eng):
+        H | qureg[0]
+    with Control(eng, qureg[:2], ctrl_state='01'):
+        Rx(0.5) | qureg[2]
+        Rx(1.5) | qureg[3]
+    Rzz(0.25) | (qureg[1], qureg[2])
+    Ph(0.1) | qureg[0]
+    MatrixGate(numpy.array([[0, 1], [1, 0]])) | qureg[1]
+    CNOT | (qureg[3], qureg[0])
+    Uncompute(eng)
+    eng.receive([Command(eng, Measure, ([qureg[3]],), tags=[LogicalQubitIDTag(2)])])
+    eng.flush()
+    recorder.close()
+    # commands received after closing the file are no longer recorded
+    X | qureg[0]
+    recorded_commands = saving_backend.received_commands[:-1]
+
+    replay_backend = DummyEngine(save_commands=True)
+    MainEngine(replay_backend, [])
+    assert replay_commands(filename, replay_backend, batch_size=3) == len(recorded_commands)
+    replayed_commands = replay_backend.received_commands
+    assert len(replayed_commands) == len(recorded_commands)
+    for replayed, recorded in zip(replayed_commands, recorded_commands):
+        assert str(replayed) == str(recorded)
+        assert replayed.gate == recorded.gate
+        assert replayed.tags == recorded.tags
+        assert replayed.control_state == recorded.control_state
+        assert replayed.engine is replay_backend.main_engine
+
+
+def test_command_recorder_replay_simulator(tmpdir):
+    filename = str(tmpdir.join('circuit.pqc'))
+    sim = Simulator()
+    recorder = CommandRecorder(filename)
+    eng = MainEngine(sim, [recorder])
+    qureg = eng.allocate_qureg(2)
+    H | qureg[0]
+    CNOT | (qureg[0], qureg[1])
+    X | qureg[1]
+    eng.flush()
+    recorder.close()
+
+    replay_eng = MainEngine(Simulator(), [])
+    replay_commands(filename, replay_eng.backend)
+    assert replay_eng.backend.cheat()[0] == sim.cheat()[0]
+    assert numpy.allclose(replay_eng.backend.cheat()[1], sim.cheat()[1])
+    All(Measure) | qureg
+
+    # measurement results are registered with the MainEngine of the replaying engine
+    filename = str(tmpdir.join('measurement.pqc'))
+    recorder = CommandRecorder(filename)
+    eng = MainEngine(Simulator(), [recorder])
+    qureg = eng.allocate_qureg(2)
+    X | qureg[1]
+    All(Measure) | qureg
+    eng.flush()
+    recorder.close()
+
+    replay_eng = MainEngine(Simulator(), [])
+    replay_commands(filename, replay_eng.backend)
+    assert [replay_eng.get_measurement_result(WeakQubitRef(replay_eng, qb.id)) for qb in qureg] == [False, True]
+
+
+def test_encode_commands_gates_without_value_equality():
+    eng = MainEngine(DummyEngine(), [])
+    qubit = eng.allocate_qubit()
+    commands = [Command(eng, ParamGate(param), (qubit,)) for param in (1, 2, 1)]
+    decoded = list(decode_commands(encode_commands(commands), eng.backend))
+    assert [cmd.gate.param for cmd in decoded] == [1, 2, 1]
+
+
+def test_replay_commands_invalid_file(tmpdir):
+    filename = str(tmpdir.join('circuit.txt'))
+    with open(filename, 'w') as file:
+        file.write('H | Qureg[0]')
+    with pytest.raises(ValueError):
+        replay_commands(filename, DummyEngine())
@@ -14,25 +14,73 @@
 
 """A simulator that only permits classical operations, for faster/easier testing."""
 
+import numpy as np
+
 from projectq.cengines import BasicEngine
 from projectq.meta import LogicalQubitIDTag
-from projectq.ops import Allocate, BasicMathGate, Deallocate, FlushGate, Measure, XGate
+from projectq.ops import (
+    Allocate,
+    BasicMathGate,
+    Deallocate,
+    FlushGate,
+    Measure,
+    SwapGate,
+    XGate,
+)
 from projectq.types import WeakQubitRef
 
+_WORD_SIZE = 64
+_LANE_SHIFTS = np.arange(_WORD_SIZE, dtype=np.uint64)
+
+
+def _pack_lanes(bits):
+    """
+    Pack an array of bits (one per lane) into an array of 64-bit words.
+
+    Args:
+        bits (np.ndarray): Array of 0/1 values whose length is a multiple of 64.
+
+    Returns:
+        np.ndarray: Array of np.uint64 where bit j of word w holds the value of lane 64 * w + j.
+    """
+    bits = bits.astype(np.uint64).reshape(-1, _WORD_SIZE)
+    return np.bitwise_or.reduce(bits << _LANE_SHIFTS, axis=1)
+
+
+def _unpack_lanes(words):
+    """
+    Unpack an array of 64-bit words into an array of bits (one per lane).
+
+    Inverse of :func:`_pack_lanes`.
+    """
+    return ((words[:, np.newaxis] >> _LANE_SHIFTS) & np.uint64(1)).reshape(-1)
+
 
 class ClassicalSimulator(BasicEngine):
     """
     A simple introspective simulator that only permits classical operations.
 
-    Allows allocation, deallocation, measuring (no-op), flushing (no-op), controls, NOTs, and any
+    Allows allocation, deallocation, measuring (no-op), flushing (no-op), controls, NOTs, Swaps and any
     BasicMathGate. Supports reading/writing directly from/to bits and registers of bits.
+
+    If circuit recording is enabled, the simulator also keeps track of the classical circuit applied since the first
+    qubit was allocated, so that its complete truth table can be computed at once using :meth:`run_truth_table`.
     """
 
-    def __init__(self):
-        """Initialize a ClassicalSimulator object."""
+    def __init__(self, record_circuit=False):
+        """
+        Initialize a ClassicalSimulator object.
+
+        Args:
+            record_circuit (bool): If True, the simulator records the commands it receives (until all qubits have been
+                deallocated) in order to support :meth:`run_truth_table`. Default: False, as the recorded circuit grows
+                with the number of gates.
+        """
         super().__init__()
         self._state = 0
         self._bit_positions = {}
+        self._record_circuit = record_circuit
+        self._circuit = []
 
     def _convert_logical_to_mapped_qubit(self, qubit):
         """
@@ -180,9 +228,146 @@ class ClassicalSimulator(BasicEngine):
             cmd.gate == Measure
             or cmd.gate == Allocate
             or cmd.gate == Deallocate
-            or isinstance(cmd.gate, (BasicMathGate, FlushGate, XGate))
+            or isinstance(cmd.gate, (BasicMathGate, FlushGate, SwapGate, XGate))
         )
 
+    def run_truth_table(self, qureg_in, qureg_out):
+        """
+        Compute the value of a register for all possible initial values of another register.
+
+        The circuit applied to the simulator since the first qubit was allocated is re-executed in a bit-sliced
+        fashion: each qubit holds an array of 64-bit words, each bit of which corresponds to one initial value of
+        qureg_in (while all other qubits start in 0, as they were allocated). X (with any number of controls) and Swap
+        gates thus act on 64 inputs per word operation. Math gates are emulated by evaluating their function once
+        per distinct input.
+
+        Note:
+            The circuit is only available if the simulator was created with record_circuit=True.
+
+            Values written directly using :meth:`write_bit` or :meth:`write_register` are not part of the circuit and
+            are ignored.
+
+            If there is a mapper present in the compiler, this function automatically converts from logical qubits to
+            mapped qubits for the qureg arguments.
+
+        Args:
+            qureg_in (projectq.types.Qureg): Input bits, in little-endian order.
+            qureg_out (projectq.types.Qureg): Output bits, in little-endian order. At most 63 bits.
+
+        Returns:
+            np.ndarray: Array of length 2 ** len(qureg_in) whose x-th entry is the little-endian value of qureg_out at
+            the end of the circuit when qureg_in initially stores the value x.
+
+        Raises:
+            RuntimeError: If the simulator does not record the circuit.
+            ValueError: If qureg_out is too large or if qureg_out has been deallocated.
+        """
+        if not self._record_circuit:
+            raise RuntimeError("The circuit is not recorded. Please use ClassicalSimulator(record_circuit=True).")
+        if len(qureg_out) >= _WORD_SIZE:
+            raise ValueError(f"Output register is too large (at most {_WORD_SIZE - 1} bits).")
+        ids_in = [self._convert_logical_to_mapped_qubit(qubit).id for qubit in qureg_in]
+        ids_out = [self._convert_logical_to_mapped_qubit(qubit).id for qubit in qureg_out]
+
+        num_lanes = 1 << len(ids_in)
+        num_words = -(-num_lanes // _WORD_SIZE)
+        words = self._run_batch_circuit(ids_in, num_words)
+
+        if not all(qubit_id in words for qubit_id in ids_out):
+            raise ValueError("Output register has been deallocated.")
+        result = np.zeros(num_words * _WORD_SIZE, dtype=np.int64)
+        for i, qubit_id in enumerate(ids_out):
+            result |= _unpack_lanes(words[qubit_id]).astype(np.int64) << i
+        return result[:num_lanes]
+
+    def _run_batch_circuit(self, ids_in, num_words):
+        """
+        Re-execute the recorded circuit on a bit-sliced state.
+
+        Args:
+            ids_in (list<int>): Mapped ids of the input qubits, in little-endian order.
+            num_words (int): Number of 64-bit words per qubit.
+
+        Returns:
+            dict: Dictionary mapping the ids of the qubits alive at the end of the circuit to their words.
+        """
+        lanes = np.arange(num_words * _WORD_SIZE)
+        zeros = np.zeros(num_words, dtype=np.uint64)
+
+        # Each input qubit is initialized when it is allocated for the last time
+        last_allocation = {}
+        for i, cmd in enumerate(self._circuit):
+            if cmd.gate == Allocate:
+                last_allocation[cmd.qubits[0][0].id] = i
+        initial_words = {last_allocation[qubit_id]: _pack_lanes((lanes >> i) & 1) for i, qubit_id in enumerate(ids_in)}
+
+        words = {}
+        for i, cmd in enumerate(self._circuit):
+            if cmd.gate == Allocate:
+                words[cmd.qubits[0][0].id] = initial_words.get(i, zeros)
+            elif cmd.gate == Deallocate:
+                del words[cmd.qubits[0][0].id]
+            else:
+                controls = ~zeros
+                for qubit in cmd.control_qubits:
+                    controls = controls & words[qubit.id]
+                self._apply_batch_gate(words, cmd, controls)
+        return words
+
+    @staticmethod
+    def _apply_batch_gate(words, cmd, controls):
+        """
+        Apply the gate of a command to a bit-sliced state.
+
+        Args:
+            words (dict): Dictionary mapping qubit ids to arrays of 64-bit words (one bit per input).
+            cmd (Command): Command to apply (XGate, SwapGate or BasicMathGate).
+            controls (np.ndarray): Words indicating for which inputs the controls are satisfied.
+        """
+        if isinstance(cmd.gate, XGate):
+            qubit_id = cmd.qubits[0][0].id
+            words[qubit_id] = words[qubit_id] ^ controls
+        elif isinstance(cmd.gate, SwapGate):
+            id1, id2 = cmd.qubits[0][0].id, cmd.qubits[1][0].id
+            diff = (words[id1] ^ words[id2]) & controls
+            words[id1] = words[id1] ^ diff
+            words[id2] = words[id2] ^ diff
+        else:
+            if any(len(reg) > _WORD_SIZE for reg in cmd.qubits):
+                raise ValueError(f"Math gates on registers of more than {_WORD_SIZE} bits are not supported.")
+            active = np.flatnonzero(_unpack_lanes(controls))
+            if len(active) > 0:
+                ClassicalSimulator._apply_batch_math_gate(words, cmd, active)
+
+    @staticmethod
+    def _apply_batch_math_gate(words, cmd, active):
+        """
+        Apply a math gate to the active inputs of a bit-sliced state.
+
+        Math gates are arbitrary functions and cannot be bit-sliced: the lanes are unpacked and the math function is
+        evaluated once per distinct input.
+
+        Args:
+            words (dict): Dictionary mapping qubit ids to arrays of 64-bit words (one bit per input).
+            cmd (Command): Command to apply (BasicMathGate).
+            active (np.ndarray): Indices of the inputs for which the controls are satisfied.
+        """
+        ins = np.zeros((len(cmd.qubits), len(active)), dtype=np.uint64)
+        for j, reg in enumerate(cmd.qubits):
+            for k, qubit in enumerate(reg):
+                ins[j] |= _unpack_lanes(words[qubit.id])[active] << np.uint64(k)
+
+        inputs, inverse = np.unique(ins, axis=1, return_inverse=True)
+        math_fun = cmd.gate.get_math_function(cmd.qubits)
+        outs = np.array([math_fun([int(x) for x in column]) for column in inputs.T], dtype=object)
+
+        for j, reg in enumerate(cmd.qubits):
+            values = np.array([int(out) & ((1 << len(reg)) - 1) for out in outs[:, j]], dtype=np.uint64)[inverse]
+            for k, qubit in enumerate(reg):
+                bits = _unpack_lanes(words[qubit.id])
+                bits[active] = (values >> np.uint64(k)) & np.uint64(1)
+                words[qubit.id] = _pack_lanes(bits)
+
     def receive(self, command_list):
         """
         Receive a list of commands.
@@ -194,36 +379,54 @@ class ClassicalSimulator(BasicEngine):
         if not self.is_last_engine:
             self.send(command_list)
 
-    def _handle(self, cmd):  # pylint: disable=too-many-branches,too-many-locals
+    def _record(self, cmd):
+        """Append a command to the recorded circuit if circuit recording is enabled."""
+        if self._record_circuit:
+            self._circuit.append(cmd)
+
+    def _handle_measure(self, cmd):
+        """Set the measurement results of the qubits of a Measure command."""
+        for qureg in cmd.qubits:
+            for qubit in qureg:
+                # Check if a mapper assigned a different logical id
+                logical_id_tag = None
+                for tag in cmd.tags:
+                    if isinstance(tag, LogicalQubitIDTag):
+                        logical_id_tag = tag
+                log_qb = qubit
+                if logical_id_tag is not None:
+                    log_qb = WeakQubitRef(qubit.engine, logical_id_tag.logical_qubit_id)
+                self.main_engine.set_measurement_result(log_qb, self._read_mapped_bit(qubit))
+
+    def _handle_deallocate(self, cmd):
+        """Remove the bit of a deallocated qubit from the state."""
+        old_id = cmd.qubits[0][0].id
+        pos = self._bit_positions[old_id]
+        low = (1 << pos) - 1
+
+        self._state = (self._state & low) | ((self._state >> 1) & ~low)
+        self._bit_positions = {k: b - (0 if b < pos else 1) for k, b in self._bit_positions.items() if k != old_id}
+        if self._bit_positions:
+            self._record(cmd)
+        else:
+            self._circuit = []
+
+    def _handle(self, cmd):  # pylint: disable=too-many-branches,too-many-locals,too-many-return-statements
         if isinstance(cmd.gate, FlushGate):
             return
 
         if cmd.gate == Measure:
-            for qureg in cmd.qubits:
-                for qubit in qureg:
-                    # Check if a mapper assigned a different logical id
-                    logical_id_tag = None
-                    for tag in cmd.tags:
-                        if isinstance(tag, LogicalQubitIDTag):
-                            logical_id_tag = tag
-                    log_qb = qubit
-                    if logical_id_tag is not None:
-                        log_qb = WeakQubitRef(qubit.engine, logical_id_tag.logical_qubit_id)
-                    self.main_engine.set_measurement_result(log_qb, self._read_mapped_bit(qubit))
+            self._handle_measure(cmd)
             return
 
         if cmd.gate == Allocate:
             new_id = cmd.qubits[0][0].id
             self._bit_positions[new_id] = len(self._bit_positions)
+            self._record(cmd)
             return
 
         if cmd.gate == Deallocate:
-            old_id = cmd.qubits[0][0].id
-            pos = self._bit_positions[old_id]
-            low = (1 << pos) - 1
-
-            self._state = (self._state & low) | ((self._state >> 1) & ~low)
-            self._bit_positions = {k: b - (0 if b < pos else 1) for k, b in self._bit_positions.items() if k != old_id}
+            self._handle_deallocate(cmd)
             return
 
         controls_mask = self._mask(cmd.control_qubits)
@@ -235,6 +438,16 @@ class ClassicalSimulator(BasicEngine):
             target = cmd.qubits[0][0]
             if meets_controls:
                 self._write_mapped_bit(target, not self._read_mapped_bit(target))
+            self._record(cmd)
+            return
+
+        if isinstance(cmd.gate, SwapGate):
+            target1, target2 = cmd.qubits[0][0], cmd.qubits[1][0]
+            if meets_controls:
+                bit1 = self._read_mapped_bit(target1)
+                self._write_mapped_bit(target1, self._read_mapped_bit(target2))
+                self._write_mapped_bit(target2, bit1)
+            self._record(cmd)
             return
 
         if isinstance(cmd.gate, BasicMathGate):
@@ -243,6 +456,7 @@ class ClassicalSimulator(BasicEngine):
                 outs = cmd.gate.get_math_function(cmd.qubits)(ins)
                 for reg, out in zip(cmd.qubits, outs):
                     self._write_mapped_register(reg, out & ((1 << len(reg)) - 1))
+            self._record(cmd)
             return
 
-        raise ValueError("Only support alloc/dealloc/measure/not/math ops.")
+        raise ValueError("Only support alloc/dealloc/measure/not/swap/math ops.")
@@ -21,7 +21,7 @@ from projectq.cengines import (
     DecompositionRuleSet,
     DummyEngine,
 )
-from projectq.ops import NOT, All, BasicMathGate, C, Measure, X, Y
+from projectq.ops import NOT, All, BasicMathGate, C, Measure, Swap, X, Y
 from projectq.types import WeakQubitRef
 
 from ._classical_simulator import ClassicalSimulator
@@ -141,6 +141,77 @@ def test_simulator_arithmetic(mapper):  # noqa: F811
         assert int(b[i]) == ((24 >> i) & 1)
 
 
+def test_simulator_swap(mapper):  # noqa: F811
+    engine_list = []
+    if mapper is not None:
+        engine_list.append(mapper)
+    sim = ClassicalSimulator()
+    eng = MainEngine(sim, engine_list)
+    a = eng.allocate_qureg(3)
+    sim.write_register(a, 1)
+
+    Swap | (a[0], a[1])
+    assert sim.read_register(a) == 2
+    C(Swap) | (a[2], a[0], a[1])
+    assert sim.read_register(a) == 2
+    X | a[0]
+    C(Swap) | (a[1], a[0], a[2])
+    assert sim.read_register(a) == 6
+
+
+def test_simulator_truth_table(mapper):  # noqa: F811
+    class Offset(BasicMathGate):
+        def __init__(self, amount):
+            super().__init__(lambda x: (x + amount,))
+
+    engine_list = []
+    if mapper is not None:
+        engine_list.append(mapper)
+    sim = ClassicalSimulator(record_circuit=True)
+    eng = MainEngine(sim, engine_list)
+    a = eng.allocate_qureg(4)
+    b = eng.allocate_qureg(4)
+    ancilla = eng.allocate_qubit()
+    sim.write_register(a, 5)
+
+    # b <- a, swap the two halves of b, then add 3 to b if a[3] is set
+    for qa, qb in zip(a, b):
+        C(X) | (qa, qb)
+    Swap | (b[0], b[2])
+    Swap | (b[1], b[3])
+    C(Offset(3)) | (a[3], b)
+    C(X, 2) | (a[0], a[1], ancilla)
+    X | ancilla
+    eng.deallocate_qubit(ancilla[0])
+    eng.flush()
+
+    table = sim.run_truth_table(a, b)
+    assert len(table) == 16
+    for value in range(16):
+        swapped = ((value & 3) << 2) | (value >> 2)
+        assert table[value] == (swapped + 3 * (value >> 3)) % 16
+    assert sim.run_truth_table(b, b).tolist() == [((value & 3) << 2) | (value >> 2) for value in range(16)]
+
+    # The circuit is the same for all inputs: check it against the simulator itself
+    assert table[5] == sim.read_register(b)
+
+    with pytest.raises(ValueError):
+        sim.run_truth_table(a, eng.allocate_qureg(64))
+
+
+def test_simulator_truth_table_requires_recording():
+    sims = [ClassicalSimulator(), ClassicalSimulator(record_circuit=True)]
+    quregs = []
+    for sim in sims:
+        eng = MainEngine(sim, [])
+        quregs.append(eng.allocate_qureg(2))
+        C(X) | (quregs[-1][0], quregs[-1][1])
+        eng.flush()
+    with pytest.raises(RuntimeError):
+        sims[0].run_truth_table(quregs[0][:1], quregs[0][1:])
+    assert sims[1].run_truth_table(quregs[1][:1], quregs[1][1:]).tolist() == [0, 1]
+
+
 def test_write_register_value_error_exception(mapper):  # noqa: F811
     engine_list = []
     if mapper is not None:
@@ -221,6 +221,18 @@ public:
             fused_gates_ = fused_gates;
     }
 
+    std::size_t register_matrix(Fusion::Matrix const& m){
+        registered_matrices_.push_back(m);
+        return registered_matrices_.size() - 1;
+    }
+
+    void apply_controlled_gate_by_handle(std::size_t handle, const std::vector<unsigned>& ids,
+                                         const std::vector<unsigned>& ctrl){
+        if (handle >= registered_matrices_.size())
+            throw(std::out_of_range("Error: Unknown matrix handle."));
+        apply_controlled_gate(registered_matrices_[handle], ids, ctrl);
+    }
+
     template <class F, class QuReg>
     void emulate_math(F const& f, QuReg quregs, const std::vector<unsigned>& ctrl,
                       bool parallelize = false){
@@ -367,6 +379,35 @@ public:
         return probability;
     }
 
+    std::vector<calc_type> get_probabilities(std::vector<unsigned> const& ids){
+        run();
+        if (!check_ids(ids))
+            throw(std::runtime_error("get_probabilities(): Unknown qubit id. Please make sure you have called eng.flush()."));
+        std::vector<unsigned> positions(ids.size());
+        for (unsigned i = 0; i < ids.size(); ++i)
+            positions[i] = map_[ids[i]];
+
+        std::size_t const num_outcomes = 1UL << ids.size();
+        std::vector<calc_type> probabilities(num_outcomes, 0.);
+        // single pass over the state vector: each thread accumulates its own
+        // histogram, which are summed up at the end
+        #pragma omp parallel
+        {
+            std::vector<calc_type> local_probabilities(num_outcomes, 0.);
+            #pragma omp for schedule(static)
+            for (std::size_t i = 0; i < vec_.size(); ++i){
+                std::size_t outcome = 0;
+                for (unsigned k = 0; k < positions.size(); ++k)
+                    outcome |= ((i >> positions[k]) & 1UL) << k;
+                local_probabilities[outcome] += std::norm(vec_[i]);
+            }
+            #pragma omp critical
+            for (std::size_t j = 0; j < num_outcomes; ++j)
+                probabilities[j] += local_probabilities[j];
+        }
+        return probabilities;
+    }
+
     complex_type const& get_amplitude(std::vector<bool> const& bit_string,
                                       std::vector<unsigned> const& ids){
         run();
@@ -566,6 +607,7 @@ private:
     StateVector vec_;
     Map map_;
     Fusion fused_gates_;
+    std::vector<Fusion::Matrix> registered_matrices_;
     unsigned fusion_qubits_min_, fusion_qubits_max_;
     RndEngine rnd_eng_;
     std::function<double()> rng_;
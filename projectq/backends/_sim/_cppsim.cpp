@@ -40,6 +40,11 @@ void emulate_math_wrapper(Simulator &sim, py::function const& pyfunc, QR const&
     sim.emulate_math(f, qr, ctrls);
 }
 
+py::array_t<double> get_probabilities_wrapper(Simulator &sim, std::vector<unsigned> const& ids){
+    auto probabilities = sim.get_probabilities(ids);
+    return py::array_t<double>(probabilities.size(), probabilities.data());
+}
+
 PYBIND11_MODULE(_cppsim, m)
 {
     py::class_<Simulator>(m, "Simulator")
@@ -48,8 +53,10 @@ PYBIND11_MODULE(_cppsim, m)
         .def("deallocate_qubit", &Simulator::deallocate_qubit)
         .def("get_classical_value", &Simulator::get_classical_value)
         .def("is_classical", &Simulator::is_classical)
-        .def("measure_qubits", &Simulator::measure_qubits_return)
+        .def("measure_qubits", &Simulator::measure_qubits_return, py::call_guard<py::gil_scoped_release>())
         .def("apply_controlled_gate", &Simulator::apply_controlled_gate<MatrixType>)
+        .def("register_matrix", &Simulator::register_matrix)
+        .def("apply_controlled_gate_by_handle", &Simulator::apply_controlled_gate_by_handle, py::call_guard<py::gil_scoped_release>())
         .def("emulate_math", &emulate_math_wrapper<QuRegs>)
         .def("emulate_math_addConstant", &Simulator::emulate_math_addConstant<QuRegs>)
         .def("emulate_math_addConstantModN", &Simulator::emulate_math_addConstantModN<QuRegs>)
@@ -58,10 +65,11 @@ PYBIND11_MODULE(_cppsim, m)
         .def("apply_qubit_operator", &Simulator::apply_qubit_operator)
         .def("emulate_time_evolution", &Simulator::emulate_time_evolution)
         .def("get_probability", &Simulator::get_probability)
+        .def("get_probabilities", &get_probabilities_wrapper)
         .def("get_amplitude", &Simulator::get_amplitude)
         .def("set_wavefunction", &Simulator::set_wavefunction)
         .def("collapse_wavefunction", &Simulator::collapse_wavefunction)
-        .def("run", &Simulator::run)
+        .def("run", &Simulator::run, py::call_guard<py::gil_scoped_release>())
         .def("cheat", &Simulator::cheat)
         ;
 }
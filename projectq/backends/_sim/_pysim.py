@@ -49,6 +49,7 @@ class Simulator:
         self._state = _np.ones(1, dtype=_np.complex128)
         self._map = {}
         self._num_qubits = 0
+        self._registered_matrices = []
         print("(Note: This is the (slow) Python simulator.)")
 
     def cheat(self):
@@ -74,13 +75,10 @@ class Simulator:
             List of measurement results (containing either True or False).
         """
         random_outcome = random.random()
-        val = 0.0
-        i_picked = 0
-        while val < random_outcome and i_picked < len(self._state):
-            val += _np.abs(self._state[i_picked]) ** 2
-            i_picked += 1
-
-        i_picked -= 1
+        # pick entry at random with probability |entry|^2
+        cumulative_probabilities = _np.cumsum(_np.abs(self._state) ** 2)
+        i_picked = int(_np.searchsorted(cumulative_probabilities, random_outcome))
+        i_picked = min(i_picked, len(self._state) - 1)
 
         pos = [self._map[ID] for ID in ids]
         res = [False] * len(pos)
@@ -92,16 +90,22 @@ class Simulator:
             mask |= 1 << _pos
             val |= (res[i] & 1) << _pos
 
-        nrm = 0.0
-        for i, _state in enumerate(self._state):
-            if (mask & i) != val:
-                self._state[i] = 0.0
-            else:
-                nrm += _np.abs(_state) ** 2
-
+        outcome_mask = self._get_outcome_mask(mask, val)
+        self._state[~outcome_mask] = 0.0
+        nrm = _np.sum(_np.abs(self._state[outcome_mask]) ** 2)
         self._state *= 1.0 / _np.sqrt(nrm)
         return res
 
+    def _get_outcome_mask(self, mask, val):
+        """
+        Return a boolean array which is True for all basis states i with (i & mask) == val.
+
+        Args:
+            mask (int): Bit-mask of the qubits to check.
+            val (int): Required values of the masked bits.
+        """
+        return (_np.arange(len(self._state)) & mask) == val
+
     def allocate_qubit(self, qubit_id):
         """
         Allocate a qubit.
@@ -125,21 +129,17 @@ class Simulator:
             RuntimeError: If the qubit is in a superposition, i.e., has not been measured / uncomputed.
         """
         pos = self._map[qubit_id]
-        state_up = state_down = False
-
-        for i in range(0, len(self._state), (1 << (pos + 1))):
-            for j in range(0, (1 << pos)):
-                if _np.abs(self._state[i + j]) > tol:
-                    state_up = True
-                if _np.abs(self._state[i + j + (1 << pos)]) > tol:
-                    state_down = True
-                if state_up and state_down:
-                    raise RuntimeError(
-                        "Qubit has not been measured / "
-                        "uncomputed. Cannot access its "
-                        "classical value and/or deallocate a "
-                        "qubit in superposition!"
-                    )
+        # view the state as (higher qubits, qubit, lower qubits)
+        state = self._state.reshape(-1, 2, 1 << pos)
+        state_up = bool(_np.any(_np.abs(state[:, 0, :]) > tol))
+        state_down = bool(_np.any(_np.abs(state[:, 1, :]) > tol))
+        if state_up and state_down:
+            raise RuntimeError(
+                "Qubit has not been measured / "
+                "uncomputed. Cannot access its "
+                "classical value and/or deallocate a "
+                "qubit in superposition!"
+            )
         return state_down
 
     def deallocate_qubit(self, qubit_id):
@@ -156,11 +156,7 @@ class Simulator:
 
         classical_value = self.get_classical_value(qubit_id)
 
-        newstate = _np.zeros((1 << (self._num_qubits - 1)), dtype=_np.complex128)
-        k = 0
-        for i in range((1 << pos) * int(classical_value), len(self._state), (1 << (pos + 1))):
-            newstate[k : k + (1 << pos)] = self._state[i : i + (1 << pos)]  # noqa: E203
-            k += 1 << pos
+        newstate = self._state.reshape(-1, 2, 1 << pos)[:, int(classical_value), :].flatten()
 
         newmap = {}
         for key, value in self._map.items():
@@ -202,25 +198,42 @@ class Simulator:
             qb_locs.append([])
             for qubit_id in qureg:
                 qb_locs[-1].append(self._map[qubit_id])
-
-        newstate = _np.zeros_like(self._state)
-        for i, state in enumerate(self._state):
-            if (mask & i) == mask:
-                arg_list = [0] * len(qb_locs)
-                for qr_i, qr_loc in enumerate(qb_locs):
-                    for qb_i, qb_loc in enumerate(qr_loc):
-                        arg_list[qr_i] |= ((i >> qb_loc) & 1) << qb_i
-
-                res = func(arg_list)
-                new_i = i
-                for qr_i, qr_loc in enumerate(qb_locs):
-                    for qb_i, qb_loc in enumerate(qr_loc):
-                        if not ((new_i >> qb_loc) & 1) == ((res[qr_i] >> qb_i) & 1):
-                            new_i ^= 1 << qb_loc
-                newstate[new_i] = state
-            else:
-                newstate[i] = state
-
+        all_locs = [qb_loc for qr_loc in qb_locs for qb_loc in qr_loc]
+
+        active = self._get_outcome_mask(mask, mask)
+        indices = _np.arange(len(self._state))[active]
+
+        # gather the bits of all involved qubits into one key per basis state
+        keys = _np.zeros(len(indices), dtype=_np.int64)
+        for key_i, qb_loc in enumerate(all_locs):
+            keys |= ((indices >> qb_loc) & 1) << key_i
+
+        # the math function only needs to be evaluated once per distinct input
+        unique_keys, inverse = _np.unique(keys, return_inverse=True)
+        new_unique_keys = _np.empty_like(unique_keys)
+        for u_i, key in enumerate(unique_keys.tolist()):
+            arg_list = [0] * len(qb_locs)
+            key_i = 0
+            for qr_i, qr_loc in enumerate(qb_locs):
+                arg_list[qr_i] = (key >> key_i) & ((1 << len(qr_loc)) - 1)
+                key_i += len(qr_loc)
+
+            res = func(arg_list)
+            new_key = 0
+            key_i = 0
+            for qr_i, qr_loc in enumerate(qb_locs):
+                new_key |= (res[qr_i] & ((1 << len(qr_loc)) - 1)) << key_i
+                key_i += len(qr_loc)
+            new_unique_keys[u_i] = new_key
+        new_keys = new_unique_keys[inverse]
+
+        # scatter the bits of the new keys back to the qubit locations
+        new_indices = indices & ~sum(1 << qb_loc for qb_loc in all_locs)
+        for key_i, qb_loc in enumerate(all_locs):
+            new_indices |= ((new_keys >> key_i) & 1) << qb_loc
+
+        newstate = _np.where(active, 0, self._state)
+        newstate[new_indices] = self._state[indices]
         self._state = newstate
 
     def get_expectation_value(self, terms_dict, ids):
@@ -282,11 +295,32 @@ class Simulator:
         for i, qubit_id in enumerate(ids):
             mask |= 1 << self._map[qubit_id]
             bit_str |= bit_string[i] << self._map[qubit_id]
-        probability = 0.0
-        for i, state in enumerate(self._state):
-            if (i & mask) == bit_str:
-                probability += state.real**2 + state.imag**2
-        return probability
+        return _np.sum(_np.abs(self._state[self._get_outcome_mask(mask, bit_str)]) ** 2)
+
+    def get_probabilities(self, ids):
+        """
+        Return the probabilities of all outcomes when measuring the qubits given by the list of ids.
+
+        Args:
+            ids (list[int]): List of qubit ids determining the ordering.
+
+        Returns:
+            Array of length 2^len(ids) where entry i is the probability of the outcome in which the k-th qubit of ids
+            is in state (i >> k) & 1.
+
+        Raises:
+            RuntimeError if an unknown qubit id was provided.
+        """
+        for qubit_id in ids:
+            if qubit_id not in self._map:
+                raise RuntimeError(
+                    "get_probabilities(): Unknown qubit id. Please make sure you have called eng.flush()."
+                )
+        indices = _np.arange(len(self._state))
+        outcomes = _np.zeros(len(self._state), dtype=_np.int64)
+        for k, qubit_id in enumerate(ids):
+            outcomes |= ((indices >> self._map[qubit_id]) & 1) << k
+        return _np.bincount(outcomes, weights=_np.abs(self._state) ** 2, minlength=1 << len(ids))
 
     def get_amplitude(self, bit_string, ids):
         """
@@ -338,6 +372,7 @@ class Simulator:
         correction = _np.exp(-1j * time * trace / float(scale))
         output_state = _np.copy(self._state)
         mask = self._get_control_mask(ctrlids)
+        active = self._get_outcome_mask(mask, mask)
         for _ in range(scale):
             j = 0
             nrm_change = 1.0
@@ -352,14 +387,10 @@ class Simulator:
                     self._state = _np.copy(current_state)
                 update *= coeff
                 self._state = update
-                for k, _update in enumerate(update):
-                    if (k & mask) == mask:
-                        output_state[k] += _update
+                output_state[active] += update[active]
                 nrm_change = _np.linalg.norm(update)
                 j += 1
-            for k in range(len(update)):
-                if (k & mask) == mask:
-                    output_state[k] *= correction
+            output_state[active] *= correction
             self._state = _np.copy(output_state)
 
     def apply_controlled_gate(self, matrix, ids, ctrlids):
@@ -371,66 +402,103 @@ class Simulator:
             ids (list): A list containing the qubit IDs to which to apply the gate.
             ctrlids (list): A list of control qubit IDs (i.e., the gate is only applied where these qubits are 1).
         """
-        mask = self._get_control_mask(ctrlids)
+        ctrl_pos = [self._map[ID] for ID in ctrlids]
         if len(matrix) == 2:
             pos = self._map[ids[0]]
-            self._single_qubit_gate(matrix, pos, mask)
+            self._single_qubit_gate(matrix, pos, ctrl_pos)
         else:
             pos = [self._map[ID] for ID in ids]
-            self._multi_qubit_gate(matrix, pos, mask)
+            self._multi_qubit_gate(matrix, pos, ctrl_pos)
 
-    def _single_qubit_gate(self, matrix, pos, mask):
+    def register_matrix(self, matrix):
         """
-        Apply the single qubit gate matrix m to the qubit at position `pos` using `mask` to identify control qubits.
+        Register a gate matrix to be applied later on using apply_controlled_gate_by_handle.
 
         Args:
-            matrix (list[list]): 2x2 complex matrix describing the single-qubit gate.
-            pos (int): Bit-position of the qubit.
-            mask (int): Bit-mask where set bits indicate control qubits.
+            matrix (list[list]): 2^k x 2^k complex matrix describing the k-qubit gate.
+
+        Returns:
+            Integer handle of the matrix.
+        """
+        self._registered_matrices.append(_np.array(matrix, dtype=_np.complex128))
+        return len(self._registered_matrices) - 1
+
+    def apply_controlled_gate_by_handle(self, handle, ids, ctrlids):
+        """
+        Apply a registered k-qubit gate matrix to the qubits with indices ids, using ctrlids as control qubits.
+
+        Args:
+            handle (int): Handle of the matrix returned by register_matrix.
+            ids (list): A list containing the qubit IDs to which to apply the gate.
+            ctrlids (list): A list of control qubit IDs (i.e., the gate is only applied where these qubits are 1).
+        """
+        self.apply_controlled_gate(self._registered_matrices[handle], ids, ctrlids)
+
+    def _get_subspace(self, ctrl_pos):
+        """
+        Return a view of the state as a tensor restricted to the subspace where all control qubits are in state 1.
+
+        The state is viewed as a tensor of shape (2, 2, ..., 2), where the qubit at bit-position `pos` corresponds to
+        axis num_qubits - 1 - pos. Indexing the control axes with 1 removes them from the view.
+
+        Args:
+            ctrl_pos (list[int]): Bit-positions of the control qubits.
         """
+        index = [slice(None)] * self._num_qubits
+        for _pos in ctrl_pos:
+            index[self._num_qubits - 1 - _pos] = 1
+        return self._state.reshape((2,) * self._num_qubits)[tuple(index)]
 
-        def kernel(u, d, m):  # pylint: disable=invalid-name
-            return u * m[0][0] + d * m[0][1], u * m[1][0] + d * m[1][1]
+    def _get_axis(self, pos, ctrl_pos):
+        """
+        Return the axis of the qubit at bit-position `pos` in a view returned by _get_subspace(ctrl_pos).
 
-        for i in range(0, len(self._state), (1 << (pos + 1))):
-            for j in range(1 << pos):
-                if ((i + j) & mask) == mask:
-                    id1 = i + j
-                    id2 = id1 + (1 << pos)
-                    self._state[id1], self._state[id2] = kernel(self._state[id1], self._state[id2], matrix)
+        Args:
+            pos (int): Bit-position of the qubit.
+            ctrl_pos (list[int]): Bit-positions of the control qubits.
+        """
+        return sum(1 for _pos in range(pos + 1, self._num_qubits) if _pos not in ctrl_pos)
 
-    def _multi_qubit_gate(self, matrix, pos, mask):  # pylint: disable=too-many-locals
+    def _single_qubit_gate(self, matrix, pos, ctrl_pos):
         """
-        Apply the k-qubit gate matrix m to the qubits at `pos` using `mask` to identify control qubits.
+        Apply the single qubit gate matrix m to the qubit at position `pos` using `ctrl_pos` as control qubits.
+
+        Args:
+            matrix (list[list]): 2x2 complex matrix describing the single-qubit gate.
+            pos (int): Bit-position of the qubit.
+            ctrl_pos (list[int]): Bit-positions of the control qubits.
+        """
+        subspace = self._get_subspace(ctrl_pos)
+        axis = self._get_axis(pos, ctrl_pos)
+        # use slices (instead of integers) such that up and down are always views
+        index = [slice(None)] * subspace.ndim
+        index[axis] = slice(0, 1)
+        up = subspace[tuple(index)]  # pylint: disable=invalid-name
+        index[axis] = slice(1, 2)
+        down = subspace[tuple(index)]
+        tmp = up.copy()
+        up *= matrix[0][0]
+        up += matrix[0][1] * down
+        down *= matrix[1][1]
+        down += matrix[1][0] * tmp
+
+    def _multi_qubit_gate(self, matrix, pos, ctrl_pos):
+        """
+        Apply the k-qubit gate matrix m to the qubits at `pos` using `ctrl_pos` as control qubits.
 
         Args:
             matrix (list[list]): 2^k x 2^k complex matrix describing the k-qubit gate.
             pos (list[int]): List of bit-positions of the qubits.
-            mask (int): Bit-mask where set bits indicate control qubits.
-        """
-        # follows the description in https://arxiv.org/abs/1704.01127
-        inactive = [p for p in range(len(self._map)) if p not in pos]
-
-        matrix = _np.matrix(matrix)
-        subvec = _np.zeros(1 << len(pos), dtype=complex)
-        subvec_idx = [0] * len(subvec)
-        for k in range(1 << len(inactive)):
-            # determine base index (state of inactive qubits)
-            base = 0
-            for i, _inactive in enumerate(inactive):
-                base |= ((k >> i) & 1) << _inactive
-            # check the control mask
-            if mask != (base & mask):
-                continue
-            # now gather all elements involved in mat-vec mul
-            for j in range(len(subvec_idx)):  # pylint: disable=consider-using-enumerate
-                offset = 0
-                for i, _pos in enumerate(pos):
-                    offset |= ((j >> i) & 1) << _pos
-                subvec_idx[j] = base | offset
-                subvec[j] = self._state[subvec_idx[j]]
-            # perform mat-vec mul
-            self._state[subvec_idx] = matrix.dot(subvec)
+            ctrl_pos (list[int]): Bit-positions of the control qubits.
+        """
+        subspace = self._get_subspace(ctrl_pos)
+        num_targets = len(pos)
+        # bit i of the row/column index of the matrix corresponds to pos[i], i.e., the first (most significant) axis
+        # of the reshaped matrix corresponds to the last qubit
+        axes = [self._get_axis(_pos, ctrl_pos) for _pos in reversed(pos)]
+        matrix = _np.reshape(_np.asarray(matrix, dtype=_np.complex128), (2,) * (2 * num_targets))
+        result = _np.tensordot(matrix, subspace, axes=(list(range(num_targets, 2 * num_targets)), axes))
+        subspace[...] = _np.moveaxis(result, list(range(num_targets)), axes)
 
     def set_wavefunction(self, wavefunction, ordering):
         """
@@ -480,18 +548,12 @@ class Simulator:
             pos = self._map[qubit_id]
             mask |= 1 << pos
             val |= int(values[i]) << pos
-        nrm = 0.0
-        for i, state in enumerate(self._state):
-            if (mask & i) == val:
-                nrm += _np.abs(state) ** 2
+        outcome_mask = self._get_outcome_mask(mask, val)
+        nrm = _np.sum(_np.abs(self._state[outcome_mask]) ** 2)
         if nrm < 1.0e-12:
             raise RuntimeError("collapse_wavefunction(): Invalid collapse! Probability is ~0.")
-        inv_nrm = 1.0 / _np.sqrt(nrm)
-        for i in range(len(self._state)):  # pylint: disable=consider-using-enumerate
-            if (mask & i) != val:
-                self._state[i] = 0.0
-            else:
-                self._state[i] *= inv_nrm
+        self._state[~outcome_mask] = 0.0
+        self._state *= 1.0 / _np.sqrt(nrm)
 
     def run(self):
         """
@@ -22,6 +22,8 @@ implementation is used as an alternative.
 import math
 import random
 
+import numpy as np
+
 from projectq.cengines import BasicEngine
 from projectq.meta import LogicalQubitIDTag, get_control_count, has_negative_control
 from projectq.ops import (
@@ -30,6 +32,14 @@ from projectq.ops import (
     Deallocate,
     FlushGate,
     Measure,
+    Ph,
+    R,
+    Rx,
+    Rxx,
+    Ry,
+    Ryy,
+    Rz,
+    Rzz,
     TimeEvolution,
 )
 from projectq.types import WeakQubitRef
@@ -42,6 +52,169 @@ except ImportError:  # pragma: no cover
 
     FALLBACK_TO_PYSIM = True
 
+# Kinds of the opcodes of a GateTape
+_TAPE_MATRIX = 0
+_TAPE_ROTATION = 1
+_TAPE_TIME_EVOLUTION = 2
+
+_PAULI_MATRICES = {
+    'X': np.array([[0, 1], [1, 0]], dtype=complex),
+    'Y': np.array([[0, -1j], [1j, 0]], dtype=complex),
+    'Z': np.array([[1, 0], [0, -1]], dtype=complex),
+}
+
+# Hermitian generators K of the parametrized gates, i.e., dU/dangle = -i * K * U
+_GENERATORS = {
+    Rx: 0.5 * _PAULI_MATRICES['X'],
+    Ry: 0.5 * _PAULI_MATRICES['Y'],
+    Rz: 0.5 * _PAULI_MATRICES['Z'],
+    Rxx: 0.5 * np.kron(_PAULI_MATRICES['X'], _PAULI_MATRICES['X']),
+    Ryy: 0.5 * np.kron(_PAULI_MATRICES['Y'], _PAULI_MATRICES['Y']),
+    Rzz: 0.5 * np.kron(_PAULI_MATRICES['Z'], _PAULI_MATRICES['Z']),
+    Ph: -np.identity(2, dtype=complex),
+    R: -np.array([[0, 0], [0, 1]], dtype=complex),
+}
+
+
+def _get_subspace_axes(num_qubits, positions, ctrl_positions):
+    """
+    Return the index selecting the control subspace of a state tensor and the axes of the target qubits within it.
+
+    Args:
+        num_qubits (int): Number of qubits of the state tensor (of shape (2,) * num_qubits).
+        positions (list[int]): Bit-positions of the target qubits.
+        ctrl_positions (list[int]): Bit-positions of the control qubits.
+    """
+    index = [slice(None)] * num_qubits
+    for pos in ctrl_positions:
+        index[num_qubits - 1 - pos] = 1
+    ctrl_axes = [num_qubits - 1 - pos for pos in ctrl_positions]
+    axes = []
+    for pos in positions:
+        axis = num_qubits - 1 - pos
+        axes.append(axis - sum(1 for ctrl_axis in ctrl_axes if ctrl_axis < axis))
+    return tuple(index), axes
+
+
+def _apply_matrix(tensor, matrix, axes):
+    """
+    Return the result of applying a 2^k x 2^k matrix to the k tensor axes `axes`.
+
+    Args:
+        tensor (numpy.ndarray): State tensor of shape (2, 2, ...).
+        matrix (numpy.ndarray): Matrix where bit i of the row/column index corresponds to axes[i].
+        axes (list[int]): Tensor axes the matrix acts upon.
+    """
+    num_targets = len(axes)
+    matrix = np.reshape(matrix, (2,) * (2 * num_targets))
+    # the first (i.e. most significant) axis of the reshaped matrix corresponds to the last target
+    target_axes = axes[::-1]
+    result = np.tensordot(matrix, tensor, axes=(list(range(num_targets, 2 * num_targets)), target_axes))
+    return np.moveaxis(result, list(range(num_targets)), target_axes)
+
+
+def _pauli_string_matrix(term, num_qubits):
+    """Return the matrix of a QubitOperator term acting on num_qubits qubits (bit i corresponds to qubit i)."""
+    factors = [np.identity(2, dtype=complex)] * num_qubits
+    for idx, pauli in term:
+        factors[idx] = _PAULI_MATRICES[pauli]
+    matrix = np.ones((1, 1), dtype=complex)
+    for factor in reversed(factors):
+        matrix = np.kron(matrix, factor)
+    return matrix
+
+
+class GateTape:
+    """
+    Compact recording of the low-level gates applied to a Simulator.
+
+    A tape consists of a table of opcodes (one entry per distinct gate matrix, parametrized gate class or
+    Hamiltonian), a list of instructions (opcode index, qubit ids, control qubit ids, parameter slot) and the
+    recorded parameter values. Every parametrized gate (rotation and phase gates as well as TimeEvolution gates) is
+    assigned its own parameter slot in the order in which the gates have been applied.
+
+    Tapes are created using Simulator.start_tape_recording() and Simulator.stop_tape_recording() and can be
+    re-executed with new parameters using Simulator.run_tape(), which bypasses the compiler engines entirely.
+
+    Attributes:
+        parameters (numpy.ndarray): Recorded parameter values (angles or times), one per parameter slot.
+    """
+
+    def __init__(self, ordering, initial_state):
+        """
+        Initialize an empty tape.
+
+        Args:
+            ordering (list[int]): Qubit ids ordered according to their position in the initial state.
+            initial_state (numpy.ndarray): State vector at the beginning of the recording.
+        """
+        self.ordering = ordering
+        self.initial_state = initial_state
+        self.opcodes = []
+        self.instructions = []
+        self._recorded_parameters = []
+        self._opcode_indices = {}
+
+    @property
+    def parameters(self):
+        """Return the recorded parameter values."""
+        return np.array(self._recorded_parameters, dtype=float)
+
+    @property
+    def num_parameters(self):
+        """Return the number of parameter slots."""
+        return len(self._recorded_parameters)
+
+    def _get_opcode(self, key, make_opcode):
+        """Return the index of the opcode with the given key, creating it using make_opcode() if necessary."""
+        if key not in self._opcode_indices:
+            self._opcode_indices[key] = len(self.opcodes)
+            self.opcodes.append(make_opcode())
+        return self._opcode_indices[key]
+
+    def record(self, cmd):
+        """
+        Append a command to the tape.
+
+        Args:
+            cmd (Command): Command to record.
+
+        Raises:
+            RuntimeError: If the command cannot be recorded (allocation, deallocation, measurement, math gates).
+        """
+        if cmd.gate == Measure or cmd.gate == Allocate or cmd.gate == Deallocate or isinstance(cmd.gate, BasicMathGate):
+            raise RuntimeError(
+                f"Simulator: Cannot record {str(cmd.gate)} on a gate tape. Qubits cannot be allocated, deallocated or "
+                "measured while recording a tape (see start_tape_recording())."
+            )
+        ctrlids = tuple(qb.id for qb in cmd.control_qubits)
+        slot = -1
+        if isinstance(cmd.gate, TimeEvolution):
+            ids = tuple(qb.id for qb in cmd.qubits[0])
+            terms = tuple(sorted(cmd.gate.hamiltonian.terms.items()))
+            opcode = self._get_opcode(
+                (TimeEvolution, len(ids), terms),
+                lambda: (_TAPE_TIME_EVOLUTION, [(list(term), coeff) for (term, coeff) in terms], len(ids)),
+            )
+            parameter = cmd.gate.time
+        else:
+            ids = tuple(qb.id for qureg in cmd.qubits for qb in qureg)
+            gate_class = type(cmd.gate)
+            if gate_class in _GENERATORS:
+                generator = _GENERATORS[gate_class]
+                opcode = self._get_opcode(gate_class, lambda: (_TAPE_ROTATION, generator, np.linalg.eigh(generator)))
+                parameter = cmd.gate.angle
+            else:
+                matrix = np.asarray(cmd.gate.matrix, dtype=complex)
+                opcode = self._get_opcode(
+                    (matrix.shape, matrix.tobytes()), lambda: (_TAPE_MATRIX, matrix, matrix.tolist())
+                )
+                parameter = None
+        if parameter is not None:
+            slot = len(self._recorded_parameters)
+            self._recorded_parameters.append(parameter)
+        self.instructions.append((opcode, ids, ctrlids, slot))
+
 
 class Simulator(BasicEngine):
     """
@@ -82,6 +255,9 @@ class Simulator(BasicEngine):
         super().__init__()
         self._simulator = SimulatorBackend(rnd_seed)
         self._gate_fusion = gate_fusion
+        self._recorded_gates = None
+        self._tape = None
+        self._matrix_handles = {}
 
     def is_available(self, cmd):
         """
@@ -221,6 +397,58 @@ class Simulator(BasicEngine):
         bit_string = [bool(int(b)) for b in bit_string]
         return self._simulator.get_probability(bit_string, [qb.id for qb in qureg])
 
+    def get_probabilities(self, qureg, as_array=False, threshold=0.0, top_k=None):
+        """
+        Return the probabilities of all measurement outcomes of the quantum register `qureg`.
+
+        In contrast to calling get_probability() for every outcome, the whole distribution is computed in a single pass
+        over the state vector.
+
+        The measured bits are ordered according to the supplied quantum register, i.e., the left-most bit in the
+        state-string corresponds to the first qubit in the supplied quantum register (same as for the other
+        backends). For the array representation, entry i corresponds to the outcome where the k-th qubit of `qureg` is
+        in state (i >> k) & 1.
+
+        Args:
+            qureg (Qureg|list[Qubit]): Quantum register determining the order of the qubits.
+            as_array (bool): If True, return a numpy array of length 2^len(qureg) instead of a dictionary.
+            threshold (float): Only keep outcomes with a probability of at least `threshold` (dictionary only).
+            top_k (int): Only keep the `top_k` most probable outcomes (dictionary only).
+
+        Returns:
+            probability_dict (dict): Dictionary mapping n-bit strings to probabilities (or a numpy array if
+            `as_array` is True).
+
+        Raises:
+            ValueError: If `threshold` or `top_k` are used together with `as_array`.
+            RuntimeError: If an unknown qubit was provided.
+
+        Note:
+            Make sure all previous commands (especially allocations) have passed through the compilation chain (call
+            main_engine.flush() to make sure).
+
+        Note:
+            If there is a mapper present in the compiler, this function automatically converts from logical qubits to
+            mapped qubits for the qureg argument.
+        """
+        if as_array and (threshold or top_k is not None):
+            raise ValueError('get_probabilities(): threshold and top_k are not supported when returning an array.')
+        qureg = self._convert_logical_to_mapped_qureg(qureg)
+        probabilities = np.asarray(self._simulator.get_probabilities([qb.id for qb in qureg]), dtype=float)
+        if as_array:
+            return probabilities
+
+        outcomes = np.arange(len(probabilities))
+        if threshold:
+            outcomes = outcomes[probabilities >= threshold]
+        if top_k is not None and top_k < len(outcomes):
+            outcomes = outcomes[np.argsort(probabilities[outcomes], kind='stable')[::-1][:top_k]]
+        num_qubits = len(qureg)
+        return {
+            ''.join(str((outcome >> k) & 1) for k in range(num_qubits)): float(probabilities[outcome])
+            for outcome in outcomes
+        }
+
     def get_amplitude(self, bit_string, qureg):
         """
         Return the probability amplitude of the supplied `bit_string`.
@@ -269,7 +497,12 @@ class Simulator(BasicEngine):
             If there is a mapper present in the compiler, this function
             automatically converts from logical qubits to mapped qubits for
             the qureg argument.
+
+        Raises:
+            RuntimeError: If gates have been recorded (see
+                start_gradient_recording() and start_tape_recording()).
         """
+        self._check_not_recording('set_wavefunction')
         qureg = self._convert_logical_to_mapped_qureg(qureg)
         self._simulator.set_wavefunction(wavefunction, [qb.id for qb in qureg])
 
@@ -283,8 +516,10 @@ class Simulator(BasicEngine):
                                                  of the qubits in `qureg`.
 
         Raises:
-            RuntimeError: If an outcome has probability (approximately) 0 or
-                if unknown qubits are provided (see note).
+            RuntimeError: If an outcome has probability (approximately) 0, if
+                unknown qubits are provided (see note) or if gates have been
+                recorded (see start_gradient_recording() and
+                start_tape_recording()).
 
         Note:
             Make sure all previous commands have passed through the
@@ -295,6 +530,7 @@ class Simulator(BasicEngine):
             automatically converts from logical qubits to mapped qubits for
             the qureg argument.
         """
+        self._check_not_recording('collapse_wavefunction')
         qureg = self._convert_logical_to_mapped_qureg(qureg)
         return self._simulator.collapse_wavefunction([qb.id for qb in qureg], [bool(int(v)) for v in values])
 
@@ -321,6 +557,277 @@ class Simulator(BasicEngine):
         """
         return self._simulator.cheat()
 
+    def _check_not_recording(self, method_name):
+        """
+        Check that the wave function can be changed directly, which the recorded gates cannot account for.
+
+        Raises:
+            RuntimeError: If gates have been recorded for the computation of gradients or if a tape is being recorded.
+        """
+        if self._recorded_gates or self._tape is not None:
+            raise RuntimeError(
+                f"{method_name}(): Cannot change the wave function after gates have been recorded (see "
+                "start_gradient_recording() and start_tape_recording())."
+            )
+
+    def start_gradient_recording(self):
+        """
+        Start recording the gates applied to the simulator in order to compute gradients using the adjoint method.
+
+        All gates which are applied after this call are recorded until stop_gradient_recording() is called. The
+        gradients returned by get_expectation_value_gradient() are with respect to the parameters of the recorded
+        rotation gates (Rx, Ry, Rz, Rxx, Ryy, Rzz, Ph, R) and the times of the recorded TimeEvolution gates.
+
+        Note:
+            Make sure all previous commands (especially allocations) have passed through the compilation chain (call
+            main_engine.flush() to make sure). Qubits cannot be allocated, deallocated or measured while recording,
+            and the wave function cannot be set or collapsed once gates have been recorded.
+        """
+        self._recorded_gates = []
+
+    def stop_gradient_recording(self):
+        """Stop recording the gates applied to the simulator and discard the recorded gates."""
+        self._recorded_gates = None
+
+    def start_tape_recording(self):
+        """
+        Start recording the gates applied to the simulator onto a GateTape.
+
+        The tape can later be re-executed with different parameters using run_tape(), which bypasses all compiler
+        engines. The current wave function is stored as the initial state of the tape.
+
+        Note:
+            Make sure all previous commands (especially allocations) have passed through the compilation chain (call
+            main_engine.flush() to make sure). Qubits cannot be allocated, deallocated or measured and the wave
+            function cannot be set or collapsed while recording.
+        """
+        qubit_map, state = self._simulator.cheat()
+        ordering = sorted(qubit_map, key=qubit_map.get)
+        self._tape = GateTape(ordering, np.array(state, dtype=complex))
+
+    def stop_tape_recording(self):
+        """
+        Stop recording the gates applied to the simulator.
+
+        Returns:
+            The recorded GateTape.
+
+        Raises:
+            RuntimeError: If start_tape_recording() has not been called.
+
+        Note:
+            Make sure all commands have passed through the compilation chain before stopping the recording (call
+            main_engine.flush() to make sure).
+        """
+        if self._tape is None:
+            raise RuntimeError("stop_tape_recording(): No tape is being recorded.")
+        tape, self._tape = self._tape, None
+        return tape
+
+    def run_tape(self, tape, parameters=None):
+        """
+        Reset the wave function to the initial state of a tape and re-execute the recorded gates.
+
+        The commands are applied directly to the simulator kernels, i.e., without passing through the compiler engines
+        and without constructing any Command objects. If gates are being recorded for the computation of gradients
+        (see start_gradient_recording()), the gates recorded so far are discarded (as the wave function is reset) and
+        the executed gates are recorded instead, such that the gradient entries correspond to the parameter slots of
+        the tape.
+
+        Args:
+            tape (GateTape): Tape to execute.
+            parameters (list[float]): New parameter values, one per parameter slot of the tape (uses the recorded
+                values by default).
+
+        Raises:
+            ValueError: If the number of parameters does not match the number of parameter slots of the tape.
+            RuntimeError: If the qubits of the tape are not allocated or if a tape is being recorded.
+        """
+        if self._tape is not None:
+            raise RuntimeError("run_tape(): Cannot run a tape while recording a tape.")
+        if parameters is None:
+            parameters = tape.parameters
+        if len(parameters) != tape.num_parameters:
+            raise ValueError(f'run_tape(): Expected {tape.num_parameters} parameters, got {len(parameters)}.')
+        self._simulator.set_wavefunction(tape.initial_state, tape.ordering)
+        if self._recorded_gates is not None:
+            self._recorded_gates = []
+
+        for opcode, ids, ctrlids, slot in tape.instructions:
+            parameter = parameters[slot] if slot >= 0 else None
+            self._apply_tape_instruction(tape.opcodes[opcode], ids, ctrlids, parameter)
+        self._simulator.run()
+
+    def _apply_tape_instruction(self, opcode, ids, ctrlids, parameter):
+        """
+        Apply one instruction of a GateTape to the simulator kernels.
+
+        Args:
+            opcode (tuple): Opcode of the instruction (kind, operator, data), see GateTape.
+            ids (tuple[int]): Ids of the target qubits.
+            ctrlids (tuple[int]): Ids of the control qubits.
+            parameter (float): Value of the parameter slot of the instruction (None if the gate is not parametrized).
+        """
+        kind, operator, data = opcode
+        if kind == _TAPE_TIME_EVOLUTION:
+            self._simulator.emulate_time_evolution(operator, parameter, list(ids), list(ctrlids))
+            if self._recorded_gates is not None:
+                hamiltonian = sum(coeff * _pauli_string_matrix(term, data) for term, coeff in operator)
+                eigenvalues, eigenvectors = np.linalg.eigh(hamiltonian)
+                matrix = (eigenvectors * np.exp(-1j * parameter * eigenvalues)) @ eigenvectors.conj().T
+                self._recorded_gates.append((matrix, ids, ctrlids, hamiltonian))
+            return
+
+        if kind == _TAPE_ROTATION:
+            eigenvalues, eigenvectors = data
+            matrix = (eigenvectors * np.exp(-1j * parameter * eigenvalues)) @ eigenvectors.conj().T
+            generator = operator
+            matrix_list = matrix.tolist()
+        else:
+            matrix, matrix_list = operator, data
+            generator = None
+        if self._recorded_gates is not None:
+            self._recorded_gates.append((matrix, ids, ctrlids, generator))
+        self._simulator.apply_controlled_gate(matrix_list, list(ids), list(ctrlids))
+        if not self._gate_fusion:
+            self._simulator.run()
+
+    def get_expectation_value_gradient(self, qubit_operator, qureg):
+        """
+        Return the expectation value of a qubit operator and its gradient w.r.t. the recorded gate parameters.
+
+        The gradient is computed using the adjoint method, i.e., by sweeping backwards through the recorded gates
+        while un-applying them to the current wave function and to the wave function obtained by applying the
+        operator. Its cost is that of about three simulations of the recorded circuit, independent of the number of
+        parameters (in contrast to 2 simulations per parameter for finite differences).
+
+        Args:
+            qubit_operator (projectq.ops.QubitOperator): Hermitian operator to measure.
+            qureg (list[Qubit],Qureg): Quantum bits to measure.
+
+        Returns:
+            A tuple (expectation, gradient) where gradient is a numpy array containing the derivatives of the
+            expectation value w.r.t. the parameter (angle or time) of each recorded parametrized gate, in the order in
+            which the gates have been applied.
+
+        Raises:
+            RuntimeError: If start_gradient_recording() has not been called.
+            Exception: If `qubit_operator` acts on more qubits than present in the `qureg` argument.
+
+        Note:
+            Make sure all previous commands have passed through the compilation chain (call main_engine.flush() to
+            make sure). Compiler engines such as the LocalOptimizer may merge or cancel rotation gates, in which case
+            the gradient is w.r.t. the parameters of the resulting gates.
+
+        Note:
+            If there is a mapper present in the compiler, this function automatically converts from logical qubits to
+            mapped qubits for the qureg argument.
+        """
+        if self._recorded_gates is None:
+            raise RuntimeError(
+                "get_expectation_value_gradient(): No gates have been recorded. Please call "
+                "start_gradient_recording() before applying the circuit."
+            )
+        qureg = self._convert_logical_to_mapped_qureg(qureg)
+        num_qubits = len(qureg)
+        for term, _ in qubit_operator.terms.items():
+            if not term == () and term[-1][0] >= num_qubits:
+                raise Exception("qubit_operator acts on more qubits than contained in the qureg.")
+
+        qubit_map, state = self._simulator.cheat()
+        num_qubits = len(qubit_map)
+        psi = np.array(state, dtype=complex).reshape((2,) * num_qubits)
+        lam = np.zeros_like(psi)
+        for term, coefficient in qubit_operator.terms.items():
+            tmp = psi
+            for idx, pauli in term:
+                _, axes = _get_subspace_axes(num_qubits, [qubit_map[qureg[idx].id]], [])
+                tmp = _apply_matrix(tmp, _PAULI_MATRICES[pauli], axes)
+            lam += coefficient * tmp
+        expectation = np.vdot(psi, lam).real
+        return expectation, self._sweep_recorded_gates(psi, lam, qubit_map)
+
+    def _sweep_recorded_gates(self, psi, lam, qubit_map):
+        """
+        Sweep backwards through the recorded gates and compute the gradient w.r.t. their parameters.
+
+        Args:
+            psi (numpy.ndarray): Current wave function as a tensor with one axis per qubit (modified in-place).
+            lam (numpy.ndarray): Wave function obtained by applying the measured operator to psi (modified in-place).
+            qubit_map (dict): Dictionary mapping qubit ids to their position in the wave function.
+
+        Returns:
+            numpy.ndarray: Derivatives w.r.t. the parameter of each recorded parametrized gate, in the order in which
+            the gates have been applied.
+        """
+        num_qubits = len(qubit_map)
+        gradient = []
+        for matrix, ids, ctrlids, generator in reversed(self._recorded_gates):
+            index, axes = _get_subspace_axes(
+                num_qubits, [qubit_map[qubit_id] for qubit_id in ids], [qubit_map[qubit_id] for qubit_id in ctrlids]
+            )
+            if generator is not None:
+                gradient.append(2 * np.vdot(lam[index], _apply_matrix(psi[index], generator, axes)).imag)
+            inverse = matrix.conj().T
+            psi[index] = _apply_matrix(psi[index], inverse, axes)
+            lam[index] = _apply_matrix(lam[index], inverse, axes)
+        return np.array(gradient[::-1])
+
+    def _record_gate(self, cmd):
+        """
+        Record a command for the computation of gradients.
+
+        Args:
+            cmd (Command): Command to record.
+
+        Raises:
+            RuntimeError: If the command cannot be un-applied (allocation, deallocation, measurement, math gates).
+        """
+        if cmd.gate == Measure or cmd.gate == Allocate or cmd.gate == Deallocate or isinstance(cmd.gate, BasicMathGate):
+            raise RuntimeError(
+                f"Simulator: Cannot record {str(cmd.gate)} for gradient computation. Qubits cannot be allocated, "
+                "deallocated or measured while recording gates (see start_gradient_recording())."
+            )
+        ctrlids = [qb.id for qb in cmd.control_qubits]
+        if isinstance(cmd.gate, TimeEvolution):
+            ids = [qb.id for qb in cmd.qubits[0]]
+            hamiltonian = sum(
+                coefficient * _pauli_string_matrix(term, len(ids))
+                for term, coefficient in cmd.gate.hamiltonian.terms.items()
+            )
+            eigenvalues, eigenvectors = np.linalg.eigh(hamiltonian)
+            matrix = (eigenvectors * np.exp(-1j * cmd.gate.time * eigenvalues)) @ eigenvectors.conj().T
+            self._recorded_gates.append((matrix, ids, ctrlids, hamiltonian))
+        else:
+            ids = [qb.id for qureg in cmd.qubits for qb in qureg]
+            matrix = np.asarray(cmd.gate.matrix, dtype=complex)
+            self._recorded_gates.append((matrix, ids, ctrlids, _GENERATORS.get(type(cmd.gate))))
+
+    def _get_matrix_handle(self, gate, matrix):
+        """
+        Return the handle of the gate matrix registered with the simulator backend.
+
+        Only the class-level matrices of gates with a fixed matrix (e.g., H, X) are registered, once per gate class, as
+        there is a bounded number of them. The matrices of all other gates (e.g., rotation gates) are passed to the
+        backend explicitly.
+
+        Args:
+            gate (BasicGate): Gate whose matrix is applied.
+            matrix (numpy.ndarray): Matrix of the gate.
+
+        Returns:
+            Integer handle of the matrix or None if the matrix is not a class-level matrix.
+        """
+        gate_class = type(gate)
+        if matrix is not getattr(gate_class, '_MATRIX', None):
+            return None
+        try:
+            return self._matrix_handles[gate_class]
+        except KeyError:
+            handle = self._simulator.register_matrix(matrix.tolist())
+            self._matrix_handles[gate_class] = handle
+            return handle
+
     def _handle(self, cmd):  # pylint: disable=too-many-branches,too-many-locals,too-many-statements
         """
         Handle all commands.
@@ -335,6 +842,11 @@ class Simulator(BasicEngine):
             Exception: If a non-single-qubit gate needs to be processed (which should never happen due to
                 is_available).
         """
+        if self._recorded_gates is not None:
+            self._record_gate(cmd)
+        if self._tape is not None:
+            self._tape.record(cmd)
+
         if cmd.gate == Measure:
             if get_control_count(cmd) != 0:
                 raise ValueError('Cannot have control qubits with a measurement gate!')
@@ -401,23 +913,28 @@ class Simulator(BasicEngine):
             qubitids = [qb.id for qb in cmd.qubits[0]]
             ctrlids = [qb.id for qb in cmd.control_qubits]
             self._simulator.emulate_time_evolution(op, time, qubitids, ctrlids)
-        elif len(cmd.gate.matrix) <= 2**5:
+        else:
             matrix = cmd.gate.matrix
+            if len(matrix) > 2**5:
+                raise Exception(
+                    "This simulator only supports controlled k-qubit gates with k < 6!\nPlease add an auto-replacer"
+                    " engine to your list of compiler engines."
+                )
             ids = [qb.id for qureg in cmd.qubits for qb in qureg]
-            if not 2 ** len(ids) == len(cmd.gate.matrix):
+            if not 2 ** len(ids) == len(matrix):
                 raise Exception(
-                    f"Simulator: Error applying {str(cmd.gate)} gate: {int(math.log(len(cmd.gate.matrix), 2))}-qubit"
+                    f"Simulator: Error applying {str(cmd.gate)} gate: {int(math.log(len(matrix), 2))}-qubit"
                     f" gate applied to {len(ids)} qubits."
                 )
-            self._simulator.apply_controlled_gate(matrix.tolist(), ids, [qb.id for qb in cmd.control_qubits])
+            ctrlids = [qb.id for qb in cmd.control_qubits]
+            handle = self._get_matrix_handle(cmd.gate, matrix)
+            if handle is None:
+                self._simulator.apply_controlled_gate(matrix.tolist(), ids, ctrlids)
+            else:
+                self._simulator.apply_controlled_gate_by_handle(handle, ids, ctrlids)
 
             if not self._gate_fusion:
                 self._simulator.run()
-        else:
-            raise Exception(
-                "This simulator only supports controlled k-qubit gates with k < 6!\nPlease add an auto-replacer"
-                " engine to your list of compiler engines."
-            )
 
     def receive(self, command_list):
         """
@@ -434,5 +951,5 @@ class Simulator(BasicEngine):
                 self._handle(cmd)
             else:
                 self._simulator.run()  # flush gate --> run all saved gates
-            if not self.is_last_engine:
-                self.send([cmd])
+        if not self.is_last_engine:
+            self.send(command_list)
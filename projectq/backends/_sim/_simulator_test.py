@@ -43,16 +43,23 @@ from projectq.ops import (
     BasicMathGate,
     Command,
     H,
+    HGate,
     MatrixGate,
     Measure,
+    Ph,
     QubitOperator,
+    R,
     Rx,
+    Rxx,
     Ry,
+    Ryy,
     Rz,
+    Rzz,
     S,
     TimeEvolution,
     Toffoli,
     X,
+    XGate,
     Y,
     Z,
 )
@@ -322,6 +329,34 @@ def test_simulator_kqubit_gate(sim):
         LargerGate() | (qureg + qubit)
 
 
+def test_simulator_matrix_handles(sim, monkeypatch):
+    def run_circuit(eng):
+        qureg = eng.allocate_qureg(2)
+        for _ in range(3):
+            H | qureg[0]
+            CNOT | (qureg[0], qureg[1])
+            Rx(0.3) | qureg[1]
+            Rx(0.3) | qureg[0]
+            MatrixGate([[0, 1j], [1j, 0]]) | qureg[0]
+        eng.flush()
+        return qureg
+
+    qureg = run_circuit(MainEngine(sim, []))
+    # one handle each for the class-level matrices of H and X, the other matrices are passed explicitly
+    assert sim._matrix_handles == {HGate: 0, XGate: 1}
+    wavefunction = sim.cheat()[1]
+
+    # without any handles, all matrices are passed to the backend explicitly
+    ref_sim = Simulator()
+    ref_sim._simulator = type(sim._simulator)(1)
+    monkeypatch.setattr(ref_sim, '_get_matrix_handle', lambda gate, matrix: None)
+    ref_qureg = run_circuit(MainEngine(ref_sim, []))
+    assert not ref_sim._matrix_handles
+    assert numpy.allclose(wavefunction, ref_sim.cheat()[1])
+    All(Measure) | qureg
+    All(Measure) | ref_qureg
+
+
 def test_simulator_kqubit_exception(sim):
     m1 = Rx(0.3).matrix
     m2 = Rx(0.8).matrix
@@ -370,6 +405,48 @@ def test_simulator_probability(sim, mapper):
     All(Measure) | qubits
 
 
+def test_simulator_probabilities(sim, mapper):
+    engine_list = [LocalOptimizer()]
+    if mapper is not None:
+        engine_list.append(mapper)
+    eng = MainEngine(sim, engine_list=engine_list)
+    qubits = eng.allocate_qureg(4)
+    extra_qubit = eng.allocate_qubit()
+    with pytest.raises(RuntimeError):
+        eng.backend.get_probabilities(extra_qubit)
+    H | qubits[1]
+    H | qubits[3]
+    Ry(2 * math.acos(math.sqrt(0.3))) | qubits[2]
+    eng.flush()
+
+    subset = [qubits[2], qubits[0], qubits[3]]
+    probabilities = eng.backend.get_probabilities(subset, as_array=True)
+    assert isinstance(probabilities, numpy.ndarray)
+    assert len(probabilities) == 8
+    for i, probability in enumerate(probabilities):
+        bits = [(i >> k) & 1 for k in range(3)]
+        assert probability == pytest.approx(eng.backend.get_probability(bits, subset))
+
+    probabilities = eng.backend.get_probabilities(subset)
+    assert len(probabilities) == 8
+    assert probabilities['000'] == pytest.approx(0.15)
+    assert probabilities['101'] == pytest.approx(0.35)
+    assert probabilities['010'] == pytest.approx(0.0)
+    assert sum(probabilities.values()) == pytest.approx(1.0)
+
+    probabilities = eng.backend.get_probabilities(subset, threshold=1.0e-12)
+    assert sorted(probabilities) == ['000', '001', '100', '101']
+    probabilities = eng.backend.get_probabilities(subset, top_k=2)
+    assert sorted(probabilities) == ['100', '101']
+    assert probabilities['100'] == pytest.approx(0.35)
+
+    with pytest.raises(ValueError):
+        eng.backend.get_probabilities(subset, as_array=True, top_k=2)
+    with pytest.raises(ValueError):
+        eng.backend.get_probabilities(subset, as_array=True, threshold=0.1)
+    All(Measure) | qubits + extra_qubit
+
+
 def test_simulator_amplitude(sim, mapper):
     engine_list = [LocalOptimizer()]
     if mapper is not None:
@@ -455,6 +532,154 @@ def test_simulator_expectation(sim, mapper):
     All(Measure) | qureg
 
 
+def _gradient_test_circuit(eng, qureg, params):
+    hamiltonian = QubitOperator('X0 Y1', 0.3) + QubitOperator('Z1', -0.7)
+    H | qureg[1]
+    Rx(params[0]) | qureg[0]
+    Ry(params[1]) | qureg[1]
+    CNOT | (qureg[0], qureg[2])
+    with Control(eng, qureg[1]):
+        Rz(params[2]) | qureg[2]
+        Ph(params[3]) | qureg[0]
+    Rxx(params[4]) | (qureg[0], qureg[2])
+    R(params[5]) | qureg[2]
+    with Control(eng, qureg[2]):
+        TimeEvolution(params[6], hamiltonian) | qureg[0:2]
+    Ryy(params[7]) | (qureg[2], qureg[1])
+    Rzz(params[8]) | (qureg[1], qureg[0])
+
+
+def test_simulator_expectation_gradient(sim, mapper):
+    engine_list = []
+    if mapper is not None:
+        engine_list.append(mapper)
+    eng = MainEngine(sim, engine_list=engine_list)
+    qureg = eng.allocate_qureg(3)
+    op = QubitOperator('X0 Z2', 0.5) + QubitOperator('Y1') + QubitOperator('Z0 Z1', -0.25)
+    params = [0.3, 1.2, -0.4, 0.8, 2.1, -1.3, 0.35, 0.7, -2.2]
+
+    with pytest.raises(RuntimeError):
+        sim.get_expectation_value_gradient(op, qureg)
+
+    eng.flush()
+    sim.start_gradient_recording()
+    _gradient_test_circuit(eng, qureg, params)
+    eng.flush()
+    expectation, gradient = sim.get_expectation_value_gradient(op, qureg)
+    assert expectation == pytest.approx(sim.get_expectation_value(op, qureg))
+    assert len(gradient) == len(params)
+
+    # the state is left unchanged
+    assert sim.get_expectation_value_gradient(op, qureg)[0] == pytest.approx(expectation)
+    with pytest.raises(Exception):
+        sim.get_expectation_value_gradient(QubitOperator('Z3'), qureg)
+    sim.stop_gradient_recording()
+
+    eps = 1.0e-5
+    for i in range(len(params)):
+        energies = []
+        for delta in (eps, -eps):
+            shifted = list(params)
+            shifted[i] += delta
+            sim.set_wavefunction([1] + [0] * 7, qureg)
+            _gradient_test_circuit(eng, qureg, shifted)
+            eng.flush()
+            energies.append(sim.get_expectation_value(op, qureg))
+        assert gradient[i] == pytest.approx((energies[0] - energies[1]) / (2 * eps), abs=1.0e-6)
+    All(Measure) | qureg
+
+
+def test_simulator_gradient_recording_exception(sim):
+    eng = MainEngine(sim, [])
+    qubit = eng.allocate_qubit()
+    eng.flush()
+    sim.start_gradient_recording()
+    with pytest.raises(RuntimeError):
+        BasicMathGate(lambda x: (x + 1,)) | qubit
+    with pytest.raises(RuntimeError):
+        Measure | qubit
+    # the wave function can only be changed directly before any gate has been recorded
+    sim.set_wavefunction([0, 1], qubit)
+    Rx(0.3) | qubit
+    eng.flush()
+    with pytest.raises(RuntimeError):
+        sim.set_wavefunction([1, 0], qubit)
+    with pytest.raises(RuntimeError):
+        sim.collapse_wavefunction(qubit, [1])
+    sim.stop_gradient_recording()
+
+    sim.start_tape_recording()
+    with pytest.raises(RuntimeError):
+        sim.set_wavefunction([1, 0], qubit)
+    with pytest.raises(RuntimeError):
+        sim.collapse_wavefunction(qubit, [1])
+    tape = sim.stop_tape_recording()
+    sim.start_tape_recording()
+    with pytest.raises(RuntimeError):
+        sim.run_tape(tape)
+    sim.stop_tape_recording()
+    Measure | qubit
+
+
+def test_simulator_tape(sim, mapper):
+    engine_list = [LocalOptimizer()]
+    if mapper is not None:
+        engine_list.append(mapper)
+    eng = MainEngine(sim, engine_list=engine_list)
+    qureg = eng.allocate_qureg(3)
+    op = QubitOperator('X0 Z2', 0.5) + QubitOperator('Y1') + QubitOperator('Z0 Z1', -0.25)
+    params = [0.3, 1.2, -0.4, 0.8, 2.1, -1.3, 0.35, 0.7, -2.2]
+    new_params = [-1.1, 0.4, 0.9, -0.2, 0.6, 1.7, -0.5, 1.3, 0.15]
+
+    with pytest.raises(RuntimeError):
+        sim.stop_tape_recording()
+    X | qureg[2]
+    eng.flush()
+    sim.start_tape_recording()
+    _gradient_test_circuit(eng, qureg, new_params)
+    H | qureg[2]
+    eng.flush()
+    tape = sim.stop_tape_recording()
+    assert tape.num_parameters == len(params)
+    assert len(tape.parameters) == len(params)
+    expected = sim.get_expectation_value(op, qureg)
+
+    sim.run_tape(tape, params)
+    sim.run_tape(tape)
+    assert sim.get_expectation_value(op, qureg) == pytest.approx(expected)
+    with pytest.raises(ValueError):
+        sim.run_tape(tape, params[:-1])
+
+    # the gradient recording picks up the replayed gates (and discards the gates recorded before)
+    sim.start_gradient_recording()
+    Rx(0.5) | qureg[0]
+    eng.flush()
+    sim.run_tape(tape, params)
+    expectation, gradient = sim.get_expectation_value_gradient(op, qureg)
+    sim.stop_gradient_recording()
+    assert len(gradient) == len(params)
+
+    sim.set_wavefunction([0, 0, 0, 0, 1, 0, 0, 0], qureg)
+    _gradient_test_circuit(eng, qureg, params)
+    H | qureg[2]
+    eng.flush()
+    assert expectation == pytest.approx(sim.get_expectation_value(op, qureg))
+
+    sim.start_gradient_recording()
+    sim.set_wavefunction([0, 0, 0, 0, 1, 0, 0, 0], qureg)
+    _gradient_test_circuit(eng, qureg, params)
+    H | qureg[2]
+    eng.flush()
+    assert gradient == pytest.approx(sim.get_expectation_value_gradient(op, qureg)[1])
+    sim.stop_gradient_recording()
+
+    sim.start_tape_recording()
+    with pytest.raises(RuntimeError):
+        Measure | qureg[0]
+    sim.stop_tape_recording()
+    All(Measure) | qureg
+
+
 def test_simulator_expectation_exception(sim):
     eng = MainEngine(sim, [])
     qureg = eng.allocate_qureg(3)
@@ -784,3 +1009,43 @@ def test_simulator_constant_math_emulation():
         ref = result[0]
         for res in result[1:]:
             assert ref == res
+
+
+def test_simulator_pysim_kernels():
+    if "cpp_simulator" not in get_available_simulators():
+        pytest.skip("No C++ simulator")
+        return
+
+    from projectq.backends._sim._cppsim import Simulator as CppSim
+    from projectq.backends._sim._pysim import Simulator as PySim
+
+    rng = numpy.random.RandomState(42)
+    cppsim = CppSim(1)
+    pysim = PySim(1)
+    num_qubits = 6
+    for qubit_id in range(num_qubits):
+        cppsim.allocate_qubit(qubit_id)
+        pysim.allocate_qubit(qubit_id)
+    wavefunction = rng.rand(2**num_qubits) + 1j * rng.rand(2**num_qubits)
+    wavefunction /= numpy.linalg.norm(wavefunction)
+    cppsim.set_wavefunction(wavefunction, list(range(num_qubits)))
+    pysim.set_wavefunction(wavefunction, list(range(num_qubits)))
+
+    for num_targets in (1, 1, 2, 3, 4):
+        for num_ctrls in (0, 1, 2):
+            qubit_ids = list(rng.permutation(num_qubits))
+            ids = qubit_ids[:num_targets]
+            ctrlids = qubit_ids[num_targets : num_targets + num_ctrls]  # noqa: E203
+            dim = 2**num_targets
+            matrix = numpy.linalg.qr(rng.rand(dim, dim) + 1j * rng.rand(dim, dim))[0].tolist()
+            cppsim.apply_controlled_gate(matrix, ids, ctrlids)
+            cppsim.run()
+            pysim.apply_controlled_gate(matrix, ids, ctrlids)
+            assert numpy.allclose(cppsim.cheat()[1], pysim.cheat()[1])
+
+    def math_fun(args):
+        return [(args[0] * 3 + args[1]) % 8, args[1] ^ 1]
+
+    for sim in (cppsim, pysim):
+        sim.emulate_math(math_fun, [[0, 2, 4], [5]], [1])
+    assert numpy.allclose(cppsim.cheat()[1], pysim.cheat()[1])
@@ -14,7 +14,6 @@
 
 """Contain a backend that saves the unitary of a quantum circuit."""
 
-import itertools
 import math
 import random
 import warnings
@@ -28,40 +27,47 @@ from projectq.ops import AllocateQubitGate, DeallocateQubitGate, FlushGate, Meas
 from projectq.types import WeakQubitRef
 
 
-def _qidmask(target_ids, control_ids, n_qubits):
+def _apply_controlled_gate(unitary, matrix, target_ids, control_ids, n_qubits):  # pylint: disable=too-many-locals
     """
-    Calculate index masks.
+    Apply a (controlled) gate to a unitary matrix in place, i.e., compute unitary <- gate @ unitary.
+
+    Instead of building the full 2^n x 2^n gate matrix, the rows of the unitary are viewed as a tensor of shape
+    (2, ..., 2, 2^n) (one axis per qubit). Fixing the control axes to 1 and the target axes to each of their 2^k
+    possible values yields 2^k views of the unitary, which are then combined according to the (non-zero) gate matrix
+    entries. This costs O(4^n * 2^k) operations for a k-qubit gate and never copies the unitary more than once.
 
     Args:
+        unitary (np.ndarray): C-contiguous complex matrix of shape (2^n, 2^n) to update
+        matrix (np.ndarray): gate matrix of shape (2^k, 2^k), where bit i of the index corresponds to target_ids[i]
         target_ids (list): list of target qubit indices
         control_ids (list): list of control qubit indices
-        control_state (list): list of states for the control qubits (0 or 1)
         n_qubits (int): number of qubits
     """
-    mask_list = []
-    perms = np.array([x[::-1] for x in itertools.product("01", repeat=n_qubits)]).astype(int)
-    all_ids = np.array(range(n_qubits))
-    irel_ids = np.delete(all_ids, control_ids + target_ids)
-
-    if len(control_ids) > 0:
-        cmask = np.where(np.all(perms[:, control_ids] == [1] * len(control_ids), axis=1))
-    else:
-        cmask = np.array(range(perms.shape[0]))
-
-    if len(irel_ids) > 0:
-        irel_perms = np.array([x[::-1] for x in itertools.product("01", repeat=len(irel_ids))]).astype(int)
-        for i in range(2 ** len(irel_ids)):
-            irel_mask = np.where(np.all(perms[:, irel_ids] == irel_perms[i], axis=1))
-            common = np.intersect1d(irel_mask, cmask)
-            if len(common) > 0:
-                mask_list.append(common)
-    else:
-        irel_mask = np.array(range(perms.shape[0]))
-        mask_list.append(np.intersect1d(irel_mask, cmask))
-    return mask_list
-
-
-class UnitarySimulator(BasicEngine):
+    matrix = np.asarray(matrix, dtype=complex)
+    tensor = unitary.reshape((2,) * n_qubits + (-1,))
+    # qubit at index i corresponds to axis n_qubits - 1 - i of the tensor (the last axis holds the columns)
+    index = [slice(None)] * (n_qubits + 1)
+    for qubit_id in control_ids:
+        index[n_qubits - 1 - qubit_id] = 1
+
+    views = []
+    for bits in range(len(matrix)):
+        for i, qubit_id in enumerate(target_ids):
+            index[n_qubits - 1 - qubit_id] = (bits >> i) & 1
+        views.append(tensor[tuple(index)])
+    old_views = [view.copy() for view in views]
+
+    for row, view in enumerate(views):
+        columns = np.flatnonzero(matrix[row])
+        if len(columns) == 0:
+            view[...] = 0
+            continue
+        np.multiply(old_views[columns[0]], matrix[row, columns[0]], out=view)
+        for col in columns[1:]:
+            view += matrix[row, col] * old_views[col]
+
+
+class UnitarySimulator(BasicEngine):  # pylint: disable=too-many-instance-attributes
     """
     Simulator engine aimed at calculating the unitary transformation that represents the current quantum circuit.
 
@@ -86,17 +92,30 @@ class UnitarySimulator(BasicEngine):
             eng.deallocate_qubit(qureg[1])
 
             X | qureg[0]  # WARNING: appending gate after measurements or deallocations resets the unitary
+
+        By default, the unitary grows by one qubit with every allocation. If the width of the circuit is known in
+        advance, it can be declared with the `num_qubits` argument so that the unitary is padded only once: allocated
+        qubits are then simply mapped onto the preallocated register (the unitary acts as identity on the unused
+        qubits). Allocating more qubits than declared grows the register as usual.
     """
 
-    def __init__(self):
-        """Initialize a UnitarySimulator object."""
+    def __init__(self, num_qubits=None):
+        """
+        Initialize a UnitarySimulator object.
+
+        Args:
+            num_qubits (int): Number of qubits to preallocate the unitary for (default: None, i.e., grow the unitary
+                with every qubit allocation)
+        """
         super().__init__()
         self._qubit_map = {}
-        self._unitary = [1]
         self._num_qubits = 0
+        self._num_preallocated = num_qubits or 0
+        self._num_positions = self._num_preallocated
+        self._unitary = np.identity(2**self._num_positions, dtype=complex)
+        self._state = self._unitary[:, 0].copy()
         self._is_valid = True
         self._is_flushed = False
-        self._state = [1]
         self._history = []
 
     @property
@@ -173,7 +192,8 @@ class UnitarySimulator(BasicEngine):
         """Flush the simulator state."""
         if not self._is_flushed:
             self._is_flushed = True
-            self._state = self._unitary @ self._state
+            # The unitary always acts on the all-zero state it was (re)started from
+            self._state = self._unitary[:, 0].copy()
 
     def _handle(self, cmd):
         """
@@ -188,8 +208,8 @@ class UnitarySimulator(BasicEngine):
         if isinstance(cmd.gate, AllocateQubitGate):
             self._qubit_map[cmd.qubits[0][0].id] = self._num_qubits
             self._num_qubits += 1
-            self._unitary = np.kron(np.identity(2), self._unitary)
-            self._state.extend([0] * len(self._state))
+            if self._num_qubits > self._num_positions:
+                self._add_position()
 
         elif isinstance(cmd.gate, DeallocateQubitGate):
             pos = self._qubit_map[cmd.qubits[0][0].id]
@@ -230,20 +250,29 @@ class UnitarySimulator(BasicEngine):
                     "previous unitary can be accessed in history"
                 )
                 self._history.append(self._unitary)
-                self._unitary = np.identity(2**self._num_qubits, dtype=complex)
-                self._state = np.array([1] + ([0] * (2**self._num_qubits - 1)), dtype=complex)
+                self._num_positions = max(self._num_qubits, self._num_preallocated)
+                self._unitary = np.identity(2**self._num_positions, dtype=complex)
+                self._state = self._unitary[:, 0].copy()
                 self._is_valid = True
 
             self._is_flushed = False
-            mask_list = _qidmask(
+            _apply_controlled_gate(
+                self._unitary,
+                cmd.gate.matrix,
                 [self._qubit_map[qb.id] for qr in cmd.qubits for qb in qr],
                 [self._qubit_map[qb.id] for qb in cmd.control_qubits],
-                self._num_qubits,
+                self._num_positions,
             )
-            for mask in mask_list:
-                cache = np.identity(2**self._num_qubits, dtype=complex)
-                cache[np.ix_(mask, mask)] = cmd.gate.matrix
-                self._unitary = cache @ self._unitary
+
+    def _add_position(self):
+        """Add one qubit position to the unitary and the state, i.e., compute unitary <- 1 (x) unitary."""
+        dim = len(self._state)
+        unitary = np.zeros((2 * dim, 2 * dim), dtype=complex)
+        unitary[:dim, :dim] = self._unitary
+        unitary[dim:, dim:] = self._unitary
+        self._unitary = unitary
+        self._state = np.concatenate((self._state, np.zeros(dim, dtype=complex)))
+        self._num_positions += 1
 
     def measure_qubits(self, ids):
         """
@@ -255,31 +284,20 @@ class UnitarySimulator(BasicEngine):
         Returns:
             List of measurement results (containing either True or False).
         """
-        random_outcome = random.random()
-        val = 0.0
-        i_picked = 0
-        while val < random_outcome and i_picked < len(self._state):
-            val += np.abs(self._state[i_picked]) ** 2
-            i_picked += 1
-
-        i_picked -= 1
+        probabilities = np.abs(self._state) ** 2
+        i_picked = int(np.searchsorted(np.cumsum(probabilities), random.random()))
+        i_picked = min(i_picked, len(self._state) - 1)
 
         pos = [self._qubit_map[ID] for ID in ids]
-        res = [False] * len(pos)
+        res = [((i_picked >> _pos) & 1) == 1 for _pos in pos]
 
         mask = 0
         val = 0
-        for i, _pos in enumerate(pos):
-            res[i] = ((i_picked >> _pos) & 1) == 1
+        for _pos, _res in zip(pos, res):
             mask |= 1 << _pos
-            val |= (res[i] & 1) << _pos
-
-        nrm = 0.0
-        for i, _state in enumerate(self._state):
-            if (mask & i) != val:
-                self._state[i] = 0.0
-            else:
-                nrm += np.abs(_state) ** 2
+            val |= int(_res) << _pos
 
-        self._state *= 1.0 / np.sqrt(nrm)
+        outcome_mask = (np.arange(len(self._state)) & mask) == val
+        self._state[~outcome_mask] = 0.0
+        self._state *= 1.0 / np.sqrt(np.sum(probabilities[outcome_mask]))
         return res
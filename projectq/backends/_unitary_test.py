@@ -41,7 +41,7 @@ from projectq.ops import (
 )
 from projectq.types import WeakQubitRef
 
-from ._unitary import UnitarySimulator
+from ._unitary import UnitarySimulator, _apply_controlled_gate
 
 
 def test_unitary_is_available():
@@ -196,6 +196,29 @@ def test_unitary_after_deallocation_or_measurement():
     assert np.allclose(eng.backend.unitary, Y.matrix)
 
 
+def test_unitary_apply_controlled_gate():
+    n_qubits = 5
+    target_ids = [3, 1]
+    control_ids = [4, 0]
+    matrix = unitary_group.rvs(4)
+
+    reference = np.zeros((2**n_qubits, 2**n_qubits), dtype=complex)
+    for col in range(2**n_qubits):
+        if not all((col >> qubit_id) & 1 for qubit_id in control_ids):
+            reference[col, col] = 1
+            continue
+        base = col & ~sum(1 << qubit_id for qubit_id in target_ids)
+        col_bits = sum(((col >> qubit_id) & 1) << i for i, qubit_id in enumerate(target_ids))
+        for row_bits in range(4):
+            row = base | sum(((row_bits >> i) & 1) << qubit_id for i, qubit_id in enumerate(target_ids))
+            reference[row, col] = matrix[row_bits, col_bits]
+
+    unitary = unitary_group.rvs(2**n_qubits)
+    expected = reference @ unitary
+    _apply_controlled_gate(unitary, matrix, target_ids, control_ids, n_qubits)
+    assert np.allclose(unitary, expected)
+
+
 def test_unitary_simulator():
     def create_random_unitary(n):
         return unitary_group.rvs(2**n)
@@ -290,3 +313,29 @@ def test_unitary_measure_mapped_qubit():
     with pytest.raises(NotYetMeasuredError):
         int(qb1)
     assert int(qb2) == 1
+
+
+def test_unitary_preallocated():
+    eng = MainEngine(backend=UnitarySimulator(num_qubits=3), engine_list=[])
+    assert eng.backend.unitary.shape == (8, 8)
+
+    qureg = eng.allocate_qureg(2)
+    X | qureg[0]
+    CNOT | (qureg[0], qureg[1])
+    eng.flush()
+    cnot = np.array([[1, 0, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0], [0, 1, 0, 0]])
+    assert np.allclose(eng.backend.unitary, np.kron(np.identity(2), cnot @ np.kron(np.identity(2), X.matrix)))
+
+    # Allocating beyond the preallocated width grows the register
+    qureg += eng.allocate_qureg(2)
+    H | qureg[3]
+    eng.flush()
+    assert eng.backend.unitary.shape == (16, 16)
+
+    All(Measure) | qureg
+    assert [int(qubit) for qubit in qureg[:3]] == [1, 1, 0]
+
+    eng.deallocate_qubit(qureg[3])
+    with pytest.warns(UserWarning):
+        X | qureg[2]
+    assert eng.backend.unitary.shape == (8, 8)
@@ -22,11 +22,13 @@ from ._basicmapper import BasicMapperEngine  # isort:skip
 
 # isort: split
 
+from ._compilecache import CompileCache
 from ._ibm5qubitmapper import IBM5QubitMapper
 from ._linearmapper import LinearMapper, return_swap_depth
 from ._main import MainEngine, NotYetMeasuredError, UnsupportedEngineError
 from ._manualmapper import ManualMapper
 from ._optimize import LocalOptimizer
+from ._profiling import EngineProfiler, EngineStatistics
 from ._replacer import (
     AutoReplacer,
     DecompositionRule,
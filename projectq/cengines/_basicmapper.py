@@ -17,6 +17,7 @@ The parent class from which all mappers should be derived.
 There is only one engine currently allowed to be derived from BasicMapperEngine. This allows the simulator to
 automatically translate logical qubit ids to mapped ids.
 """
+
 from copy import deepcopy
 
 from projectq.meta import LogicalQubitIDTag, drop_engine_after, insert_engine
@@ -59,15 +60,17 @@ class BasicMapperEngine(BasicEngine):
         Args:
             cmd: Command object with logical qubit ids.
         """
+        # Only look up ids in the mapping (the current_mapping property returns a copy)
+        current_mapping = self._current_mapping
         new_cmd = deepcopy(cmd)
         qubits = new_cmd.qubits
         for qureg in qubits:
             for qubit in qureg:
                 if qubit.id != -1:
-                    qubit.id = self.current_mapping[qubit.id]
+                    qubit.id = current_mapping[qubit.id]
         control_qubits = new_cmd.control_qubits
         for qubit in control_qubits:
-            qubit.id = self.current_mapping[qubit.id]
+            qubit.id = current_mapping[qubit.id]
         if isinstance(new_cmd.gate, MeasureGate):
             # Add LogicalQubitIDTag to MeasureGate
             def add_logical_id(command, old_tags=deepcopy(cmd.tags)):
@@ -15,6 +15,7 @@
 """Module containing the basic definition of a compiler engine."""
 
 from projectq.ops import Allocate, Command, Deallocate
+from projectq.ops._basics import _has_value_equality
 from projectq.types import Qubit, Qureg, WeakQubitRef
 
 
@@ -60,6 +61,8 @@ class BasicEngine:
         self.main_engine = None
         self.next_engine = None
         self.is_last_engine = False
+        self._capability_cache = {}
+        self._capability_cache_config = None
 
     def is_available(self, cmd):
         """
@@ -68,6 +71,9 @@ class BasicEngine:
         Default implementation of is_available: Ask the next engine whether a command is available, i.e., whether it can
         be executed by the next engine(s).
 
+        If the MainEngine caches capabilities (see MainEngine), the answer of the next engines is stored and reused for
+        all commands with the same gate, register sizes, control count, control state and tag types.
+
         Args:
             cmd (Command): Command for which to check availability.
 
@@ -77,9 +83,21 @@ class BasicEngine:
         Raises:
             LastEngineException: If is_last_engine is True but is_available is not implemented.
         """
-        if not self.is_last_engine:
+        if self.is_last_engine:
+            raise LastEngineException(self)
+
+        cache = self._get_capability_cache()
+        if cache is None:
+            return self.next_engine.is_available(cmd)
+        key = _get_capability_key(cmd)
+        if key is None:
             return self.next_engine.is_available(cmd)
-        raise LastEngineException(self)
+        try:
+            return cache[key]
+        except KeyError:
+            available = self.next_engine.is_available(cmd)
+            cache[key] = available
+            return available
 
     def allocate_qubit(self, dirty=False):
         """
@@ -171,21 +189,75 @@ class BasicEngine:
             supported (bool): True if one of the further compiler engines is a meta tag handler, i.e.,
             engine.is_meta_tag_handler(meta_tag) returns True.
         """
+        cache = self._get_capability_cache()
+        if cache is not None and ('meta_tag', meta_tag) in cache:
+            return cache['meta_tag', meta_tag]
+
+        supported = False
         engine = self
         while engine is not None:
             try:
                 if engine.is_meta_tag_handler(meta_tag):
-                    return True
+                    supported = True
+                    break
             except AttributeError:
                 pass
             engine = engine.next_engine
-        return False
+
+        if cache is not None:
+            cache['meta_tag', meta_tag] = supported
+        return supported
+
+    def _get_capability_cache(self):
+        """
+        Return the cache of capability queries answered by the engines after this one.
+
+        The cache is emptied whenever the configuration of the engine chain changed since it was filled.
+
+        Returns:
+            Dictionary of cached capabilities or None if the MainEngine does not cache capabilities.
+        """
+        config = getattr(self.main_engine, '_capability_config', None)
+        if config is None:
+            return None
+        if getattr(self, '_capability_cache_config', None) is not config:
+            self._capability_cache = {}
+            self._capability_cache_config = config
+        return self._capability_cache
 
     def send(self, command_list):
         """Forward the list of commands to the next engine in the pipeline."""
         self.next_engine.receive(command_list)
 
 
+def _get_capability_key(cmd):
+    """
+    Return the key under which the availability of a command is cached.
+
+    Args:
+        cmd (Command): Command for which to check availability.
+
+    Returns:
+        Hashable key or None if the command cannot be cached (e.g. unhashable gate or gate whose equality does not
+        imply that it is the same operation, see _has_value_equality).
+    """
+    if not _has_value_equality(cmd.gate):
+        return None
+    key = (
+        type(cmd.gate),
+        cmd.gate,
+        tuple(len(qureg) for qureg in cmd.qubits),
+        len(cmd.control_qubits),
+        cmd.control_state,
+        tuple(type(tag) for tag in cmd.tags),
+    )
+    try:
+        hash(key)
+    except (TypeError, NotImplementedError):
+        return None
+    return key
+
+
 class ForwarderEngine(BasicEngine):
     """
     A ForwarderEngine is a trivial engine which forwards all commands to the next engine.
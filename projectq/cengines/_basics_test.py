@@ -19,9 +19,10 @@ import pytest
 
 from projectq import MainEngine
 from projectq.cengines import DummyEngine, InstructionFilter, _basics
-from projectq.meta import DirtyQubitTag
+from projectq.meta import Control, DirtyQubitTag
 from projectq.ops import (
     AllocateQubitGate,
+    BasicGate,
     ClassicalInstructionGate,
     DeallocateQubitGate,
     FastForwardingGate,
@@ -171,6 +172,70 @@ def test_basic_engine_is_meta_tag_supported():
     assert main_engine.is_meta_tag_supported(DirtyQubitTag)
 
 
+def test_basic_engine_capability_cache():
+    queries = []
+
+    def low_level_filter(self, cmd):
+        queries.append(cmd)
+        return cmd.gate == H or len(cmd.qubits[0]) == 1
+
+    def allow_dirty_qubits(self, meta_tag):
+        queries.append(meta_tag)
+        return meta_tag == DirtyQubitTag
+
+    backend = DummyEngine()
+    backend.is_meta_tag_handler = types.MethodType(allow_dirty_qubits, backend)
+    main_engine = MainEngine(
+        backend=backend, engine_list=[InstructionFilter(low_level_filter)], cache_capabilities=True
+    )
+    qureg = main_engine.allocate_qureg(2)
+    cmd = _basics.Command(main_engine, H, (qureg[:1],))
+    assert main_engine.is_available(cmd)
+    assert main_engine.is_available(_basics.Command(main_engine, H, (qureg[1:],)))
+    assert main_engine.is_available(_basics.Command(main_engine, H, (qureg,)))
+    assert len(queries) == 2
+    assert main_engine.is_meta_tag_supported(DirtyQubitTag)
+    assert main_engine.is_meta_tag_supported(DirtyQubitTag)
+    assert len(queries) == 3
+
+    # Engines which only forward capability queries do not invalidate the cache
+    with Control(main_engine, qureg[0]):
+        assert main_engine.is_available(cmd)
+    assert len(queries) == 3
+
+    main_engine.clear_capability_cache()
+    assert main_engine.is_available(cmd)
+    assert len(queries) == 4
+
+    # Commands with unhashable gates are not cached
+    class UnhashableGate(BasicGate):
+        def __str__(self):
+            raise NotImplementedError
+
+    unhashable_cmd = _basics.Command(main_engine, UnhashableGate(), (qureg[:1],))
+    assert main_engine.is_available(unhashable_cmd)
+    assert main_engine.is_available(unhashable_cmd)
+    assert len(queries) == 6
+
+    # Commands with gates whose equality only compares their classes are not cached either
+    class ParamGate(BasicGate):
+        def __init__(self, param):
+            super().__init__()
+            self.param = param
+
+        def __str__(self):
+            return 'ParamGate'
+
+    main_engine = MainEngine(
+        backend=DummyEngine(),
+        engine_list=[InstructionFilter(lambda self, cmd: getattr(cmd.gate, 'param', 0) < 2)],
+        cache_capabilities=True,
+    )
+    qubit = main_engine.allocate_qubit()
+    assert main_engine.is_available(_basics.Command(main_engine, ParamGate(1), (qubit,)))
+    assert not main_engine.is_available(_basics.Command(main_engine, ParamGate(2), (qubit,)))
+
+
 def test_forwarder_engine():
     backend = DummyEngine(save_commands=True)
     engine0 = DummyEngine()
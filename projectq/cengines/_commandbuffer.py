@@ -0,0 +1,131 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Contains a command buffer with a per-qubit index of its front layer, used by the mappers."""
+
+import heapq
+from collections import deque
+
+
+class CommandBuffer:
+    """
+    Ordered buffer of commands which keeps track of its front layer.
+
+    The buffer stores the commands in the order in which they were appended, together with one queue of commands per
+    qubit. A command is part of the front layer (i.e., it is ready) if it is the first command in the queues of all
+    its qubits, i.e., if all the preceding commands acting on any of its qubits have been removed from the buffer.
+    Only ready commands can be removed, which makes their successors ready in turn. Finding the commands which can be
+    executed thus only requires looking at the front layer instead of scanning the whole buffer.
+
+    The buffer behaves like a list of the stored commands for iteration, len() and comparisons.
+    """
+
+    def __init__(self, commands=()):
+        """
+        Initialize a CommandBuffer.
+
+        Args:
+            commands (iterable<Command>): Initial commands of the buffer.
+        """
+        self._commands = {}
+        self._qubit_ids = {}
+        self._queues = {}
+        self._num_predecessors = {}
+        self._ready = set()
+        self._next_index = 0
+        for cmd in commands:
+            self.append(cmd)
+
+    def __len__(self):
+        """Return the number of commands in the buffer."""
+        return len(self._commands)
+
+    def __iter__(self):
+        """Iterate over the commands in the order in which they were appended."""
+        return iter(self._commands.values())
+
+    def __eq__(self, other):
+        """Compare the stored commands with those of another buffer or list."""
+        if isinstance(other, (CommandBuffer, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        """Return a string representation of the object."""
+        return f'CommandBuffer({list(self)!r})'
+
+    def append(self, cmd):
+        """
+        Append a command at the end of the buffer.
+
+        Args:
+            cmd (Command): Command to append.
+        """
+        index = self._next_index
+        self._next_index += 1
+        qubit_ids = {qubit.id for qureg in cmd.all_qubits for qubit in qureg}
+        self._commands[index] = cmd
+        self._qubit_ids[index] = qubit_ids
+        num_predecessors = 0
+        for qubit_id in qubit_ids:
+            queue = self._queues.setdefault(qubit_id, deque())
+            if queue:
+                num_predecessors += 1
+            queue.append(index)
+        if num_predecessors:
+            self._num_predecessors[index] = num_predecessors
+        else:
+            self._ready.add(index)
+
+    def get_command(self, index):
+        """Return the command with the given index."""
+        return self._commands[index]
+
+    def get_ready_indices(self):
+        """
+        Return the indices of the commands in the front layer as a heap.
+
+        The indices reflect the order of the commands in the buffer, i.e., popping the indices from the heap (using
+        heapq.heappop) yields the ready commands in their order in the buffer.
+        """
+        ready_indices = list(self._ready)
+        heapq.heapify(ready_indices)
+        return ready_indices
+
+    def remove(self, index):
+        """
+        Remove a ready command from the buffer.
+
+        Args:
+            index (int): Index of the command (see get_ready_indices).
+
+        Returns:
+            List of the indices of the commands which became ready.
+        """
+        self._ready.remove(index)
+        del self._commands[index]
+        newly_ready = []
+        for qubit_id in self._qubit_ids.pop(index):
+            queue = self._queues[qubit_id]
+            queue.popleft()
+            if not queue:
+                del self._queues[qubit_id]
+                continue
+            successor = queue[0]
+            self._num_predecessors[successor] -= 1
+            if self._num_predecessors[successor] == 0:
+                del self._num_predecessors[successor]
+                self._ready.add(successor)
+                newly_ready.append(successor)
+        return newly_ready
@@ -0,0 +1,63 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""Tests for projectq.cengines._commandbuffer.py."""
+
+import heapq
+
+from projectq.cengines._commandbuffer import CommandBuffer
+from projectq.ops import Allocate, Command, H, X
+from projectq.types import WeakQubitRef
+
+
+def test_command_buffer_list_behaviour():
+    qb0 = WeakQubitRef(engine=None, idx=0)
+    cmd0 = Command(None, Allocate, ([qb0],))
+    cmd1 = Command(None, H, ([qb0],))
+    buffer = CommandBuffer([cmd0])
+    buffer.append(cmd1)
+    assert len(buffer) == 2
+    assert list(buffer) == [cmd0, cmd1]
+    assert buffer == [cmd0, cmd1]
+    assert buffer == CommandBuffer([cmd0, cmd1])
+    assert buffer != [cmd1, cmd0]
+    assert buffer != (cmd0, cmd1)
+    assert 'CommandBuffer([' in repr(buffer)
+    assert not CommandBuffer()
+
+
+def test_command_buffer_front_layer():
+    qb0 = WeakQubitRef(engine=None, idx=0)
+    qb1 = WeakQubitRef(engine=None, idx=1)
+    qb2 = WeakQubitRef(engine=None, idx=2)
+    cmd0 = Command(None, H, ([qb0],))
+    cmd1 = Command(None, H, ([qb1],))
+    cmd2 = Command(None, X, ([qb1],), controls=[qb0])
+    cmd3 = Command(None, H, ([qb2],))
+    cmd4 = Command(None, H, ([qb0],))
+    buffer = CommandBuffer([cmd0, cmd1, cmd2, cmd3, cmd4])
+    ready_indices = buffer.get_ready_indices()
+    assert [heapq.heappop(ready_indices) for _ in range(3)] == [0, 1, 3]
+    assert buffer.get_command(1) is cmd1
+    # cmd2 still waits for cmd0
+    assert buffer.remove(1) == []
+    assert buffer.remove(0) == [2]
+    assert buffer == [cmd2, cmd3, cmd4]
+    assert buffer.remove(2) == [4]
+    assert sorted(buffer.get_ready_indices()) == [3, 4]
+    buffer.remove(4)
+    buffer.remove(3)
+    assert len(buffer) == 0
+    # a qubit without stored commands does not block new commands
+    buffer.append(cmd0)
+    assert buffer.get_ready_indices() == [5]
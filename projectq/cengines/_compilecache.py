@@ -0,0 +1,378 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Contains a persistent cache of compiled command streams used by the MainEngine."""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import types
+
+import numpy as np
+
+from projectq.backends._recorder import decode_commands, encode_commands
+from projectq.ops import FlushGate
+
+from ._basics import BasicEngine
+
+_MAX_FINGERPRINT_DEPTH = 12
+_ENGINE_LINK_ATTRIBUTES = (
+    'next_engine',
+    'main_engine',
+    'is_last_engine',
+    '_capability_cache',
+    '_capability_cache_config',
+)
+# Attributes memoizing results computed during a compilation (or holding scratch state), which are not part of the
+# configuration of an object and are thus not fingerprinted
+_MEMO_ATTRIBUTES = (
+    '_candidates_cache',
+    '_controlstate_rule',
+    '_expansion_cache',
+    '_recorded_commands',
+)
+
+
+def _fingerprint(obj, memo, depth=0):
+    """
+    Return a string describing the configuration of an object.
+
+    The string only depends on the values of the object (and not on memory addresses), so it is identical across
+    Python processes for identically configured objects.
+
+    Args:
+        obj (object): Object to describe.
+        memo (dict): Descriptions of the objects described so far, indexed by their id (None for objects which are
+            currently being described, i.e., references back to them are cycles).
+        depth (int): Current recursion depth.
+    """
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes)):
+        return repr(obj)
+    if isinstance(obj, type):
+        return f'{obj.__module__}.{obj.__qualname__}'
+    if isinstance(obj, np.ndarray):
+        return f'array({obj.dtype},{obj.shape},{hashlib.sha256(obj.tobytes()).hexdigest()})'
+    if depth > _MAX_FINGERPRINT_DEPTH or isinstance(obj, BasicEngine):
+        return type(obj).__qualname__
+    if id(obj) in memo:
+        return memo[id(obj)][1] or type(obj).__qualname__
+    # keep a reference to obj such that its id is not reused while describing other objects
+    memo[id(obj)] = (obj, None)
+    description = _describe(obj, memo, depth + 1)
+    memo[id(obj)] = (obj, description)
+    return description
+
+
+def _describe(obj, memo, depth):  # pylint: disable=too-many-return-statements
+    """Return the description of a container, function or other object (see _fingerprint)."""
+    if isinstance(obj, (list, tuple)):
+        return '[' + ','.join(_fingerprint(item, memo, depth) for item in obj) + ']'
+    if isinstance(obj, (set, frozenset)):
+        return '{' + ','.join(sorted(_fingerprint(item, memo, depth) for item in obj)) + '}'
+    if isinstance(obj, dict):
+        items = (_fingerprint(key, memo, depth) + ':' + _fingerprint(value, memo, depth) for key, value in obj.items())
+        return '{' + ','.join(sorted(items)) + '}'
+    if isinstance(obj, types.CodeType):
+        return obj.co_code.hex() + _fingerprint(obj.co_consts, memo, depth) + _fingerprint(obj.co_names, memo, depth)
+    if isinstance(obj, types.FunctionType):
+        closure = [cell.cell_contents for cell in obj.__closure__ or ()]
+        return f'{obj.__module__}.{obj.__qualname__}' + _fingerprint(
+            [obj.__code__, obj.__defaults__, closure], memo, depth
+        )
+    if isinstance(obj, types.MethodType):
+        return _fingerprint(obj.__func__, memo, depth) + _fingerprint(obj.__self__, memo, depth)
+    attributes = dict(getattr(obj, '__dict__', {}))
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(obj, name) and name != '__weakref__':
+                attributes[name] = getattr(obj, name)
+    for name in _MEMO_ATTRIBUTES:
+        attributes.pop(name, None)
+    return type(obj).__qualname__ + _fingerprint(attributes, memo, depth)
+
+
+def get_engine_fingerprint(engines):
+    """
+    Return a fingerprint of the configuration of a list of compiler engines.
+
+    The fingerprint covers the classes and attributes of the engines (e.g., their decomposition rule sets, filter
+    functions and mapper settings), but neither the links between the engines nor the results they memoize while
+    compiling (e.g., the rule candidates of a DecompositionRuleSet).
+
+    Args:
+        engines (list<BasicEngine>): Engines to describe.
+
+    Returns:
+        Hexadecimal SHA-256 digest of the configuration.
+    """
+    description = []
+    for engine in engines:
+        attributes = {
+            name: value
+            for name, value in vars(engine).items()
+            if name not in _ENGINE_LINK_ATTRIBUTES and name not in _MEMO_ATTRIBUTES
+        }
+        description.append(_fingerprint(type(engine), {}) + _fingerprint(attributes, {}))
+    return hashlib.sha256('\n'.join(description).encode()).hexdigest()
+
+
+class CompileCache:
+    """
+    Persistent on-disk cache of compiled command streams.
+
+    Entries are stored as individual files in a directory. Whenever the total size of the entries exceeds max_size,
+    the least recently used entries are evicted. The cache is used by the MainEngine (see MainEngine(...,
+    compile_cache=...)) and can be shared between processes and machines (e.g., using a network file system).
+
+    Note:
+        Entries are unpickled when they are loaded, so only use cache directories which are not writable by untrusted
+        users.
+
+    Attributes:
+        directory (str): Directory containing the cache entries.
+        max_size (int): Maximal total size (in bytes) of the cache entries.
+        hits (int): Number of entries found by load().
+        misses (int): Number of entries not found by load().
+    """
+
+    _SUFFIX = '.pqcache'
+
+    def __init__(self, directory, max_size=2**28):
+        """
+        Initialize a CompileCache.
+
+        Args:
+            directory (str): Directory containing the cache entries (created if it does not exist).
+            max_size (int): Maximal total size (in bytes) of the cache entries. Defaults to 256 MiB.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _get_filename(self, key):
+        """Return the name of the file storing the entry with the given key."""
+        return os.path.join(self.directory, key + self._SUFFIX)
+
+    def load(self, key):
+        """
+        Load a cache entry and mark it as recently used.
+
+        Args:
+            key (str): Key of the entry.
+
+        Returns:
+            The stored object or None if there is no entry with the given key.
+        """
+        filename = self._get_filename(key)
+        try:
+            with open(filename, 'rb') as file:
+                entry = pickle.load(file)
+            os.utime(filename)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def store(self, key, entry):
+        """
+        Store a cache entry and evict the least recently used entries if the cache exceeds its maximal size.
+
+        Args:
+            key (str): Key of the entry.
+            entry (object): Picklable object to store.
+        """
+        file_descriptor, tmp_filename = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(file_descriptor, 'wb') as file:
+            pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filename, self._get_filename(key))
+        self._evict()
+
+    def _evict(self):
+        """Delete the least recently used entries until the cache does not exceed its maximal size."""
+        entries = []
+        total_size = 0
+        with os.scandir(self.directory) as directory_entries:
+            for directory_entry in directory_entries:
+                if directory_entry.name.endswith(self._SUFFIX):
+                    stat = directory_entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, directory_entry.path))
+                    total_size += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:  # pragma: no cover
+                continue
+            total_size -= size
+
+    def clear(self):
+        """Delete all cache entries."""
+        self.max_size, max_size = -1, self.max_size
+        try:
+            self._evict()
+        finally:
+            self.max_size = max_size
+
+
+class CompileCacheOutput(BasicEngine):
+    """
+    Engine placed in front of the backend by the MainEngine if a compile cache is used.
+
+    It records the compiled commands while a segment is being compiled and drops all commands while the compiler
+    engines are brought up to date (see CompileCacheInput).
+    """
+
+    def __init__(self):
+        """Initialize a CompileCacheOutput engine."""
+        super().__init__()
+        self.recording = None
+        self.discard = False
+
+    def receive(self, command_list):
+        """
+        Receive a list of commands.
+
+        Args:
+            command_list (list<Command>): List of commands to record and send on to the backend.
+        """
+        if self.recording is not None:
+            self.recording.extend(command_list)
+        if not self.discard:
+            self.send(command_list)
+
+
+class CompileCacheInput(BasicEngine):  # pylint: disable=too-many-instance-attributes
+    """
+    Engine placed in front of the compiler engines by the MainEngine if a compile cache is used.
+
+    The engine buffers all commands until a FlushGate is received (or send_segment() is called) and then looks up the
+    compiled commands of this segment in the cache. The key of a segment is a hash of all commands received so far
+    (in all previous segments) and of the fingerprint of the compiler engines. On a hit, the stored commands are sent
+    directly to the backend. On a miss, the segment is compiled and the resulting commands are stored in the cache.
+
+    As the compiler engines do not see the segments found in the cache, these segments are sent through the compiler
+    engines (dropping their output) before compiling the next segment which is not found in the cache. The mapping of
+    a mapper is stored with each entry and updated on every hit.
+    """
+
+    def __init__(self, cache, output_engine, fingerprint, batch_size=1024):
+        """
+        Initialize a CompileCacheInput engine.
+
+        Args:
+            cache (CompileCache): Cache storing the compiled segments.
+            output_engine (CompileCacheOutput): Engine in front of the backend.
+            fingerprint (str): Fingerprint of the compiler engines and the backend (see get_engine_fingerprint).
+            batch_size (int): Maximal number of cached commands sent to the backend at once.
+        """
+        super().__init__()
+        self._cache = cache
+        self._output = output_engine
+        self._key = hashlib.sha256(fingerprint.encode()).digest()
+        self._batch_size = batch_size
+        self._buffer = []
+        self._pending_segments = []
+        self._pending_mapping = None
+
+    def receive(self, command_list):
+        """
+        Receive a list of commands.
+
+        The commands are buffered until a FlushGate is received.
+
+        Args:
+            command_list (list<Command>): List of commands to receive.
+        """
+        self._buffer += command_list
+        for cmd in command_list:
+            if isinstance(cmd.gate, FlushGate):
+                self.send_segment()
+                break
+
+    def _get_segment_key(self, segment):
+        """Return the cache key of a segment (or None if the commands cannot be encoded) and update the hash chain."""
+        if self._key is None:
+            return None
+        try:
+            data = encode_commands(segment)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # Commands which cannot be serialized (e.g., math gates using lambda functions) disable the cache for the
+            # remaining segments
+            self._key = None
+            return None
+        self._key = hashlib.sha256(self._key + data).digest()
+        return self._key.hex()
+
+    def _catch_up(self):
+        """Send the segments found in the cache through the compiler engines, dropping their output."""
+        if not self._pending_segments:
+            return
+        pending_segments, self._pending_segments = self._pending_segments, []
+        mapper = self.main_engine.mapper
+        if mapper is not None:
+            mapper.current_mapping = self._pending_mapping
+        self._output.discard = True
+        try:
+            for segment in pending_segments:
+                self.send(segment)
+        finally:
+            self._output.discard = False
+
+    def send_segment(self):
+        """Compile the buffered commands (or look them up in the cache) and send the result to the backend."""
+        segment, self._buffer = self._buffer, []
+        if not segment:
+            return
+        key = self._get_segment_key(segment)
+        entry = self._cache.load(key) if key is not None else None
+        mapper = self.main_engine.mapper
+        if entry is not None:
+            mapping, data = entry
+            if mapper is not None:
+                if not self._pending_segments:
+                    self._pending_mapping = mapper.current_mapping
+                mapper.current_mapping = mapping
+            self._pending_segments.append(segment)
+            backend = self._output.next_engine
+            batch = []
+            for cmd in decode_commands(data, self.main_engine):
+                batch.append(cmd)
+                if len(batch) >= self._batch_size:
+                    backend.receive(batch)
+                    batch = []
+            if batch:
+                backend.receive(batch)
+            return
+
+        self._catch_up()
+        if key is None:
+            self.send(segment)
+            return
+        self._output.recording = []
+        try:
+            self.send(segment)
+            compiled_commands = self._output.recording
+        finally:
+            self._output.recording = None
+        try:
+            data = encode_commands(compiled_commands)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        self._cache.store(key, (mapper.current_mapping if mapper is not None else None, data))
@@ -0,0 +1,198 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""Tests for projectq.cengines._compilecache.py."""
+
+import gc
+import os
+
+import numpy
+import pytest
+
+import projectq.setups.decompositions
+import projectq.setups.linear
+from projectq import MainEngine
+from projectq.backends import Simulator
+from projectq.cengines import (
+    AutoReplacer,
+    CompileCache,
+    DecompositionRuleSet,
+    DummyEngine,
+    InstructionFilter,
+    LocalOptimizer,
+    _compilecache,
+)
+from projectq.libs.math import AddConstant
+from projectq.meta import Compute, Control, Uncompute, get_control_count
+from projectq.ops import CNOT, QFT, All, BasicMathGate, H, Measure, Rx, Toffoli
+
+
+def _get_engine_list():
+    return projectq.setups.linear.get_engine_list(
+        num_qubits=5, cyclic=False, one_qubit_gates='any', two_qubit_gates=(CNOT,)
+    )
+
+
+def _run(compile_cache, angle=0.3):
+    eng = MainEngine(Simulator(rnd_seed=5), _get_engine_list(), compile_cache=compile_cache)
+    qureg = eng.allocate_qureg(5)
+    All(H) | qureg
+    with Compute(eng):
+        Rx(0.2) | qureg[2]
+    with Control(eng, qureg[0]):
+        QFT | qureg[1:]
+    Uncompute(eng)
+    eng.flush()
+    Measure | qureg[0]
+    eng.flush()
+    result = int(qureg[0])
+    Rx(angle) | qureg[4]
+    CNOT | (qureg[4], qureg[1])
+    eng.flush()
+    mapping = eng.mapper.current_mapping
+    state = [eng.backend.get_amplitude(bin(i)[2:].zfill(5), qureg) for i in range(2**5)]
+    All(Measure) | qureg
+    eng.flush()
+    # destroy the engine now such that its final segment (deallocations) is always sent during this run
+    del eng, qureg
+    gc.collect()
+    return result, mapping, numpy.array(state)
+
+
+def test_compile_cache(tmpdir):
+    ref_result, ref_mapping, ref_state = _run(None)
+    cache = CompileCache(str(tmpdir))
+    for _ in range(2):
+        result, mapping, state = _run(cache)
+        assert result == ref_result
+        assert mapping == ref_mapping
+        assert numpy.allclose(state, ref_state)
+    # the first run compiles all segments, the second one finds all of them in the cache
+    num_segments = cache.misses
+    assert num_segments >= 3
+    assert cache.hits == num_segments
+
+    # segments after a cache miss are compiled after sending the preceding segments through the compiler engines
+    ref_result, ref_mapping, ref_state = _run(None, angle=0.7)
+    result, mapping, state = _run(cache, angle=0.7)
+    assert cache.hits > num_segments
+    assert result == ref_result
+    assert mapping == ref_mapping
+    assert numpy.allclose(state, ref_state)
+
+    # a cache directory can also be passed directly to the MainEngine
+    eng = MainEngine(DummyEngine(), [], compile_cache=str(tmpdir.join('sub')))
+    assert os.path.isdir(str(tmpdir.join('sub')))
+    eng.flush()
+
+
+def test_compile_cache_shared_rule_set(tmpdir):
+    # the rule set memoizes the rules found for each gate while compiling, which must not change the cache key
+    rule_set = DecompositionRuleSet(modules=[projectq.setups.decompositions])
+    cache = CompileCache(str(tmpdir))
+
+    def get_engine_list():
+        return [AutoReplacer(rule_set), InstructionFilter(lambda eng, cmd: get_control_count(cmd) < 2)]
+
+    def run():
+        backend = DummyEngine(save_commands=True)
+        eng = MainEngine(backend, get_engine_list(), compile_cache=cache)
+        qureg = eng.allocate_qureg(3)
+        Toffoli | (qureg[0], qureg[1], qureg[2])
+        eng.flush()
+        return [str(cmd) for cmd in backend.received_commands]
+
+    fingerprint = _compilecache.get_engine_fingerprint(get_engine_list())
+    commands = run()
+    assert rule_set._candidates_cache
+    assert _compilecache.get_engine_fingerprint(get_engine_list()) == fingerprint
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert run() == commands
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_compile_cache_measurement_result(tmpdir):
+    eng = MainEngine(Simulator(), [], compile_cache=CompileCache(str(tmpdir)))
+    qubit = eng.allocate_qubit()
+    H | qubit
+    H | qubit
+    Measure | qubit
+    # accessing a measurement result compiles the buffered commands
+    assert int(qubit) == 0
+
+
+def test_compile_cache_uncacheable_commands(tmpdir):
+    cache = CompileCache(str(tmpdir))
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend, [], compile_cache=cache)
+    qureg = eng.allocate_qureg(2)
+    H | qureg[0]
+    eng.flush()
+    # gates which cannot be pickled disable the cache for the remaining segments
+    BasicMathGate(lambda x: (x + 1,)) | qureg
+    eng.flush()
+    AddConstant(1) | qureg
+    eng.flush()
+    assert cache.misses == 1
+    assert len(os.listdir(str(tmpdir))) == 1
+    assert [str(cmd.gate) for cmd in backend.received_commands[-4:]] == ['MATH', '', 'AddConstant(1)', '']
+
+
+def test_compile_cache_eviction(tmpdir):
+    cache = CompileCache(str(tmpdir), max_size=2**20)
+    cache.store('a', b'0' * 1000)
+    cache.store('b', b'1' * 1000)
+    os.utime(cache._get_filename('a'), (1, 1))
+    os.utime(cache._get_filename('b'), (2, 2))
+    assert cache.load('a') == b'0' * 1000
+    assert cache.load('c') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.max_size = 2500
+    cache.store('c', b'2' * 1000)
+    # 'b' is the least recently used entry
+    assert cache.load('b') is None
+    assert cache.load('a') is not None
+    assert cache.load('c') is not None
+    cache.clear()
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_engine_fingerprint():
+    def make_filter(gates):
+        return InstructionFilter(lambda eng, cmd: cmd.gate in gates)
+
+    fingerprint = _compilecache.get_engine_fingerprint(_get_engine_list() + [Simulator()])
+    assert fingerprint == _compilecache.get_engine_fingerprint(_get_engine_list() + [Simulator()])
+    assert fingerprint != _compilecache.get_engine_fingerprint(_get_engine_list() + [Simulator(gate_fusion=True)])
+    assert _compilecache.get_engine_fingerprint([LocalOptimizer(5)]) != _compilecache.get_engine_fingerprint(
+        [LocalOptimizer(6)]
+    )
+    assert _compilecache.get_engine_fingerprint([make_filter([H])]) == _compilecache.get_engine_fingerprint(
+        [make_filter([H])]
+    )
+    assert _compilecache.get_engine_fingerprint([make_filter([H])]) != _compilecache.get_engine_fingerprint(
+        [make_filter([CNOT])]
+    )
+
+
+@pytest.mark.parametrize("value", [numpy.arange(3), {1, 2}, {'a': (1, 2.0)}, None])
+def test_fingerprint_is_address_free(value):
+    class Config:
+        __slots__ = ('value',)
+
+        def __init__(self, value):
+            self.value = value
+
+    description = _compilecache._fingerprint(Config(value), {})
+    assert description == _compilecache._fingerprint(Config(value), {})
+    assert '0x' not in description
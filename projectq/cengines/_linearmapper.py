@@ -20,6 +20,7 @@ Output: Quantum circuit in which qubits are placed in 1-D chain in which only ne
         qubit gate. The mapper uses Swap gates in order to move qubits next to each other.
 """
 
+import heapq
 from copy import deepcopy
 
 from projectq.meta import LogicalQubitIDTag
@@ -35,6 +36,7 @@ from projectq.ops import (
 from projectq.types import WeakQubitRef
 
 from ._basicmapper import BasicMapperEngine
+from ._commandbuffer import CommandBuffer
 
 
 def return_swap_depth(swaps):
@@ -76,6 +78,7 @@ class LinearMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attr
                                applied
         num_of_swaps_per_mapping (dict): Key are the number of swaps per mapping, value is the number of such mappings
                                          which have been applied
+        minimize_swaps (bool): If the new mappings are built from the current mapping such that few swaps are needed
 
     Note:
         1) Gates are cached and only mapped from time to time. A FastForwarding gate doesn't empty the cache, only a
@@ -84,7 +87,7 @@ class LinearMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attr
         3) Does not optimize for dirty qubits.
     """
 
-    def __init__(self, num_qubits, cyclic=False, storage=1000):
+    def __init__(self, num_qubits, cyclic=False, storage=1000, minimize_swaps=False):
         """
         Initialize a LinearMapper compiler engine.
 
@@ -92,13 +95,17 @@ class LinearMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attr
             num_qubits(int): Number of physical qubits in the linear chain
             cyclic(bool): If 1D chain is a cycle. Default is False.
             storage(int): Number of gates to temporarily store, default is 1000
+            minimize_swaps(bool): If True, each new mapping keeps the qubits close to their current positions and in
+                their current order, which requires far fewer swaps on long chains (see
+                _return_minimal_swap_mapping_from_segments). Default is False.
         """
         super().__init__()
         self.num_qubits = num_qubits
         self.cyclic = cyclic
         self.storage = storage
+        self.minimize_swaps = minimize_swaps
         # Storing commands
-        self._stored_commands = []
+        self._stored_commands = CommandBuffer()
         # Logical qubit ids for which the Allocate gate has already been
         # processed and sent to the next engine but which are not yet
         # deallocated:
@@ -108,6 +115,16 @@ class LinearMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attr
         self.depth_of_swaps = {}
         self.num_of_swaps_per_mapping = {}
 
+    @property
+    def _stored_commands(self):
+        """Buffer of the commands which have not been sent yet."""
+        return self._command_buffer
+
+    @_stored_commands.setter
+    def _stored_commands(self, commands):
+        """Replace the stored commands."""
+        self._command_buffer = CommandBuffer(commands)
+
     def is_available(self, cmd):
         """Only allows 1 or two qubit gates."""
         num_qubits = 0
@@ -116,7 +133,9 @@ class LinearMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attr
         return num_qubits <= 2
 
     @staticmethod
-    def return_new_mapping(num_qubits, cyclic, currently_allocated_ids, stored_commands, current_mapping):
+    def return_new_mapping(  # pylint: disable=too-many-arguments,too-many-branches
+        num_qubits, cyclic, currently_allocated_ids, stored_commands, current_mapping, minimize_swaps=False
+    ):
         """
         Build a mapping of qubits to a linear chain.
 
@@ -133,6 +152,8 @@ class LinearMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attr
             current_mapping: A current mapping as a dict. key is logical qubit id, value is placement id. If there are
                              different possible maps, this current mapping is used to minimize the swaps to go to the
                              new mapping by a heuristic.
+            minimize_swaps(bool): If True, use _return_minimal_swap_mapping_from_segments instead of
+                                  _return_new_mapping_from_segments to combine the segments into the new mapping.
 
         Returns: A new mapping as a dict. key is logical qubit id,
                  value is placement id
@@ -193,6 +214,13 @@ class LinearMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attr
                     neighbour_ids=neighbour_ids,
                 )
 
+        if minimize_swaps:
+            return LinearMapper._return_minimal_swap_mapping_from_segments(
+                num_qubits=num_qubits,
+                segments=segments,
+                allocated_qubits=allocated_qubits,
+                current_mapping=current_mapping,
+            )
         return LinearMapper._return_new_mapping_from_segments(
             num_qubits=num_qubits,
             segments=segments,
@@ -396,7 +424,68 @@ class LinearMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attr
                 new_mapping[logical_id] = pos
         return new_mapping
 
-    def _odd_even_transposition_sort_swaps(self, old_mapping, new_mapping):
+    @staticmethod
+    def _return_minimal_swap_mapping_from_segments(  # pylint: disable=too-many-locals
+        num_qubits, segments, allocated_qubits, current_mapping
+    ):
+        """
+        Combine the individual segments into a new mapping which is close to the current mapping.
+
+        The odd-even transposition sort needs one swap for every pair of qubits whose order differs between the current
+        and the new mapping. Instead of filling the chain from left to right, the new mapping is therefore built from
+        the current one: each segment (and each individual qubit) is oriented such that its qubits keep their current
+        order as far as possible, the segments are sorted by the current positions of their qubits, and each segment is
+        placed as close as possible to its current position. Newly allocated qubits are placed at free positions.
+
+        Args:
+            num_qubits (int): Total number of qubits in the linear chain
+            segments: List of segments. A segment is a list of qubit ids which should be nearest neighbour in the new
+                      map.  Individual qubits are in allocated_qubits but not in any segment
+            allocated_qubits: A set of all qubit ids which need to be present in the new map
+            current_mapping: A current mapping as a dict. key is logical qubit id, value is placement id.
+        Returns:
+            A new mapping as a dict. key is logical qubit id,
+            value is placement id
+        """
+        current_mapping = current_mapping or {}
+        segment_qubits = {qubit_id for segment in segments for qubit_id in segment}
+        blocks = [list(segment) for segment in segments]
+        blocks += [[qubit_id] for qubit_id in sorted(allocated_qubits) if qubit_id not in segment_qubits]
+        used_positions = {current_mapping[qubit_id] for qubit_id in allocated_qubits if qubit_id in current_mapping}
+        free_positions = [pos for pos in range(num_qubits) if pos not in used_positions]
+
+        # Desired position of the first qubit of each block
+        placements = []
+        for block in blocks:
+            known = [
+                (index, current_mapping[qubit_id])
+                for index, qubit_id in enumerate(block)
+                if qubit_id in current_mapping
+            ]
+            if known:
+                mean_index = sum(index for index, _ in known) / len(known)
+                mean_pos = sum(pos for _, pos in known) / len(known)
+                if sum((index - mean_index) * (pos - mean_pos) for index, pos in known) < 0:
+                    block.reverse()
+                    mean_index = len(block) - 1 - mean_index
+                placements.append((mean_pos, mean_pos - mean_index, block))
+            else:
+                pos = free_positions.pop(0) if free_positions else num_qubits
+                placements.append((pos, pos, block))
+        placements.sort(key=lambda placement: placement[0])
+
+        new_mapping = {}
+        num_remaining_qubits = sum(len(block) for block in blocks)
+        min_pos = 0
+        for _, desired_pos, block in placements:
+            num_remaining_qubits -= len(block)
+            pos = min(max(int(round(desired_pos)), min_pos), num_qubits - num_remaining_qubits - len(block))
+            for offset, qubit_id in enumerate(block):
+                new_mapping[qubit_id] = pos + offset
+            min_pos = pos + len(block)
+        return new_mapping
+
+    def _odd_even_transposition_sort_swaps(self, old_mapping, new_mapping):  # pylint: disable=too-many-locals
         """
         Return the swap operation for an odd-even transposition sort.
 
@@ -425,19 +514,23 @@ class LinearMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attr
                 final_positions[i] = not_used_mapped_ids.pop()
         if len(not_used_mapped_ids) > 0:  # pragma: no cover
             raise RuntimeError('Internal compiler error: len(not_used_mapped_ids) > 0')
-        # Start sorting:
+        # Start sorting (only the range of positions whose qubits move, as all other qubits stay in place):
         swap_operations = []
+        moved_positions = [i for i, pos in enumerate(final_positions) if pos != i]
+        if not moved_positions:
+            return swap_operations
+        first, last = moved_positions[0], moved_positions[-1]
         finished_sorting = False
         while not finished_sorting:
             finished_sorting = True
-            for i in range(1, len(final_positions) - 1, 2):
+            for i in range(first | 1, last, 2):
                 if final_positions[i] > final_positions[i + 1]:
                     swap_operations.append((i, i + 1))
                     tmp = final_positions[i]
                     final_positions[i] = final_positions[i + 1]
                     final_positions[i + 1] = tmp
                     finished_sorting = False
-            for i in range(0, len(final_positions) - 1, 2):
+            for i in range(first + first % 2, last, 2):
                 if final_positions[i] > final_positions[i + 1]:
                     swap_operations.append((i, i + 1))
                     tmp = final_positions[i]
@@ -446,76 +539,65 @@ class LinearMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attr
                     finished_sorting = False
         return swap_operations
 
-    def _send_possible_commands(self):  # pylint: disable=too-many-branches
+    def _is_executable(self, cmd):
+        """
+        Check if a command can be sent using the current mapping.
+
+        Note: self.current_mapping must exist already
+        """
+        qubit_ids = [qubit.id for qureg in cmd.all_qubits for qubit in qureg]
+        if any(qubit_id not in self._current_mapping for qubit_id in qubit_ids):
+            return False
+        # Check that mapped ids are nearest neighbour
+        mapped_ids = {self._current_mapping[qubit_id] for qubit_id in qubit_ids}
+        if len(mapped_ids) == 2:
+            diff = abs(mapped_ids.pop() - mapped_ids.pop())
+            if self.cyclic:
+                return diff in (1, self.num_qubits - 1)
+            return diff == 1
+        return True
+
+    def _send_possible_commands(self):
         """
         Send the stored commands possible without changing the mapping.
 
+        Only the front layer of the stored commands is inspected: the ready commands are processed in their original
+        order and every command which is sent makes the commands it was blocking ready.
+
         Note: self.current_mapping must exist already
         """
-        active_ids = deepcopy(self._currently_allocated_ids)
-        for logical_id in self.current_mapping:
-            active_ids.add(logical_id)
-
-        new_stored_commands = []
-        for i, cmd in enumerate(self._stored_commands):
-            if len(active_ids) == 0:
-                new_stored_commands += self._stored_commands[i:]
-                break
+        stored_commands = self._stored_commands
+        ready_indices = stored_commands.get_ready_indices()
+        while ready_indices:
+            index = heapq.heappop(ready_indices)
+            cmd = stored_commands.get_command(index)
+            if not self._is_executable(cmd):
+                continue
             if isinstance(cmd.gate, AllocateQubitGate):
-                if cmd.qubits[0][0].id in self.current_mapping:
-                    self._currently_allocated_ids.add(cmd.qubits[0][0].id)
-                    qb = WeakQubitRef(engine=self, idx=self.current_mapping[cmd.qubits[0][0].id])
-                    new_cmd = Command(
-                        engine=self,
-                        gate=AllocateQubitGate(),
-                        qubits=([qb],),
-                        tags=[LogicalQubitIDTag(cmd.qubits[0][0].id)],
-                    )
-                    self.send([new_cmd])
-                else:
-                    new_stored_commands.append(cmd)
+                self._currently_allocated_ids.add(cmd.qubits[0][0].id)
+                qb = WeakQubitRef(engine=self, idx=self._current_mapping[cmd.qubits[0][0].id])
+                new_cmd = Command(
+                    engine=self,
+                    gate=AllocateQubitGate(),
+                    qubits=([qb],),
+                    tags=[LogicalQubitIDTag(cmd.qubits[0][0].id)],
+                )
+                self.send([new_cmd])
             elif isinstance(cmd.gate, DeallocateQubitGate):
-                if cmd.qubits[0][0].id in active_ids:
-                    qb = WeakQubitRef(engine=self, idx=self.current_mapping[cmd.qubits[0][0].id])
-                    new_cmd = Command(
-                        engine=self,
-                        gate=DeallocateQubitGate(),
-                        qubits=([qb],),
-                        tags=[LogicalQubitIDTag(cmd.qubits[0][0].id)],
-                    )
-                    self._currently_allocated_ids.remove(cmd.qubits[0][0].id)
-                    active_ids.remove(cmd.qubits[0][0].id)
-                    self._current_mapping.pop(cmd.qubits[0][0].id)
-                    self.send([new_cmd])
-                else:
-                    new_stored_commands.append(cmd)
+                qb = WeakQubitRef(engine=self, idx=self._current_mapping[cmd.qubits[0][0].id])
+                new_cmd = Command(
+                    engine=self,
+                    gate=DeallocateQubitGate(),
+                    qubits=([qb],),
+                    tags=[LogicalQubitIDTag(cmd.qubits[0][0].id)],
+                )
+                self._currently_allocated_ids.remove(cmd.qubits[0][0].id)
+                self._current_mapping.pop(cmd.qubits[0][0].id)
+                self.send([new_cmd])
             else:
-                send_gate = True
-                mapped_ids = set()
-                for qureg in cmd.all_qubits:
-                    for qubit in qureg:
-                        if qubit.id not in active_ids:
-                            send_gate = False
-                            break
-                        mapped_ids.add(self.current_mapping[qubit.id])
-                # Check that mapped ids are nearest neighbour
-                if len(mapped_ids) == 2:
-                    mapped_ids = list(mapped_ids)
-                    diff = abs(mapped_ids[0] - mapped_ids[1])
-                    if self.cyclic:
-                        if diff not in (1, self.num_qubits - 1):
-                            send_gate = False
-                    else:
-                        if diff != 1:
-                            send_gate = False
-                if send_gate:
-                    self._send_cmd_with_mapped_ids(cmd)
-                else:
-                    for qureg in cmd.all_qubits:
-                        for qubit in qureg:
-                            active_ids.discard(qubit.id)
-                    new_stored_commands.append(cmd)
-        self._stored_commands = new_stored_commands
+                self._send_cmd_with_mapped_ids(cmd)
+            for successor in stored_commands.remove(index):
+                heapq.heappush(ready_indices, successor)
 
     def _run(self):  # pylint: disable=too-many-locals,too-many-branches
         """
@@ -526,8 +608,8 @@ class LinearMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attr
         all possible gates, and finally deallocates mapped qubit ids which don't store any information.
         """
         num_of_stored_commands_before = len(self._stored_commands)
-        if not self.current_mapping:
-            self.current_mapping = {}
+        if not self._current_mapping:
+            self._current_mapping = {}
         else:
             self._send_possible_commands()
             if len(self._stored_commands) == 0:
@@ -537,15 +619,16 @@ class LinearMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attr
             self.cyclic,
             self._currently_allocated_ids,
             self._stored_commands,
-            self.current_mapping,
+            self._current_mapping,
+            minimize_swaps=self.minimize_swaps,
         )
-        swaps = self._odd_even_transposition_sort_swaps(old_mapping=self.current_mapping, new_mapping=new_mapping)
+        swaps = self._odd_even_transposition_sort_swaps(old_mapping=self._current_mapping, new_mapping=new_mapping)
         if swaps:  # first mapping requires no swaps
             # Allocate all mapped qubit ids (which are not already allocated,
             # i.e., contained in self._currently_allocated_ids)
             mapped_ids_used = set()
             for logical_id in self._currently_allocated_ids:
-                mapped_ids_used.add(self.current_mapping[logical_id])
+                mapped_ids_used.add(self._current_mapping[logical_id])
             not_allocated_ids = set(range(self.num_qubits)).difference(mapped_ids_used)
             for mapped_id in not_allocated_ids:
                 qb = WeakQubitRef(engine=self, idx=mapped_id)
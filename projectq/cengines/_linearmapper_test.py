@@ -12,21 +12,28 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 """Tests for projectq.cengines._linearmapper.py."""
+
 from copy import deepcopy
 
+import numpy
 import pytest
 
+from projectq import MainEngine
+from projectq.backends import Simulator
 from projectq.cengines import DummyEngine
 from projectq.cengines import _linearmapper as lm
 from projectq.meta import LogicalQubitIDTag
 from projectq.ops import (
     CNOT,
     QFT,
+    All,
     Allocate,
     BasicGate,
     Command,
     Deallocate,
     FlushGate,
+    Measure,
+    Rx,
     X,
 )
 from projectq.types import WeakQubitRef
@@ -114,12 +121,11 @@ def test_return_new_mapping_allocate_only_once():
     # Test if loop stops after deallocate gate has been used.
     # This would otherwise trigger an error (test by num_qubits=2)
     cmd2 = None
-    mapper._stored_commands = [cmd0, cmd1, cmd2]
     mapper.return_new_mapping(
         num_qubits=mapper.num_qubits,
         cyclic=mapper.cyclic,
         currently_allocated_ids=mapper._currently_allocated_ids,
-        stored_commands=mapper._stored_commands,
+        stored_commands=[cmd0, cmd1, cmd2],
         current_mapping=mapper.current_mapping,
     )
 
@@ -465,6 +471,52 @@ def test_return_new_mapping_from_segments(segments, current_chain, correct_chain
     assert correct_mapping == new_mapping
 
 
+@pytest.mark.parametrize(
+    "segments, current_chain, correct_chain, allocated_qubits",
+    [
+        ([[0, 2, 4]], [0, 1, 2, 3, 4], [1, 0, 2, 4, 3], [0, 1, 2, 3, 4]),
+        ([[4, 2]], [None, 2, None, 4, None], [None, None, 2, 4, None], [2, 4]),
+        ([[0, 5]], [0, 1, None, None, None], [0, 5, 1, None, None], [0, 1, 5]),
+        ([[3, 0], [1, 2]], [3, 2, 1, 0, None], [None, 3, 0, 2, 1], [0, 1, 2, 3]),
+    ],
+)
+def test_return_minimal_swap_mapping_from_segments(segments, current_chain, correct_chain, allocated_qubits):
+    current_mapping = {logical_id: pos for pos, logical_id in enumerate(current_chain) if logical_id is not None}
+    new_mapping = lm.LinearMapper._return_minimal_swap_mapping_from_segments(
+        num_qubits=5,
+        segments=segments,
+        allocated_qubits=allocated_qubits,
+        current_mapping=current_mapping,
+    )
+    correct_mapping = {logical_id: pos for pos, logical_id in enumerate(correct_chain) if logical_id is not None}
+    assert correct_mapping == new_mapping
+
+
+@pytest.mark.parametrize("cyclic", [False, True])
+def test_minimize_swaps(cyclic):
+    def run(minimize_swaps):
+        sim = Simulator(rnd_seed=1)
+        mapper = lm.LinearMapper(num_qubits=7, cyclic=cyclic, minimize_swaps=minimize_swaps)
+        eng = MainEngine(sim, [mapper])
+        qureg = eng.allocate_qureg(6)
+        for i in range(6):
+            Rx(0.1 * (i + 1)) | qureg[i]
+        for i in range(6):
+            for j in range(i + 1, 6):
+                CNOT | (qureg[j], qureg[i])
+                Rx(0.1 * j) | qureg[i]
+        eng.flush()
+        state = [eng.backend.get_amplitude(format(i, '06b'), qureg) for i in range(2**6)]
+        All(Measure) | qureg
+        eng.flush()
+        return sum(num * count for num, count in mapper.num_of_swaps_per_mapping.items()), numpy.array(state)
+
+    num_swaps, state = run(minimize_swaps=False)
+    minimal_num_swaps, minimal_state = run(minimize_swaps=True)
+    assert numpy.allclose(state, minimal_state)
+    assert minimal_num_swaps < num_swaps
+
+
 @pytest.mark.parametrize(
     "old_chain, new_chain",
     [
@@ -15,7 +15,9 @@
 """The main engine of every compiler engine pipeline, called MainEngine."""
 
 import atexit
+import queue
 import sys
+import threading
 import traceback
 import weakref
 
@@ -25,6 +27,13 @@ from projectq.types import WeakQubitRef
 
 from ._basicmapper import BasicMapperEngine
 from ._basics import BasicEngine
+from ._compilecache import (
+    CompileCache,
+    CompileCacheInput,
+    CompileCacheOutput,
+    get_engine_fingerprint,
+)
+from ._profiling import EngineProfiler
 
 
 class NotYetMeasuredError(Exception):
@@ -50,6 +59,84 @@ class _ErrorEngine:  # pylint: disable=too-few-public-methods
 _N_ENGINES_THRESHOLD = 100
 
 
+class _LockedSetMixin:
+    """
+    Mixin guarding the modifications of a set with a lock.
+
+    Iterating over the set iterates over a snapshot, so that other threads may modify the set in the meantime.
+    """
+
+    def add(self, item):
+        """Add an element to the set."""
+        with self._lock:
+            super().add(item)
+
+    def discard(self, item):
+        """Remove an element from the set if it is a member."""
+        with self._lock:
+            super().discard(item)
+
+    def remove(self, item):
+        """Remove an element from the set; it must be a member."""
+        with self._lock:
+            super().remove(item)
+
+    def pop(self):
+        """Remove and return an arbitrary element of the set."""
+        with self._lock:
+            return super().pop()
+
+    def __iter__(self):
+        """Iterate over a snapshot of the set."""
+        with self._lock:
+            items = list(super().__iter__())
+        return iter(items)
+
+
+class _LockedWeakSet(_LockedSetMixin, weakref.WeakSet):
+    """WeakSet which may be modified by several threads (see MainEngine.active_qubits)."""
+
+    def __init__(self, lock):
+        """Initialize an empty set guarded by the lock."""
+        super().__init__()
+        self._lock = lock
+
+
+class _LockedSet(_LockedSetMixin, set):
+    """Set which may be modified by several threads (see MainEngine.dirty_qubits)."""
+
+    def __init__(self, lock):
+        """Initialize an empty set guarded by the lock."""
+        super().__init__()
+        self._lock = lock
+
+
+def _run_pipeline(weakref_main_engine, command_queue):
+    """
+    Send the command lists of the queue through the engines of a pipelined MainEngine (see MainEngine.__init__).
+
+    The worker only holds a weak reference to the MainEngine while waiting for commands, so it stops once the
+    MainEngine has been destroyed (or a None sentinel is received).
+    """
+    while True:
+        command_list = command_queue.get()
+        try:
+            if command_list is None:
+                return
+            eng = weakref_main_engine()
+            if eng is None:
+                return
+            if eng._pipeline_error is None:  # pylint: disable=protected-access
+                try:
+                    eng.send(command_list)
+                except Exception as err:  # pylint: disable=broad-except
+                    eng._pipeline_error = err  # pylint: disable=protected-access
+            # the commands reference the MainEngine, so drop them before waiting for the next list
+            eng = command_list = None
+        finally:
+            command_queue.task_done()
+
+
 class MainEngine(BasicEngine):  # pylint: disable=too-many-instance-attributes
     """
     The MainEngine class provides all functionality of the main compiler engine.
@@ -68,8 +155,15 @@ class MainEngine(BasicEngine):  # pylint: disable=too-many-instance-attributes
         n_engines_max (int): Maximum number of compiler engines allowed in the engine list. Defaults to 100.
     """
 
-    def __init__(  # pylint: disable=too-many-statements,too-many-branches
-        self, backend=None, engine_list=None, verbose=False
+    def __init__(  # pylint: disable=too-many-statements,too-many-branches,too-many-arguments,too-many-locals
+        self,
+        backend=None,
+        engine_list=None,
+        verbose=False,
+        cache_capabilities=False,
+        batch_size=1,
+        compile_cache=None,
+        pipeline_size=0,
     ):
         """
         Initialize the main compiler engine and all compiler engines.
@@ -84,6 +178,32 @@ class MainEngine(BasicEngine):  # pylint: disable=too-many-instance-attributes
                 Default: projectq.setups.default.get_engine_list()
             verbose (bool): Either print full or compact error messages.
                             Default: False (i.e. compact error messages).
+            cache_capabilities (bool): If True, the answers of the compiler engines to is_available and
+                is_meta_tag_supported are cached until an engine overriding them is inserted into or dropped from
+                the engine list (see clear_capability_cache). This requires that is_available only depends on the
+                gate, the register sizes, the control count, the control state and the tag types of a command.
+                Default: False
+            batch_size (int): Number of commands received by the MainEngine which are buffered and then sent on to
+                the compiler engines as a single list. The buffer is also sent on when flushing, when accessing a
+                measurement result and when the engine list changes (see send_buffered_commands). Moderate sizes
+                (e.g. 64) work best, as large buffers keep many commands alive. Default: 1 (i.e. commands are sent on
+                immediately).
+            compile_cache (CompileCache|str): Persistent cache of compiled command streams (or the directory of the
+                cache). If provided, the commands are compiled in segments ending with a FlushGate (or a call to
+                get_measurement_result) and the compiled commands of each segment are stored in the cache, using a
+                hash of all commands issued so far and of the configuration of the compiler engines and the backend as
+                key. If the same program is run again with identically configured engines, the compiled commands are
+                sent directly to the backend. This requires the compiler engines to be deterministic.
+                Default: None (i.e. no caching).
+            pipeline_size (int): If positive, the commands are sent through the compiler engines and the backend by a
+                worker thread, which allows the user code to generate further commands in the meantime. Up to
+                pipeline_size lists of commands are queued for the worker thread. The MainEngine waits for the worker
+                thread when flushing, when accessing a measurement result, when the engine list changes and before
+                meta engines (e.g., Dagger or Loop) process their section; exceptions raised by the engines are
+                re-raised at these points. Qubit ids and the sets of active and dirty qubits are guarded by a lock as
+                the engines may allocate qubits in the worker thread. The backend may only be accessed directly (e.g.,
+                using Simulator.cheat()) after flushing. Default: 0 (i.e. the commands are sent through the engines by
+                the calling thread).
 
         Example:
             .. code-block:: python
@@ -124,12 +244,22 @@ class MainEngine(BasicEngine):  # pylint: disable=too-many-instance-attributes
                 eng = MainEngine(Simulator(), engines)
         """
         super().__init__()
-        self.active_qubits = weakref.WeakSet()
+        # Engines running in the worker thread of a pipelined MainEngine allocate and deallocate qubits as well
+        self._qubit_lock = threading.RLock()
+        self.active_qubits = _LockedWeakSet(self._qubit_lock)
         self._measurements = {}
-        self.dirty_qubits = set()
+        self.dirty_qubits = _LockedSet(self._qubit_lock)
         self.verbose = verbose
         self.main_engine = self
         self.n_engines_max = _N_ENGINES_THRESHOLD
+        self._capability_config = object() if cache_capabilities else None
+        self._batch_size = batch_size
+        self._command_buffer = []
+        self._profiler = None
+        self._pipeline_size = pipeline_size
+        self._pipeline_queue = None
+        self._pipeline_thread = None
+        self._pipeline_error = None
 
         if backend is None:
             backend = Simulator()
@@ -173,6 +303,14 @@ class MainEngine(BasicEngine):  # pylint: disable=too-many-instance-attributes
         else:
             self.next_engine = _ErrorEngine()
             raise UnsupportedEngineError("The provided list of engines is not a list!")
+        self._compile_cache_input = None
+        if compile_cache is not None:
+            if not isinstance(compile_cache, CompileCache):
+                compile_cache = CompileCache(compile_cache)
+            fingerprint = get_engine_fingerprint(engine_list + [backend])
+            compile_cache_output = CompileCacheOutput()
+            self._compile_cache_input = CompileCacheInput(compile_cache, compile_cache_output, fingerprint)
+            engine_list = [self._compile_cache_input] + engine_list + [compile_cache_output]
         engine_list = engine_list + [backend]
 
         # Test that user did not supply twice the same engine instance
@@ -222,11 +360,78 @@ class MainEngine(BasicEngine):  # pylint: disable=too-many-instance-attributes
         """
         if not hasattr(sys, "last_type"):
             self.flush(deallocate_qubits=True)
+        if self._pipeline_queue is not None:
+            try:
+                self._pipeline_queue.put_nowait(None)
+            except queue.Full:  # pragma: no cover
+                pass  # the worker thread stops anyway once it notices that the MainEngine has been destroyed
+            # the worker thread is gone, any further commands are sent through the engines by the calling thread
+            self._pipeline_size = 0
+            self._pipeline_queue = None
+            self._pipeline_thread = None
         try:
             atexit.unregister(self._delfun)  # only available in Python3
         except AttributeError:  # pragma: no cover
             pass
 
+    def clear_capability_cache(self):
+        """
+        Invalidate the cached answers to is_available and is_meta_tag_supported of all compiler engines.
+
+        This is called automatically by insert_engine and drop_engine_after and only needs to be called explicitly if
+        the engine list or the capabilities of an engine are modified by other means.
+        """
+        if self._capability_config is not None:
+            self._capability_config = object()
+
+    def start_profiling(self, trace_events=True):
+        """
+        Start profiling the compiler engines.
+
+        Attaches a new EngineProfiler to the MainEngine and all engines of the engine list (engines inserted later on
+        are not profiled). A profiler which is already attached is detached first.
+
+        Args:
+            trace_events (bool): If True, the profiler records individual events for the Chrome trace export.
+
+        Returns:
+            The EngineProfiler recording the statistics.
+
+        Example:
+            .. code-block:: python
+
+                eng = MainEngine()
+                profiler = eng.start_profiling()
+                ...
+                eng.flush()
+                eng.stop_profiling()
+                print(profiler)
+                profiler.save_chrome_trace('trace.json')
+        """
+        self.stop_profiling()
+        self.wait_for_pipeline()
+        engines = []
+        engine = self
+        while engine is not None:
+            engines.append(engine)
+            engine = None if engine.is_last_engine else engine.next_engine
+        self._profiler = EngineProfiler(trace_events)
+        self._profiler.attach(engines)
+        return self._profiler
+
+    def stop_profiling(self):
+        """
+        Stop profiling the compiler engines.
+
+        Returns:
+            The detached EngineProfiler or None if no profiler was attached.
+        """
+        profiler, self._profiler = self._profiler, None
+        if profiler is not None:
+            self.wait_for_pipeline()
+            profiler.detach()
+        return profiler
+
     def set_measurement_result(self, qubit, value):
         """
         Register a measurement result.
@@ -261,6 +466,9 @@ class MainEngine(BasicEngine):  # pylint: disable=too-many-instance-attributes
                 Measure | qubit
                 eng.get_measurement_result(qubit[0]) == int(qubit)
         """
+        self.send_buffered_commands()
+        if qubit.id not in self._measurements and self._compile_cache_input is not None:
+            self._compile_cache_input.send_segment()
         if qubit.id in self._measurements:
             return self._measurements[qubit.id]
         raise NotYetMeasuredError(
@@ -278,25 +486,96 @@ class MainEngine(BasicEngine):  # pylint: disable=too-many-instance-attributes
         Returns:
             new_qubit_id (int): New unique qubit id.
         """
-        self._qubit_idx += 1
-        return self._qubit_idx - 1
+        with self._qubit_lock:
+            self._qubit_idx += 1
+            return self._qubit_idx - 1
 
     def receive(self, command_list):
         """
         Forward the list of commands to the first engine.
 
+        If the MainEngine buffers commands (batch_size > 1), the commands are only sent on once the buffer is full or
+        a FlushGate is received.
+
         Args:
             command_list (list<Command>): List of commands to receive (and
                 then send on)
         """
+        if self._batch_size > 1:
+            buffer = self._command_buffer
+            buffer += command_list
+            if len(buffer) < self._batch_size:
+                for cmd in command_list:
+                    if isinstance(cmd.gate, FlushGate):
+                        break
+                else:
+                    return
+            command_list = []
         self.send(command_list)
 
+    def send_buffered_commands(self):
+        """
+        Send the commands buffered by the MainEngine on to the first compiler engine.
+
+        If the MainEngine is pipelined, this also waits until the worker thread has processed all queued commands.
+        Meta engines call this before they change the engine list or process the commands of their section (see
+        projectq.meta.insert_engine).
+        """
+        if threading.current_thread() is self._pipeline_thread:
+            # Engines running in the worker thread have already received all the commands issued before theirs
+            return
+        if self._command_buffer:
+            self.send([])
+        if self._pipeline_queue is not None:
+            self.wait_for_pipeline()
+
+    def wait_for_pipeline(self):
+        """
+        Wait until the worker thread of a pipelined MainEngine has processed all queued commands.
+
+        Raises:
+            Exception: The first exception raised by the engines while processing the queued commands (if any).
+        """
+        thread = self._pipeline_thread
+        if thread is not None and thread.is_alive() and threading.current_thread() is not thread:
+            self._pipeline_queue.join()
+        error = self._pipeline_error
+        if error is not None:
+            self._pipeline_error = None
+            raise error
+
+    def _use_pipeline(self):
+        """Return True if commands sent by the calling thread are to be queued for the worker thread."""
+        if self._pipeline_size <= 0:
+            return False
+        thread = self._pipeline_thread
+        # Daemon threads are stopped when the interpreter shuts down, the remaining commands are then sent directly
+        return thread is None or (thread.is_alive() and threading.current_thread() is not thread)
+
+    def _enqueue(self, command_list):
+        """Queue a list of commands for the worker thread, starting the worker thread if necessary."""
+        if self._pipeline_error is not None:
+            self.wait_for_pipeline()
+        if self._pipeline_queue is None:
+            self._pipeline_queue = queue.Queue(maxsize=self._pipeline_size)
+            self._pipeline_thread = threading.Thread(
+                target=_run_pipeline, args=(weakref.ref(self), self._pipeline_queue), daemon=True
+            )
+            self._pipeline_thread.start()
+        self._pipeline_queue.put(command_list)
+
     def send(self, command_list):
         """
         Forward the list of commands to the next engine in the pipeline.
 
-        It also shortens exception stack traces if self.verbose is False.
+        Buffered commands are sent on first. It also shortens exception stack traces if self.verbose is False.
         """
+        if self._command_buffer and threading.current_thread() is not self._pipeline_thread:
+            command_list = self._command_buffer + command_list
+            self._command_buffer = []
+        if self._use_pipeline():
+            self._enqueue(command_list)
+            return
         try:
             self.next_engine.receive(command_list)
         except Exception as err:  # pylint: disable=broad-except
@@ -324,3 +603,5 @@ class MainEngine(BasicEngine):  # pylint: disable=too-many-instance-attributes
                 qb = self.active_qubits.pop()  # noqa: F841
                 qb.__del__()  # pylint: disable=unnecessary-dunder-call
         self.receive([Command(self, FlushGate(), ([WeakQubitRef(self, -1)],))])
+        if self._pipeline_queue is not None:
+            self.wait_for_pipeline()
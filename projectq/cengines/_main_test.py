@@ -12,14 +12,26 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 """Tests for projectq.cengines._main.py."""
+
 import sys
+import threading
 import weakref
 
 import pytest
 
 from projectq.backends import Simulator
 from projectq.cengines import BasicMapperEngine, DummyEngine, LocalOptimizer, _main
-from projectq.ops import AllocateQubitGate, DeallocateQubitGate, FlushGate, H
+from projectq.meta import Control
+from projectq.ops import (
+    CNOT,
+    AllocateQubitGate,
+    DeallocateQubitGate,
+    FlushGate,
+    H,
+    Measure,
+    X,
+    Y,
+)
 
 
 def test_main_engine_init():
@@ -136,6 +148,35 @@ def test_main_engine_get_qubit_id():
     assert len(set(ids)) == 10
 
 
+def test_main_engine_qubit_bookkeeping_from_several_threads():
+    eng = _main.MainEngine(backend=DummyEngine(), engine_list=[])
+    ids = []
+    qubits = []
+
+    def allocate():
+        for _ in range(200):
+            qureg = eng.allocate_qubit()
+            qubits.append(qureg)
+            ids.append(qureg[0].id)
+            # iterating over the active qubits tolerates concurrent modifications
+            assert len(list(eng.active_qubits)) > 0
+
+    threads = [threading.Thread(target=allocate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == 800
+    assert len(eng.active_qubits) == 800
+    eng.dirty_qubits.add(0)
+    assert 0 in eng.dirty_qubits
+    eng.dirty_qubits.remove(0)
+    eng.dirty_qubits.discard(0)
+    assert list(eng.dirty_qubits) == []
+    del qubits[:]
+    eng.flush(deallocate_qubits=True)
+
+
 def test_main_engine_flush():
     backend = DummyEngine(save_commands=True)
     eng = _main.MainEngine(backend=backend, engine_list=[DummyEngine()])
@@ -153,6 +194,89 @@ def test_main_engine_flush():
     assert len(str(qubit)) != 0
 
 
+def test_main_engine_batch_size():
+    received_lists = []
+
+    class ListSavingEngine(DummyEngine):
+        def receive(self, command_list):
+            received_lists.append([cmd.gate for cmd in command_list])
+            super().receive(command_list)
+
+    backend = ListSavingEngine(save_commands=True)
+    eng = _main.MainEngine(backend=backend, engine_list=[DummyEngine()], batch_size=3)
+    qureg = eng.allocate_qureg(2)
+    assert received_lists == [[AllocateQubitGate()], [AllocateQubitGate()]]
+    H | qureg[0]
+    H | qureg[1]
+    assert len(received_lists) == 2
+    X | qureg[0]
+    assert received_lists[2] == [H, H, X]
+
+    # The buffer is sent on before the engine list changes
+    H | qureg[0]
+    with Control(eng, qureg[1]):
+        X | qureg[0]
+    assert received_lists[3] == [H]
+    assert received_lists[4] == [X]
+    assert len(backend.received_commands[-1].control_qubits) == 1
+    H | qureg[1]
+    eng.flush()
+    assert received_lists[5] == [H, FlushGate()]
+
+    # Accessing a measurement result sends the buffer on
+    eng = _main.MainEngine(backend=Simulator(), engine_list=[], batch_size=100)
+    qubit = eng.allocate_qubit()
+    X | qubit
+    Measure | qubit
+    assert int(qubit) == 1
+
+
+def test_main_engine_pipeline():
+    threads = set()
+
+    class ThreadSavingEngine(DummyEngine):
+        def receive(self, command_list):
+            threads.add(threading.current_thread())
+            for cmd in command_list:
+                if cmd.gate == Y:
+                    raise RuntimeError("Y is not supported")
+            super().receive(command_list)
+
+    backend = ThreadSavingEngine(save_commands=True)
+    eng = _main.MainEngine(backend=backend, engine_list=[LocalOptimizer(3)], pipeline_size=2)
+    qureg = eng.allocate_qureg(2)
+    for _ in range(10):
+        H | qureg[0]
+        X | qureg[1]
+    with Control(eng, qureg[1]):
+        X | qureg[0]
+    eng.flush()
+    assert threads == {eng._pipeline_thread}
+    assert threads != {threading.current_thread()}
+    # the H and X gates cancel: 2 allocations, the controlled X gate and the flush remain
+    assert len(backend.received_commands) == 4
+    assert len(backend.received_commands[-2].control_qubits) == 1
+
+    # exceptions of the engines are raised when waiting for the worker thread
+    Y | qureg[0]
+    with pytest.raises(RuntimeError):
+        eng.flush()
+    eng.flush()
+
+    sim = Simulator()
+    eng = _main.MainEngine(backend=sim, engine_list=[], pipeline_size=4)
+    qureg = eng.allocate_qureg(2)
+    X | qureg[0]
+    CNOT | (qureg[0], qureg[1])
+    Measure | qureg[1]
+    assert int(qureg[1]) == 1
+    thread = eng._pipeline_thread
+    # destroying the MainEngine stops the worker thread
+    eng.__del__()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+
+
 def test_main_engine_atexit_no_error():
     # Clear previous exceptions of other tests
     sys.last_type = None
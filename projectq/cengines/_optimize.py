@@ -16,10 +16,163 @@
 
 import warnings
 
-from projectq.ops import FastForwardingGate, FlushGate, NotMergeable
+from projectq.ops import (
+    DaggeredGate,
+    FastForwardingGate,
+    FlushGate,
+    NotMergeable,
+    Ph,
+    R,
+    Rx,
+    Rxx,
+    Ry,
+    Ryy,
+    Rz,
+    Rzz,
+    SGate,
+    SqrtXGate,
+    TGate,
+    XGate,
+    YGate,
+    ZGate,
+)
 
 from ._basics import BasicEngine
 
+# Commutation rules: each gate class is mapped to the Pauli operator whose eigenbasis diagonalizes the gate on each of
+# its target qubits (control qubits are always diagonal in the Z basis). Two commands commute if, on every qubit they
+# share, they are diagonal in the same basis (e.g. Rz and the control of a CNOT, X and the target of a CNOT).
+_COMMUTATION_TABLE = {
+    Ph: 'Z',
+    R: 'Z',
+    Rz: 'Z',
+    Rzz: 'Z',
+    SGate: 'Z',
+    TGate: 'Z',
+    ZGate: 'Z',
+    Rx: 'X',
+    Rxx: 'X',
+    SqrtXGate: 'X',
+    XGate: 'X',
+    Ry: 'Y',
+    Ryy: 'Y',
+    YGate: 'Y',
+}
+
+
+def _get_commutation_bases(cmd):
+    """
+    Return the basis in which a command is diagonal on each of its qubits.
+
+    Args:
+        cmd (Command): Command to classify.
+
+    Returns:
+        dict: Maps qubit IDs to 'X', 'Y', 'Z' or None (if the command is not known to be diagonal in any of them).
+    """
+    gate = cmd.gate
+    if isinstance(gate, DaggeredGate):
+        gate = gate._gate  # pylint: disable=protected-access
+    target_basis = _COMMUTATION_TABLE.get(type(gate))
+    bases = {qb.id: target_basis for qureg in cmd.qubits for qb in qureg}
+    bases.update({qb.id: 'Z' for qb in cmd.control_qubits})
+    return bases
+
+
+def _commutes(bases, cmd):
+    """
+    Check whether a command commutes with a command whose commutation bases are known.
+
+    Args:
+        bases (dict): Commutation bases of the first command (see _get_commutation_bases).
+        cmd (Command): Second command.
+    """
+    for qubit_id, basis in _get_commutation_bases(cmd).items():
+        if qubit_id in bases and (basis is None or basis != bases[qubit_id]):
+            return False
+    return True
+
+
+class _CommandNode:  # pylint: disable=too-few-public-methods
+    """
+    Node of the gate DAG of the LocalOptimizer.
+
+    Each node is part of the (doubly-linked) command list of every qubit its command acts on.
+
+    Attributes:
+        cmd (Command): Command stored in this node.
+        index (int): Insertion index of the node; the order of the nodes in each command list follows this index.
+        qubit_ids (list<int>): IDs of all qubits involved in the command.
+        prev (dict): Maps each qubit ID to the previous node in the command list of that qubit (or None).
+        next (dict): Maps each qubit ID to the next node in the command list of that qubit (or None).
+    """
+
+    __slots__ = ('cmd', 'index', 'qubit_ids', 'prev', 'next')
+
+    def __init__(self, cmd, index):
+        """Initialize a _CommandNode object."""
+        self.cmd = cmd
+        self.index = index
+        self.qubit_ids = [qb.id for qureg in cmd.all_qubits for qb in qureg]
+        self.prev = {}
+        self.next = {}
+
+
+class _CommandList:
+    """
+    Doubly-linked list of the command nodes acting on one qubit.
+
+    Attributes:
+        start (_CommandNode): Node from which the next optimization pass needs to start (None for the head). No
+            optimization is possible for any of the nodes before it.
+    """
+
+    __slots__ = ('qubit_id', 'head', 'tail', 'size', 'start')
+
+    def __init__(self, qubit_id):
+        """Initialize an empty _CommandList object."""
+        self.qubit_id = qubit_id
+        self.head = None
+        self.tail = None
+        self.size = 0
+        self.start = None
+
+    def __len__(self):
+        """Return the number of commands in the list."""
+        return self.size
+
+    def append(self, node):
+        """Append a node at the end of the list."""
+        node.prev[self.qubit_id] = self.tail
+        node.next[self.qubit_id] = None
+        if self.tail is None:
+            self.head = node
+        else:
+            self.tail.next[self.qubit_id] = node
+        self.tail = node
+        self.size += 1
+
+    def remove(self, node):
+        """Remove a node from the list."""
+        prev_node = node.prev.pop(self.qubit_id)
+        next_node = node.next.pop(self.qubit_id)
+        if self.start is node:
+            self.start = prev_node
+        if prev_node is None:
+            self.head = next_node
+        else:
+            prev_node.next[self.qubit_id] = next_node
+        if next_node is None:
+            self.tail = prev_node
+        else:
+            next_node.prev[self.qubit_id] = prev_node
+        self.size -= 1
+
+    def rewind(self, node):
+        """Make sure that the next optimization pass starts at node or before."""
+        if self.start is not None and node.index < self.start.index:
+            self.start = node
+
 
 class LocalOptimizer(BasicEngine):
     """
@@ -28,21 +181,30 @@ class LocalOptimizer(BasicEngine):
     LocalOptimizer is a compiler engine which optimizes locally (merging rotations, cancelling gates with their
     inverse) in a local window of user- defined size.
 
-    It stores all commands in a dict of lists, where each qubit has its own gate pipeline. After adding a gate, it
-    tries to merge / cancel successive gates using the get_merged and get_inverse functions of the gate (if
-    available). For examples, see BasicRotationGate. Once a list corresponding to a qubit contains >=m gates, the
-    pipeline is sent on to the next engine.
+    It stores all commands in a DAG, where each qubit has its own gate pipeline (a doubly-linked list of the nodes
+    acting on that qubit). After adding a gate, it tries to merge / cancel successive gates using the get_merged and
+    get_inverse functions of the gate (if available). For examples, see BasicRotationGate. Once a list corresponding
+    to a qubit contains >=m gates, the pipeline is sent on to the next engine.
+
+    If apply_commutation is True, the optimizer also tries, before a gate is sent on, to merge / cancel it with a later
+    gate in the cache, provided that it commutes with all the gates in between (e.g. Rz(a) | q; CNOT | (q, t);
+    Rz(b) | q becomes CNOT | (q, t); Rz(a + b) | q).
     """
 
-    def __init__(self, cache_size=5, m=None):  # pylint: disable=invalid-name
+    def __init__(self, cache_size=5, m=None, apply_commutation=False):  # pylint: disable=invalid-name
         """
         Initialize a LocalOptimizer object.
 
         Args:
             cache_size (int): Number of gates to cache per qubit, before sending on the first gate.
+            apply_commutation (bool): If True, gates are merged / cancelled with later gates they commute with.
+                Default: False.
         """
         super().__init__()
-        self._l = {}  # dict of lists containing operations for each qubit
+        self._apply_commutation = apply_commutation
+        self._l = {}  # dict of command lists containing operations for each qubit
+        self._num_nodes = 0
+        self._send_buffer = []  # commands to send on at the end of receive
 
         if m:
             warnings.warn(
@@ -53,180 +215,175 @@ class LocalOptimizer(BasicEngine):
             cache_size = m
         self._cache_size = cache_size  # wait for m gates before sending on
 
-    # sends n gate operations of the qubit with index idx
+    def _rewind_before(self, node):
+        """Mark all pairs of successive nodes involving node as candidates for optimization."""
+        for qubit_id in node.qubit_ids:
+            prev_node = node.prev[qubit_id]
+            if prev_node is not None:
+                # prev_node gets a new successor on qubit_id, which may change its pairs on all of its qubits
+                for other_id in prev_node.qubit_ids:
+                    self._l[other_id].rewind(prev_node)
+
+    def _remove_node(self, node):
+        """Remove a node from the command lists of all qubits involved."""
+        self._rewind_before(node)
+        for qubit_id in node.qubit_ids:
+            self._l[qubit_id].remove(node)
+
+    def _send_first_command(self, idx):
+        """Send the first command of the qubit with index idx to the next engine."""
+        node = self._l[idx].head
+        # send all gates before n-qubit gate for other qubits involved
+        for qubit_id in node.qubit_ids:
+            if qubit_id != idx:
+                self._optimize(qubit_id, node)
+                while node.prev and self._l[qubit_id].head is not node:
+                    self._send_first_command(qubit_id)
+                if not node.prev:  # the gate was cancelled by one of the gates before it
+                    return
+
+        if self._apply_commutation and self._merge_with_commuting_gates(node):
+            return
+
+        # all qubits that need to be flushed have been flushed
+        # --> send on the n-qubit gate
+        self._remove_node(node)
+        self._send_buffer.append(node.cmd)
+
     def _send_qubit_pipeline(self, idx, n_gates):
         """Send n gate operations of the qubit with index idx to the next engine."""
-        il = self._l[idx]  # pylint: disable=invalid-name
-        for i in range(min(n_gates, len(il))):  # loop over first n operations
-            # send all gates before n-qubit gate for other qubits involved
-            # --> recursively call send_helper
-            other_involved_qubits = [qb for qreg in il[i].all_qubits for qb in qreg if qb.id != idx]
-            for qb in other_involved_qubits:
-                qubit_id = qb.id
-                try:
-                    gateloc = 0
-                    # find location of this gate within its list
-                    while self._l[qubit_id][gateloc] != il[i]:
-                        gateloc += 1
-
-                    gateloc = self._optimize(qubit_id, gateloc)
-
-                    # flush the gates before the n-qubit gate
-                    self._send_qubit_pipeline(qubit_id, gateloc)
-                    # delete the n-qubit gate, we're taking care of it
-                    # and don't want the other qubit to do so
-                    self._l[qubit_id] = self._l[qubit_id][1:]
-                except IndexError:  # pragma: no cover
-                    print("Invalid qubit pipeline encountered (in the process of shutting down?).")
-
-            # all qubits that need to be flushed have been flushed
-            # --> send on the n-qubit gate
-            self.send([il[i]])
-        # n operations have been sent on --> resize our gate list
-        self._l[idx] = self._l[idx][n_gates:]
-
-    def _get_gate_indices(self, idx, i, qubit_ids):
-        """
-        Return all indices of a command.
+        pipeline = self._l[idx]
+        for _ in range(min(n_gates, len(pipeline))):
+            if len(pipeline) == 0:
+                break
+            self._send_first_command(idx)
 
-        Each index corresponding to the command's index in one of the qubits' command lists.
+    def _merge_with_commuting_gates(self, node):
+        """
+        Merge / cancel a gate with a later gate by commuting it past the gates in between.
 
         Args:
-            idx (int): qubit index
-            i (int): command position in qubit idx's command list
-            IDs (list<int>): IDs of all qubits involved in the command
+            node (_CommandNode): Node at the head of the command lists of all of its qubits.
+
+        Returns:
+            True if the node has been merged / cancelled (and removed), False otherwise.
         """
-        N = len(qubit_ids)
-        # 1-qubit gate: only gate at index i in list #idx is involved
-        if N == 1:
-            return [i]
-
-        # When the same gate appears multiple time, we need to make sure not to
-        # match earlier instances of the gate applied to the same qubits. So we
-        # count how many there are, and skip over them when looking in the
-        # other lists.
-        cmd = self._l[idx][i]
-        num_identical_to_skip = sum(1 for prev_cmd in self._l[idx][:i] if prev_cmd == cmd)
-        indices = []
-        for qubit_id in qubit_ids:
-            identical_indices = [i for i, c in enumerate(self._l[qubit_id]) if c == cmd]
-            indices.append(identical_indices[num_identical_to_skip])
-        return indices
-
-    def _optimize(self, idx, lim=None):
+        bases = _get_commutation_bases(node.cmd)
+        if None in bases.values():
+            return False
+
+        idx = node.qubit_ids[0]
+        inv = None
+        candidate = node.next[idx]
+        while candidate is not None:
+            if len(candidate.qubit_ids) == len(node.qubit_ids) and all(
+                self._commutes_until(node, bases, qubit_id, candidate) for qubit_id in node.qubit_ids[1:]
+            ):
+                if inv is None:
+                    inv = node.cmd.get_inverse()
+                if inv == candidate.cmd:
+                    self._remove_node(node)
+                    self._remove_node(candidate)
+                    return True
+                try:
+                    candidate.cmd = node.cmd.get_merged(candidate.cmd)
+                    self._rewind_before(candidate)
+                    for qubit_id in candidate.qubit_ids:
+                        self._l[qubit_id].rewind(candidate)
+                    self._remove_node(node)
+                    return True
+                except NotMergeable:
+                    pass
+            if not _commutes(bases, candidate.cmd):
+                return False
+            candidate = candidate.next[idx]
+        return False
+
+    @staticmethod
+    def _commutes_until(node, bases, qubit_id, candidate):
+        """Check that all the gates between node and candidate on a qubit commute with node."""
+        other = node.next[qubit_id]
+        while other is not candidate:
+            if other is None or not _commutes(bases, other.cmd):
+                return False
+            other = other.next[qubit_id]
+        return True
+
+    def _optimize(self, idx, stop=None):
         """
         Gate cancellation routine.
 
         Try to remove identity gates using the is_identity function, then merge or even cancel successive gates using
         the get_merged and get_inverse functions of the gate (see, e.g., BasicRotationGate).
 
-        It does so for all qubit command lists.
+        It does so for the command list of qubit idx, up to (but excluding) the node stop. Nodes for which no
+        optimization is possible are remembered, so that each pass only looks at the nodes whose neighbourhood changed
+        since the last pass.
         """
-        # loop over all qubit indices
-        i = 0
-        limit = len(self._l[idx])
-        if lim is not None:
-            limit = lim
+        pipeline = self._l[idx]
+        if stop is not None and pipeline.start is not None and pipeline.start.index >= stop.index:
+            return
+        node = pipeline.start or pipeline.head
+        while node is not None and node is not stop:
+            next_node = node.next[idx]
+            if next_node is None or next_node is stop:
+                break
 
-        while i < limit - 1:
             # can be dropped if the gate is equivalent to an identity gate
-            if self._l[idx][i].is_identity():
-                # determine index of this gate on all qubits
-                qubitids = [qb.id for sublist in self._l[idx][i].all_qubits for qb in sublist]
-                gid = self._get_gate_indices(idx, i, qubitids)
-                for j, qubit_id in enumerate(qubitids):
-                    new_list = (
-                        self._l[qubit_id][0 : gid[j]] + self._l[qubit_id][gid[j] + 1 :]  # noqa: E203  # noqa: E203
-                    )
-                self._l[qubitids[j]] = new_list  # pylint: disable=undefined-loop-variable
-                i = 0
-                limit -= 1
+            if node.cmd.is_identity():
+                self._remove_node(node)
+                node = pipeline.start or pipeline.head
                 continue
 
             # can be dropped if two in a row are self-inverses
-            inv = self._l[idx][i].get_inverse()
-
-            if inv == self._l[idx][i + 1]:
-                # determine index of this gate on all qubits
-                qubitids = [qb.id for sublist in self._l[idx][i].all_qubits for qb in sublist]
-                gid = self._get_gate_indices(idx, i, qubitids)
-                # check that there are no other gates between this and its
-                # inverse on any of the other qubits involved
-                erase = True
-                for j, qubit_id in enumerate(qubitids):
-                    erase *= inv == self._l[qubit_id][gid[j] + 1]
-
-                # drop these two gates if possible and goto next iteration
-                if erase:
-                    for j, qubit_id in enumerate(qubitids):
-                        new_list = (
-                            self._l[qubit_id][0 : gid[j]] + self._l[qubit_id][gid[j] + 2 :]  # noqa: E203  # noqa: E203
-                        )
-                        self._l[qubit_id] = new_list
-                    i = 0
-                    limit -= 2
-                    continue
+            # (the next node must be the same on all the other qubits involved)
+            inv = node.cmd.get_inverse()
+            if inv == next_node.cmd and all(node.next[qubit_id] is next_node for qubit_id in node.qubit_ids):
+                self._remove_node(node)
+                self._remove_node(next_node)
+                node = pipeline.start or pipeline.head
+                continue
 
             # gates are not each other's inverses --> check if they're
             # mergeable
             try:
-                merged_command = self._l[idx][i].get_merged(self._l[idx][i + 1])
-                # determine index of this gate on all qubits
-                qubitids = [qb.id for sublist in self._l[idx][i].all_qubits for qb in sublist]
-                gid = self._get_gate_indices(idx, i, qubitids)
-
-                merge = True
-                for j, qubit_id in enumerate(qubitids):
-                    merged = self._l[qubit_id][gid[j]].get_merged(self._l[qubit_id][gid[j] + 1])
-                    merge *= merged == merged_command
-
-                if merge:
-                    for j, qubit_id in enumerate(qubitids):
-                        self._l[qubit_id][gid[j]] = merged_command
-                        new_list = (
-                            self._l[qubit_id][0 : gid[j] + 1]  # noqa: E203
-                            + self._l[qubit_id][gid[j] + 2 :]  # noqa: E203
-                        )
-                        self._l[qubit_id] = new_list
-                    i = 0
-                    limit -= 1
+                merged_command = node.cmd.get_merged(next_node.cmd)
+                if all(node.next[qubit_id] is next_node for qubit_id in node.qubit_ids):
+                    node.cmd = merged_command
+                    self._rewind_before(node)
+                    self._remove_node(next_node)
+                    node = pipeline.start or pipeline.head
                     continue
             except NotMergeable:
                 pass  # can't merge these two commands.
 
-            i += 1  # next iteration: look at next gate
-        return limit
+            node = next_node  # next iteration: look at next gate
+        pipeline.start = node
 
     def _check_and_send(self):
         """Check whether a qubit pipeline must be sent on and, if so, optimize the pipeline and then send it on."""
         # NB: self.optimize(i) modifies self._l
-        for i in self._l:  # pylint: disable=consider-using-dict-items
-            if (
-                len(self._l[i]) >= self._cache_size
-                or len(self._l[i]) > 0
-                and isinstance(self._l[i][-1].gate, FastForwardingGate)
+        for i, pipeline in self._l.items():
+            if len(pipeline) >= self._cache_size or (
+                len(pipeline) > 0 and isinstance(pipeline.tail.cmd.gate, FastForwardingGate)
             ):
                 self._optimize(i)
-                if len(self._l[i]) >= self._cache_size and not isinstance(self._l[i][-1].gate, FastForwardingGate):
-                    self._send_qubit_pipeline(i, len(self._l[i]) - self._cache_size + 1)
-                elif len(self._l[i]) > 0 and isinstance(self._l[i][-1].gate, FastForwardingGate):
-                    self._send_qubit_pipeline(i, len(self._l[i]))
-        new_dict = {}
-        for idx, _l in self._l.items():
-            if len(_l) > 0:
-                new_dict[idx] = _l
-        self._l = new_dict
+                if len(pipeline) >= self._cache_size and not isinstance(pipeline.tail.cmd.gate, FastForwardingGate):
+                    self._send_qubit_pipeline(i, len(pipeline) - self._cache_size + 1)
+                elif len(pipeline) > 0 and isinstance(pipeline.tail.cmd.gate, FastForwardingGate):
+                    self._send_qubit_pipeline(i, len(pipeline))
+        self._l = {idx: pipeline for idx, pipeline in self._l.items() if len(pipeline) > 0}
 
     def _cache_cmd(self, cmd):
         """Cache a command, i.e., inserts it into the command lists of all qubits involved."""
-        # are there qubit ids that haven't been added to the list?
-        idlist = [qubit.id for sublist in cmd.all_qubits for qubit in sublist]
+        node = _CommandNode(cmd, self._num_nodes)
+        self._num_nodes += 1
 
         # add gate command to each of the qubits involved
-        for qubit_id in idlist:
+        for qubit_id in node.qubit_ids:
             if qubit_id not in self._l:
-                self._l[qubit_id] = []
-            self._l[qubit_id] += [cmd]
+                self._l[qubit_id] = _CommandList(qubit_id)
+            self._l[qubit_id].append(node)
 
         self._check_and_send()
 
@@ -235,21 +392,21 @@ class LocalOptimizer(BasicEngine):
         Receive a list of commands.
 
         Receive commands from the previous engine and cache them.  If a flush gate arrives, the entire buffer is sent
-        on.
+        on. All the commands leaving the cache are sent on together at the end.
         """
         for cmd in command_list:
             if cmd.gate == FlushGate():  # flush gate --> optimize and flush
                 # NB: self.optimize(i) modifies self._l
-                for idx in self._l:  # pylint: disable=consider-using-dict-items
+                for idx, pipeline in self._l.items():
                     self._optimize(idx)
-                    self._send_qubit_pipeline(idx, len(self._l[idx]))
-                new_dict = {}
-                for idx, _l in self._l.items():
-                    if len(_l) > 0:  # pragma: no cover
-                        new_dict[idx] = _l
-                self._l = new_dict
+                    self._send_qubit_pipeline(idx, len(pipeline))
+                self._l = {idx: pipeline for idx, pipeline in self._l.items() if len(pipeline) > 0}
                 if self._l:  # pragma: no cover
                     raise RuntimeError('Internal compiler error: qubits remaining in LocalOptimizer after a flush!')
-                self.send([cmd])
+                self._send_buffer.append(cmd)
             else:
                 self._cache_cmd(cmd)
+
+        if self._send_buffer:
+            command_list, self._send_buffer = self._send_buffer, []
+            self.send(command_list)
@@ -27,6 +27,8 @@ from projectq.ops import (
     H,
     Rx,
     Ry,
+    Rz,
+    Rzz,
     X,
 )
 
@@ -38,6 +40,7 @@ def test_local_optimizer_init_api_change():
 
     local_optimizer = _optimize.LocalOptimizer()
     assert local_optimizer._cache_size == 5
+    assert not local_optimizer._apply_commutation
 
     local_optimizer = _optimize.LocalOptimizer(cache_size=10)
     assert local_optimizer._cache_size == 10
@@ -164,3 +167,67 @@ def test_local_optimizer_identity_gates():
     # Expect allocate, one Rx gate, and flush gate
     assert len(backend.received_commands) == 3
     assert backend.received_commands[1].gate == Rx(0.5)
+
+
+def test_local_optimizer_multi_qubit_identity_and_large_cache():
+    local_optimizer = _optimize.LocalOptimizer(cache_size=500)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend, engine_list=[local_optimizer])
+    qb0 = eng.allocate_qubit()
+    qb1 = eng.allocate_qubit()
+    for _ in range(200):
+        Rx(0.5) | qb0
+        CNOT | (qb0, qb1)
+        Rzz(0.0) | (qb0, qb1)
+        CNOT | (qb0, qb1)
+        Rx(-0.5) | qb0
+    Rx(0.5) | qb1
+    assert len(backend.received_commands) == 0
+    eng.flush()
+    # Expect two allocates, one Rx gate, and flush gate
+    assert len(backend.received_commands) == 4
+    assert backend.received_commands[2].gate == Rx(0.5)
+
+
+@pytest.mark.parametrize("apply_commutation", [False, True])
+def test_local_optimizer_commutation(apply_commutation):
+    local_optimizer = _optimize.LocalOptimizer(cache_size=10, apply_commutation=apply_commutation)
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend, engine_list=[local_optimizer])
+    qb0 = eng.allocate_qubit()
+    qb1 = eng.allocate_qubit()
+    qb2 = eng.allocate_qubit()
+    # Rz on the control commutes with the CNOTs
+    Rz(0.5) | qb0
+    CNOT | (qb0, qb1)
+    CNOT | (qb0, qb2)
+    Rz(0.25) | qb0
+    # X on the target commutes with the CNOT, but not with Ry
+    X | qb1
+    CNOT | (qb2, qb1)
+    X | qb1
+    Ry(0.5) | qb2
+    Rx(0.5) | qb1
+    CNOT | (qb2, qb1)
+    Rx(-0.5) | qb1
+    # Rx on the control does not commute with a CNOT
+    Rx(0.5) | qb0
+    CNOT | (qb0, qb2)
+    Rx(0.5) | qb0
+    eng.flush()
+
+    received_commands = [
+        cmd
+        for cmd in backend.received_commands
+        if not isinstance(cmd.gate, (FastForwardingGate, ClassicalInstructionGate))
+    ]
+    if not apply_commutation:
+        assert len(received_commands) == 14
+        return
+    assert len(received_commands) == 9
+    assert [cmd.gate for cmd in received_commands if cmd.qubits[0][0].id == qb0[0].id] == [
+        Rz(0.75),
+        Rx(0.5),
+        Rx(0.5),
+    ]
+    assert [cmd.gate for cmd in received_commands if cmd.qubits[0][0].id == qb1[0].id] == [X, X, X]
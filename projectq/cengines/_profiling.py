@@ -0,0 +1,239 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Contains a profiler recording the time spent in the compiler engines of a MainEngine."""
+
+import json
+import time
+
+from projectq.backends import Simulator
+
+
+class EngineStatistics:  # pylint: disable=too-few-public-methods
+    """
+    Statistics of a single compiler engine recorded by an EngineProfiler.
+
+    Attributes:
+        name (str): Name of the engine (its class name, followed by '#<n>' if the engine list contains several engines
+            of the same class).
+        calls (int): Number of calls to receive (not counting re-entrant calls).
+        commands_in (int): Number of commands received (not counting commands received in re-entrant calls).
+        commands_out (int): Number of commands sent on to the next engine.
+        total_time (float): Wall time (in seconds) spent in receive, including the time spent in the engines further
+            down the pipeline.
+        self_time (float): Wall time (in seconds) spent in receive, excluding the time spent in the engines further
+            down the pipeline.
+    """
+
+    def __init__(self, name):
+        """Initialize empty statistics for the engine with the given name."""
+        self.name = name
+        self.calls = 0
+        self.commands_in = 0
+        self.commands_out = 0
+        self.total_time = 0.0
+        self.self_time = 0.0
+
+    @property
+    def amplification(self):
+        """Return the ratio of the number of commands sent on to the number of commands received."""
+        if self.commands_in == 0:
+            return 0.0
+        return self.commands_out / self.commands_in
+
+
+class EngineProfiler:
+    """
+    Profiler recording the time spent in the compiler engines of a MainEngine.
+
+    A profiler is created and attached to the engines of a MainEngine using MainEngine.start_profiling() and detached
+    using MainEngine.stop_profiling(). While attached, it records for every engine the wall time spent in receive, the
+    number of commands received and sent on and, for simulator backends, the time spent applying each gate class.
+    Engines are instrumented by replacing their receive and send methods, so there is no overhead at all while no
+    profiler is attached.
+
+    The recorded data can be printed as a summary table (str(profiler)) or exported in the Chrome trace event format
+    (see save_chrome_trace()), which can be viewed using, e.g., chrome://tracing or https://ui.perfetto.dev.
+
+    Attributes:
+        engine_statistics (list<EngineStatistics>): Statistics of the profiled engines, in pipeline order.
+        kernel_statistics (dict): Dictionary mapping gate class names to a list [count, time] of the number of
+            commands handled by the simulator and the wall time (in seconds) spent applying them.
+    """
+
+    def __init__(self, trace_events=True):
+        """
+        Initialize an EngineProfiler.
+
+        Args:
+            trace_events (bool): If True, each call to receive and each gate application is recorded as an event for
+                the Chrome trace export (requires memory proportional to the number of calls).
+        """
+        self.engine_statistics = []
+        self.kernel_statistics = {}
+        self._trace_events = [] if trace_events else None
+        self._child_times = []
+        self._instrumented = []
+        self._start = time.perf_counter_ns()
+
+    def attach(self, engines):
+        """
+        Instrument the given compiler engines.
+
+        Args:
+            engines (list<BasicEngine>): Engines to profile, in pipeline order.
+        """
+        names = [type(engine).__name__ for engine in engines]
+        for idx, engine in enumerate(engines):
+            name = names[idx]
+            if names.count(name) > 1:
+                name += f"#{names[:idx].count(name) + 1}"
+            statistics = EngineStatistics(name)
+            self.engine_statistics.append(statistics)
+            saved = {attr: engine.__dict__.get(attr) for attr in ('receive', 'send', '_handle')}
+            self._instrumented.append((engine, saved))
+            engine.receive = self._profiled_receive(engine.receive, statistics)
+            engine.send = self._profiled_send(engine.send, statistics)
+            if isinstance(engine, Simulator):
+                engine._handle = self._profiled_handle(engine._handle)  # pylint: disable=protected-access
+
+    def detach(self):
+        """Restore the original methods of all instrumented engines."""
+        for engine, saved in self._instrumented:
+            for attr, method in saved.items():
+                if method is not None:
+                    setattr(engine, attr, method)
+                elif attr in engine.__dict__:
+                    delattr(engine, attr)
+        self._instrumented = []
+
+    def _profiled_receive(self, receive, statistics):
+        """Return a wrapper of receive which records the statistics of the engine."""
+        clock = time.perf_counter_ns
+        child_times = self._child_times
+        trace_events = self._trace_events
+        name = statistics.name
+
+        active = False
+
+        def profiled_receive(command_list):
+            nonlocal active
+            if active:
+                # re-entrant call (e.g., the AutoReplacer receiving its own decompositions)
+                receive(command_list)
+                return
+            active = True
+            child_times.append(0)
+            start = clock()
+            try:
+                receive(command_list)
+            finally:
+                active = False
+                duration = clock() - start
+                child_time = child_times.pop()
+                if child_times:
+                    child_times[-1] += duration
+                statistics.calls += 1
+                statistics.commands_in += len(command_list)
+                statistics.total_time += duration * 1e-9
+                statistics.self_time += (duration - child_time) * 1e-9
+                if trace_events is not None:
+                    trace_events.append((name, 'engine', start, duration, len(command_list)))
+
+        return profiled_receive
+
+    @staticmethod
+    def _profiled_send(send, statistics):
+        """Return a wrapper of send which counts the commands sent on by the engine."""
+
+        def profiled_send(command_list):
+            statistics.commands_out += len(command_list)
+            send(command_list)
+
+        return profiled_send
+
+    def _profiled_handle(self, handle):
+        """Return a wrapper of Simulator._handle which records the time spent per gate class."""
+        clock = time.perf_counter_ns
+        kernel_statistics = self.kernel_statistics
+        trace_events = self._trace_events
+
+        def profiled_handle(cmd):
+            start = clock()
+            try:
+                handle(cmd)
+            finally:
+                duration = clock() - start
+                name = type(cmd.gate).__name__
+                if name not in kernel_statistics:
+                    kernel_statistics[name] = [0, 0.0]
+                kernel_statistics[name][0] += 1
+                kernel_statistics[name][1] += duration * 1e-9
+                if trace_events is not None:
+                    trace_events.append((name, 'kernel', start, duration, 1))
+
+        return profiled_handle
+
+    def get_chrome_trace(self):
+        """
+        Return the recorded events in the Chrome trace event format.
+
+        Every call to receive and every gate application of a simulator is represented by a complete event ('X'), with
+        timestamps in microseconds since the creation of the profiler.
+
+        Returns:
+            Dictionary which can be serialized to JSON and loaded by trace viewers.
+        """
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': 0, 'args': {'name': 'ProjectQ engines'}}]
+        for name, category, start, duration, num_commands in self._trace_events or []:
+            events.append(
+                {
+                    'name': name,
+                    'cat': category,
+                    'ph': 'X',
+                    'ts': (start - self._start) / 1000,
+                    'dur': duration / 1000,
+                    'pid': 0,
+                    'tid': 0,
+                    'args': {'commands': num_commands},
+                }
+            )
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, filename):
+        """
+        Write the recorded events to a JSON file in the Chrome trace event format.
+
+        Args:
+            filename (str): Name of the file to write.
+        """
+        with open(filename, 'w', encoding='utf-8') as file:
+            json.dump(self.get_chrome_trace(), file)
+
+    def __str__(self):
+        """Return a summary table of the recorded statistics."""
+        lines = [
+            f"{'Engine':<24}{'calls':>10}{'cmds in':>12}{'cmds out':>12}{'ampl.':>8}{'total [ms]':>13}{'self [ms]':>13}"
+        ]
+        for stats in self.engine_statistics:
+            lines.append(
+                f"{stats.name:<24}{stats.calls:>10}{stats.commands_in:>12}{stats.commands_out:>12}"
+                f"{stats.amplification:>8.2f}{stats.total_time * 1e3:>13.3f}{stats.self_time * 1e3:>13.3f}"
+            )
+        if self.kernel_statistics:
+            lines.append("")
+            lines.append(f"{'Simulator gate class':<24}{'count':>10}{'time [ms]':>13}{'avg [us]':>12}")
+            for name, (count, duration) in sorted(self.kernel_statistics.items(), key=lambda item: -item[1][1]):
+                lines.append(f"{name:<24}{count:>10}{duration * 1e3:>13.3f}{duration * 1e6 / count:>12.2f}")
+        return "\n".join(lines)
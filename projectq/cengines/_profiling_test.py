@@ -0,0 +1,95 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""Tests for projectq.cengines._profiling.py."""
+
+import json
+
+from projectq import MainEngine
+from projectq.backends import Simulator
+from projectq.cengines import (
+    AutoReplacer,
+    DecompositionRuleSet,
+    DummyEngine,
+    EngineProfiler,
+    TagRemover,
+)
+from projectq.ops import CNOT, All, H, Measure, Toffoli
+from projectq.setups.decompositions import toffoli2cnotandtgate
+
+
+def test_engine_profiler_statistics():
+    rule_set = DecompositionRuleSet(modules=[toffoli2cnotandtgate])
+
+    backend = DummyEngine(save_commands=True)
+    backend.is_available = lambda cmd: len(cmd.control_qubits) < 2
+    eng = MainEngine(backend, [TagRemover(), AutoReplacer(rule_set), TagRemover()])
+    profiler = eng.start_profiling()
+    assert isinstance(profiler, EngineProfiler)
+    qureg = eng.allocate_qureg(3)
+    Toffoli | (qureg[0], qureg[1], qureg[2])
+    eng.flush()
+    assert eng.stop_profiling() is profiler
+    assert eng.stop_profiling() is None
+
+    names = [stats.name for stats in profiler.engine_statistics]
+    assert names == ['MainEngine', 'TagRemover#1', 'AutoReplacer', 'TagRemover#2', 'DummyEngine']
+    stats = dict(zip(names, profiler.engine_statistics))
+    num_commands = len(backend.received_commands)
+    # 3 allocations, the Toffoli gate and the flush
+    assert stats['TagRemover#1'].commands_in == 5
+    assert stats['TagRemover#1'].commands_out == 5
+    assert stats['AutoReplacer'].commands_out == num_commands
+    assert stats['AutoReplacer'].amplification == num_commands / 5
+    assert stats['DummyEngine'].commands_in == num_commands
+    assert stats['DummyEngine'].amplification == 0.0
+    for stats in profiler.engine_statistics:
+        assert 0 <= stats.self_time <= stats.total_time
+
+    # the engines are no longer instrumented
+    for engine in [eng, eng.next_engine, backend]:
+        assert 'receive' not in engine.__dict__
+        assert 'send' not in engine.__dict__
+    assert str(profiler).splitlines()[0].startswith('Engine')
+
+
+def test_engine_profiler_simulator_and_trace(tmpdir):
+    sim = Simulator()
+    eng = MainEngine(sim, [])
+    profiler = eng.start_profiling()
+    qureg = eng.allocate_qureg(2)
+    H | qureg[0]
+    CNOT | (qureg[0], qureg[1])
+    All(Measure) | qureg
+    eng.flush()
+    # restarting replaces the attached profiler
+    new_profiler = eng.start_profiling(trace_events=False)
+    H | qureg[0]
+    eng.stop_profiling()
+    assert '_handle' not in sim.__dict__
+
+    assert profiler.kernel_statistics['HGate'][0] == 1
+    assert profiler.kernel_statistics['XGate'][0] == 1
+    assert profiler.kernel_statistics['MeasureGate'][0] == 2
+    assert 'Simulator gate class' in str(profiler)
+    assert new_profiler.kernel_statistics['HGate'][0] == 1
+    assert new_profiler.get_chrome_trace()['traceEvents'][1:] == []
+
+    filename = str(tmpdir.join('trace.json'))
+    profiler.save_chrome_trace(filename)
+    with open(filename, encoding='utf-8') as file:
+        trace = json.load(file)
+    events = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    assert {event['cat'] for event in events} == {'engine', 'kernel'}
+    assert all(event['dur'] >= 0 and event['ts'] >= 0 for event in events)
+    assert sum(event['name'] == 'Simulator' for event in events) == profiler.engine_statistics[1].calls
@@ -18,7 +18,14 @@ from projectq.meta import Dagger
 
 
 class DecompositionRuleSet:
-    """A collection of indexed decomposition rules."""
+    """
+    A collection of indexed decomposition rules.
+
+    Note:
+        The candidate decompositions of each (gate class, inverse gate class) pair are cached. Rules should therefore
+        only be added using :meth:`add_decomposition_rule` or :meth:`add_decomposition_rules`, which invalidate the
+        cache.
+    """
 
     def __init__(self, rules=None, modules=None):
         """
@@ -30,6 +37,8 @@ class DecompositionRuleSet:
                 "all_defined_decomposition_rules" property containing decomposition rules to add to the rule set.
         """
         self.decompositions = {}
+        self._candidates_cache = {}
+        self._controlstate_rule = None
 
         if rules:
             self.add_decomposition_rules(rules)
@@ -56,6 +65,64 @@ class DecompositionRuleSet:
         if cls not in self.decompositions:
             self.decompositions[cls] = []
         self.decompositions[cls].append(decomp_obj)
+        self._candidates_cache.clear()
+        self._controlstate_rule = None
+
+    def get_controlstate_rule(self):
+        """
+        Return the decomposition rule removing negatively controlled qubits (if present in the rule set).
+
+        Returns:
+            The first Decomposition registered for BasicGate whose decomposition function is `_decompose_controlstate`,
+            or None.
+        """
+        if self._controlstate_rule is None:
+            rules = [
+                rule
+                for rule in self.decompositions.get('BasicGate', [])
+                if rule.decompose.__name__ == '_decompose_controlstate'
+            ]
+            self._controlstate_rule = rules[0] if rules else False
+        return self._controlstate_rule or None
+
+    def get_candidate_decompositions(self, gate_class, inverse_class):
+        """
+        Return the decompositions which may apply to a gate, grouped by priority.
+
+        First come the decomposition rules of the gate class, then the (inverted) rules of the gate class of the
+        inverse gate, then the same for the first parent classes, etc. Empty groups are left out. The result is
+        cached.
+
+        Args:
+            gate_class (type): Class of the gate to decompose.
+            inverse_class (type): Class of the inverse of the gate to decompose.
+
+        Returns:
+            list<list<Decomposition>>: Groups of candidate decompositions, in decreasing order of priority.
+        """
+        key = (gate_class, inverse_class)
+        try:
+            return self._candidates_cache[key]
+        except KeyError:
+            pass
+
+        gate_mro = gate_class.mro()[:-1]
+        # If gate does not have an inverse it's parent classes are
+        # DaggeredGate, BasicGate, object. Hence don't check the last two
+        inverse_mro = inverse_class.mro()[:-2]
+        candidates = []
+        for level in range(max(len(gate_mro), len(inverse_mro))):
+            # Check for forward rules
+            if level < len(gate_mro) and gate_mro[level].__name__ in self.decompositions:
+                candidates.append(list(self.decompositions[gate_mro[level].__name__]))
+            # Check for rules implementing the inverse gate
+            # and run them in reverse
+            if level < len(inverse_mro) and inverse_mro[level].__name__ in self.decompositions:
+                candidates.append(
+                    [decomp.get_inverse_decomposition() for decomp in self.decompositions[inverse_mro[level].__name__]]
+                )
+        self._candidates_cache[key] = candidates
+        return candidates
 
 
 class ModuleWithDecompositionRuleSet:  # pragma: no cover # pylint: disable=too-few-public-methods
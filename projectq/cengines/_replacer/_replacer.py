@@ -22,7 +22,17 @@ The InstructionFilter can be used to further specify which gates to replace/keep
 """
 
 from projectq.cengines import BasicEngine, CommandModifier, ForwarderEngine
-from projectq.ops import FlushGate, get_inverse
+from projectq.ops import (
+    AllocateDirtyQubitGate,
+    AllocateQubitGate,
+    Command,
+    DeallocateQubitGate,
+    FlushGate,
+    MeasureGate,
+    get_inverse,
+)
+from projectq.ops._basics import _has_value_equality
+from projectq.types import WeakQubitRef
 
 
 class NoGateDecompositionError(Exception):
@@ -89,6 +99,7 @@ class AutoReplacer(BasicEngine):
         self,
         decomposition_rule_se,
         decomposition_chooser=lambda cmd, decomposition_list: decomposition_list[0],
+        cache_expansions=False,
     ):
         """
         Initialize an AutoReplacer.
@@ -98,6 +109,21 @@ class AutoReplacer(BasicEngine):
                 Command to decompose and a list of potential Decomposition
                 objects, determines (and then returns) the 'best'
                 decomposition.
+            cache_expansions (bool): If True, the fully expanded sequence of
+                commands sent on when decomposing a command is recorded as a
+                template over relative qubit indices, and replayed for later
+                commands with the same gate, number of qubits and controls,
+                control state and tag types (see Note below).
+
+        Note:
+            Expansions are only cached if they contain no measurement and
+            deallocate every qubit they allocate. Gates with attributes of
+            their own are only cached if their class defines __eq__, as the
+            default gate equality only compares the classes. Caching assumes
+            that the decomposition of a command only depends on the above key
+            (in particular not on measurement outcomes or on the gate's
+            attributes beyond gate equality) and that the engines following
+            the AutoReplacer do not change.
 
         The default decomposition chooser simply returns the first list
         element, i.e., calling
@@ -119,13 +145,14 @@ class AutoReplacer(BasicEngine):
         super().__init__()
         self._decomp_chooser = decomposition_chooser
         self.decomposition_rule_set = decomposition_rule_se
+        self._expansion_cache = {} if cache_expansions else None
+        self._recorded_commands = None
 
-    def _process_command(self, cmd):  # pylint: disable=too-many-locals,too-many-branches
+    def _process_command(self, cmd):
         """
-        Process a command.
+        Process a command which cannot be handled by further engines.
 
-        Check whether a command cmd can be handled by further engines and, if not, replace it using the decomposition
-        rules loaded with the setup (e.g., setups.default).
+        Replace the command cmd using the decomposition rules loaded with the setup (e.g., setups.default).
 
         Args:
             cmd (Command): Command to process.
@@ -133,89 +160,180 @@ class AutoReplacer(BasicEngine):
         Raises:
             Exception if no replacement is available in the loaded setup.
         """
-        if self.is_available(cmd):  # pylint: disable=too-many-nested-blocks
-            self.send([cmd])
+        key = self._get_expansion_key(cmd)
+        if key is None:
+            self._decompose(cmd)
+            return
+
+        template = self._expansion_cache.get(key)
+        if template is not None:
+            self._replay_expansion(cmd, template)
+        elif self._recorded_commands is None:
+            # Record the commands sent on while decomposing this command (including those of nested decompositions)
+            self._recorded_commands = []
+            try:
+                qubit_ids = [qb.id for qureg in cmd.qubits for qb in qureg] + [qb.id for qb in cmd.control_qubits]
+                tags = cmd.tags[:]
+                self._decompose(cmd)
+                template = self._make_expansion_template(qubit_ids, tags, self._recorded_commands)
+                if template is not None:
+                    self._expansion_cache[key] = template
+            finally:
+                self._recorded_commands = None
         else:
-            # First check for a decomposition rules of the gate class, then
-            # the gate class of the inverse gate. If nothing is found, do the
-            # same for the first parent class, etc.
-            gate_mro = type(cmd.gate).mro()[:-1]
-            # If gate does not have an inverse it's parent classes are
-            # DaggeredGate, BasicGate, object. Hence don't check the last two
-            inverse_mro = type(get_inverse(cmd.gate)).mro()[:-2]
-            rules = self.decomposition_rule_set.decompositions
-
-            # If the decomposition rule to remove negatively controlled qubits is present in the list of potential
-            # decompositions, we process it immediately, before any other decompositions.
-            controlstate_rule = [
-                rule for rule in rules.get('BasicGate', []) if rule.decompose.__name__ == '_decompose_controlstate'
+            self._decompose(cmd)
+
+    def _get_expansion_key(self, cmd):
+        """Return the key of a command in the expansion cache (or None if expansions are not cached)."""
+        if self._expansion_cache is None or not _has_value_equality(cmd.gate):
+            return None
+        key = (
+            cmd.gate,
+            tuple(len(qureg) for qureg in cmd.qubits),
+            len(cmd.control_qubits),
+            cmd.control_state,
+            tuple(type(tag) for tag in cmd.tags),
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    @staticmethod
+    def _make_expansion_template(qubit_ids, tags, recorded_commands):
+        """
+        Turn the commands recorded while decomposing a command into a template over relative qubit indices.
+
+        Args:
+            qubit_ids (list<int>): IDs of the qubits (followed by the control qubits) of the decomposed command.
+            tags (list): Tags of the decomposed command.
+            recorded_commands (list<tuple>): Recorded (gate, qubit IDs, control IDs, control state, tags) tuples.
+
+        Returns:
+            A tuple (number of allocated qubits, list of commands with relative qubit indices and additional tags),
+            or None if the expansion cannot be cached.
+        """
+        indices = {qubit_id: i for i, qubit_id in enumerate(qubit_ids)}
+        allocated = set()
+        template = []
+        for gate, cmd_qubit_ids, control_ids, control_state, cmd_tags in recorded_commands:
+            if isinstance(gate, MeasureGate) or len(cmd_tags) < len(tags):
+                return None
+            if any(tag is not cmd_tag for tag, cmd_tag in zip(tags, cmd_tags)):
+                return None
+            if isinstance(gate, (AllocateQubitGate, AllocateDirtyQubitGate)):
+                indices[cmd_qubit_ids[0][0]] = len(indices)
+                allocated.add(cmd_qubit_ids[0][0])
+            elif isinstance(gate, DeallocateQubitGate):
+                allocated.discard(cmd_qubit_ids[0][0])
+            try:
+                template.append(
+                    (
+                        gate,
+                        [[indices[qubit_id] for qubit_id in qureg] for qureg in cmd_qubit_ids],
+                        [indices[qubit_id] for qubit_id in control_ids],
+                        control_state,
+                        cmd_tags[len(tags) :],  # noqa: E203
+                    )
+                )
+            except KeyError:
+                return None
+        if allocated:
+            return None
+        return len(indices) - len(qubit_ids), template
+
+    def _replay_expansion(self, cmd, template):
+        """Send on the commands of an expansion template, applied to the qubits of a command."""
+        num_allocated, commands = template
+        qubits = [qb for qureg in cmd.qubits for qb in qureg] + list(cmd.control_qubits)
+        qubits += [WeakQubitRef(self.main_engine, self.main_engine.get_new_qubit_id()) for _ in range(num_allocated)]
+        self.send(
+            [
+                Command(
+                    self.main_engine,
+                    gate,
+                    tuple([qubits[i] for i in qureg] for qureg in qureg_indices),
+                    controls=[qubits[i] for i in control_indices],
+                    tags=cmd.tags + tags,
+                    control_state=control_state,
+                )
+                for gate, qureg_indices, control_indices, control_state, tags in commands
             ]
-            if controlstate_rule and controlstate_rule[0].check(cmd):
-                chosen_decomp = controlstate_rule[0]
-            else:
-                # check for decomposition rules
-                decomp_list = []
-                potential_decomps = []
-
-                for level in range(max(len(gate_mro), len(inverse_mro))):
-                    # Check for forward rules
-                    if level < len(gate_mro):
-                        class_name = gate_mro[level].__name__
-                        try:
-                            potential_decomps = rules[class_name]
-                        except KeyError:
-                            pass
-                        # throw out the ones which don't recognize the command
-                        for decomp in potential_decomps:
-                            if decomp.check(cmd):
-                                decomp_list.append(decomp)
-                        if len(decomp_list) != 0:
-                            break
-                    # Check for rules implementing the inverse gate
-                    # and run them in reverse
-                    if level < len(inverse_mro):
-                        inv_class_name = inverse_mro[level].__name__
-                        try:
-                            potential_decomps += [d.get_inverse_decomposition() for d in rules[inv_class_name]]
-                        except KeyError:
-                            pass
-                        # throw out the ones which don't recognize the command
-                        for decomp in potential_decomps:
-                            if decomp.check(cmd):
-                                decomp_list.append(decomp)
-                        if len(decomp_list) != 0:
-                            break
-
-                if len(decomp_list) == 0:
-                    raise NoGateDecompositionError(f"\nNo replacement found for {str(cmd)}!")
-
-                # use decomposition chooser to determine the best decomposition
-                chosen_decomp = self._decomp_chooser(cmd, decomp_list)
-
-            # the decomposed command must have the same tags
-            # (plus the ones it gets from meta-statements inside the
-            # decomposition rule).
-            # --> use a CommandModifier with a ForwarderEngine to achieve this.
-            old_tags = cmd.tags[:]
-
-            def cmd_mod_fun(cmd):  # Adds the tags
-                cmd.tags = old_tags[:] + cmd.tags
-                cmd.engine = self.main_engine
-                return cmd
-
-            # the CommandModifier calls cmd_mod_fun for each command
-            # --> commands get the right tags.
-            cmod_eng = CommandModifier(cmd_mod_fun)
-            cmod_eng.next_engine = self  # send modified commands back here
-            cmod_eng.main_engine = self.main_engine
-            # forward everything to cmod_eng using the ForwarderEngine
-            # which behaves just like MainEngine
-            # (--> meta functions still work)
-            forwarder_eng = ForwarderEngine(cmod_eng)
-            cmd.engine = forwarder_eng  # send gates directly to forwarder
-            # (and not to main engine, which would screw up the ordering).
-
-            chosen_decomp.decompose(cmd)  # run the decomposition
+        )
+
+    def _decompose(self, cmd):
+        """
+        Replace a command using the decomposition rules loaded with the setup (e.g., setups.default).
+
+        Args:
+            cmd (Command): Command to decompose.
+
+        Raises:
+            Exception if no replacement is available in the loaded setup.
+        """
+        rule_set = self.decomposition_rule_set
+
+        # If the decomposition rule to remove negatively controlled qubits is present in the list of potential
+        # decompositions, we process it immediately, before any other decompositions.
+        controlstate_rule = rule_set.get_controlstate_rule()
+        if controlstate_rule is not None and controlstate_rule.check(cmd):
+            chosen_decomp = controlstate_rule
+        else:
+            # check for decomposition rules of the gate class, then the gate class of the inverse gate, then the
+            # same for the parent classes, etc. and throw out the ones which don't recognize the command
+            decomp_list = []
+            candidates = rule_set.get_candidate_decompositions(type(cmd.gate), type(get_inverse(cmd.gate)))
+            for potential_decomps in candidates:
+                decomp_list = [decomp for decomp in potential_decomps if decomp.check(cmd)]
+                if len(decomp_list) != 0:
+                    break
+
+            if len(decomp_list) == 0:
+                raise NoGateDecompositionError(f"\nNo replacement found for {str(cmd)}!")
+
+            # use decomposition chooser to determine the best decomposition
+            chosen_decomp = self._decomp_chooser(cmd, decomp_list)
+
+        # the decomposed command must have the same tags
+        # (plus the ones it gets from meta-statements inside the
+        # decomposition rule).
+        # --> use a CommandModifier with a ForwarderEngine to achieve this.
+        old_tags = cmd.tags[:]
+
+        def cmd_mod_fun(cmd):  # Adds the tags
+            cmd.tags = old_tags[:] + cmd.tags
+            cmd.engine = self.main_engine
+            return cmd
+
+        # the CommandModifier calls cmd_mod_fun for each command
+        # --> commands get the right tags.
+        cmod_eng = CommandModifier(cmd_mod_fun)
+        cmod_eng.next_engine = self  # send modified commands back here
+        cmod_eng.main_engine = self.main_engine
+        # forward everything to cmod_eng using the ForwarderEngine
+        # which behaves just like MainEngine
+        # (--> meta functions still work)
+        forwarder_eng = ForwarderEngine(cmod_eng)
+        cmd.engine = forwarder_eng  # send gates directly to forwarder
+        # (and not to main engine, which would screw up the ordering).
+
+        chosen_decomp.decompose(cmd)  # run the decomposition
+
+    def send(self, command_list):
+        """Forward the list of commands to the next engine in the pipeline (and record them if necessary)."""
+        if self._recorded_commands is not None:
+            self._recorded_commands.extend(
+                (
+                    cmd.gate,
+                    [[qb.id for qb in qureg] for qureg in cmd.qubits],
+                    [qb.id for qb in cmd.control_qubits],
+                    cmd.control_state,
+                    cmd.tags[:],
+                )
+                for cmd in command_list
+            )
+        super().send(command_list)
 
     def receive(self, command_list):
         """
@@ -227,8 +345,16 @@ class AutoReplacer(BasicEngine):
         Args:
             command_list (list<Command>): List of commands to handle.
         """
+        available_commands = []
         for cmd in command_list:
-            if not isinstance(cmd.gate, FlushGate):
-                self._process_command(cmd)
-            else:
-                self.send([cmd])
+            if isinstance(cmd.gate, FlushGate) or self.is_available(cmd):
+                available_commands.append(cmd)
+                continue
+            # Send the commands preceding a decomposition first, so that decompositions see their effects (e.g.,
+            # measurement results)
+            if available_commands:
+                self.send(available_commands)
+                available_commands = []
+            self._process_command(cmd)
+        if available_commands:
+            self.send(available_commands)
@@ -18,15 +18,19 @@ import pytest
 from projectq import MainEngine
 from projectq.cengines import DecompositionRule, DecompositionRuleSet, DummyEngine
 from projectq.cengines._replacer import _replacer
+from projectq.meta import Compute, ComputeTag, Control
 from projectq.ops import (
     BasicGate,
+    C,
     ClassicalInstructionGate,
     Command,
     H,
+    Measure,
     NotInvertible,
     Rx,
     S,
     X,
+    get_inverse,
 )
 
 
@@ -151,6 +155,35 @@ def test_auto_replacer_no_rule_found():
     eng.flush()
 
 
+def test_auto_replacer_rule_set_cache():
+    # Check that the candidate decompositions are cached and that the cache is invalidated when adding rules
+    def h_filter(self, cmd):
+        if cmd.gate == H:
+            return False
+        return True
+
+    h_filter = _replacer.InstructionFilter(h_filter)
+    local_rule_set = DecompositionRuleSet()
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(backend=backend, engine_list=[_replacer.AutoReplacer(local_rule_set), h_filter])
+    qubit = eng.allocate_qubit()
+    with pytest.raises(_replacer.NoGateDecompositionError):
+        H | qubit
+
+    candidates = local_rule_set.get_candidate_decompositions(H.__class__, H.__class__)
+    assert candidates == []
+    assert local_rule_set.get_candidate_decompositions(H.__class__, H.__class__) is candidates
+
+    def decompose_h(cmd):
+        X | cmd.qubits
+
+    local_rule_set.add_decomposition_rule(DecompositionRule(H.__class__, decompose_h, lambda cmd: True))
+    assert len(local_rule_set.get_candidate_decompositions(H.__class__, H.__class__)) == 2
+    H | qubit
+    eng.flush()
+    assert backend.received_commands[-2].gate == X
+
+
 def test_auto_replacer_use_inverse_decomposition():
     # Check that if there is no decomposition for the gate, that
     # AutoReplacer runs the decomposition for the inverse gate in reverse
@@ -279,3 +312,125 @@ def test_auto_replacer_priorize_controlstate_rule():
     eng.flush()
     assert len(backend.received_commands) == 3
     assert backend.received_commands[1].gate == S
+
+
+def test_auto_replacer_expansion_cache():
+    class OuterGate(BasicGate):
+        def __str__(self):
+            return 'Outer'
+
+    class InnerGate(BasicGate):
+        def __str__(self):
+            return 'Inner'
+
+    class MeasuredGate(BasicGate):
+        def __str__(self):
+            return 'Measured'
+
+    calls = []
+
+    def decompose_outer(cmd):
+        calls.append('outer')
+        eng = cmd.engine
+        ancilla = eng.allocate_qubit()
+        C(InnerGate()) | (cmd.control_qubits, ancilla)
+        X | cmd.qubits[0][1]
+        C(X) | (ancilla, cmd.qubits[0][0])
+        del ancilla
+
+    def decompose_inner(cmd):
+        calls.append('inner')
+        with Control(cmd.engine, cmd.control_qubits):
+            H | cmd.qubits
+
+    def measure_outer(cmd):
+        calls.append('measure')
+        Measure | cmd.qubits[0][0]
+
+    local_rule_set = DecompositionRuleSet(
+        rules=[DecompositionRule(OuterGate, decompose_outer), DecompositionRule(InnerGate, decompose_inner)]
+    )
+
+    def low_level_filter(self, cmd):
+        return not isinstance(cmd.gate, (OuterGate, InnerGate, MeasuredGate))
+
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(
+        backend=backend,
+        engine_list=[
+            _replacer.AutoReplacer(local_rule_set, cache_expansions=True),
+            _replacer.InstructionFilter(low_level_filter),
+        ],
+    )
+    qureg = eng.allocate_qureg(5)
+    C(OuterGate()) | (qureg[0], qureg[1:3])
+    assert calls == ['outer', 'inner']
+    num_received = len(backend.received_commands)
+    C(OuterGate()) | (qureg[4], qureg[2:4])
+    assert calls == ['outer', 'inner']
+    received = backend.received_commands[num_received:]
+    assert [str(cmd) for cmd in received] == [
+        'Allocate | Qureg[6]',
+        'CH | ( Qureg[4], Qureg[6] )',
+        'X | Qureg[3]',
+        'CX | ( Qureg[6], Qureg[2] )',
+        'Deallocate | Qureg[6]',
+    ]
+    assert all(not cmd.tags for cmd in received)
+    assert all(cmd.engine is eng for cmd in received)
+
+    # Different meta tags lead to a separate cache entry
+    with Compute(eng):
+        C(OuterGate()) | (qureg[0], qureg[1:3])
+    assert calls == ['outer', 'inner', 'outer', 'inner']
+    num_received = len(backend.received_commands)
+    with Compute(eng):
+        C(OuterGate()) | (qureg[0], qureg[1:3])
+    assert calls == ['outer', 'inner', 'outer', 'inner']
+    assert all(isinstance(cmd.tags[0], ComputeTag) for cmd in backend.received_commands[num_received:])
+
+    # Expansions containing measurements are not cached
+    local_rule_set.add_decomposition_rule(DecompositionRule(MeasuredGate, measure_outer))
+    MeasuredGate() | qureg[0]
+    MeasuredGate() | qureg[0]
+    assert calls == ['outer', 'inner', 'outer', 'inner', 'measure', 'measure']
+
+
+def test_auto_replacer_expansion_cache_gate_equality():
+    class AngleGate(BasicGate):
+        # Gate with an attribute, but without its own __eq__ (i.e., AngleGate(0.1) == AngleGate(0.2))
+        def __init__(self, angle):
+            super().__init__()
+            self.angle = angle
+
+        def __str__(self):
+            return 'AngleGate'
+
+    class EqAngleGate(AngleGate):
+        def __eq__(self, other):
+            return isinstance(other, EqAngleGate) and self.angle == other.angle
+
+        def __hash__(self):
+            return hash(('EqAngleGate', self.angle))
+
+    def decompose(cmd):
+        Rx(cmd.gate.angle) | cmd.qubits
+
+    local_rule_set = DecompositionRuleSet(rules=[DecompositionRule(AngleGate, decompose)])
+    backend = DummyEngine(save_commands=True)
+    eng = MainEngine(
+        backend=backend,
+        engine_list=[
+            _replacer.AutoReplacer(local_rule_set, cache_expansions=True),
+            _replacer.InstructionFilter(lambda self, cmd: isinstance(cmd.gate, (Rx, ClassicalInstructionGate))),
+        ],
+    )
+    qubit = eng.allocate_qubit()
+    for gate_class in (AngleGate, EqAngleGate):
+        gate_class(0.1) | qubit
+        gate_class(0.2) | qubit
+        get_inverse(gate_class(0.3)) | qubit
+        get_inverse(gate_class(0.4)) | qubit
+    eng.flush()
+    gates = [cmd.gate for cmd in backend.received_commands if isinstance(cmd.gate, Rx)]
+    assert gates == [Rx(0.1), Rx(0.2), Rx(-0.3), Rx(-0.4)] * 2
@@ -17,6 +17,7 @@ The TagRemover compiler engine.
 A TagRemover engine removes temporary command tags (such as Compute/Uncompute), thus enabling optimization across meta
 statements (loops after unrolling, compute/uncompute, ...)
 """
+
 from projectq.meta import ComputeTag, UncomputeTag
 
 from ._basics import BasicEngine
@@ -62,4 +63,4 @@ class TagRemover(BasicEngine):
         for cmd in command_list:
             for tag in self._tags:
                 cmd.tags = [t for t in cmd.tags if not isinstance(t, tag)]
-            self.send([cmd])
+        self.send(command_list)
@@ -19,12 +19,14 @@ Input: Quantum circuit with 1 and 2 qubit gates on n qubits. Gates are assumed t
 Output: Quantum circuit in which qubits are placed in 2-D square grid in which only nearest neighbour qubits can
         perform a 2 qubit gate. The mapper uses Swap gates in order to move qubits next to each other.
 """
+
+import heapq
 import itertools
 import math
-import random
 from copy import deepcopy
 
-import networkx as nx
+import numpy as np
+from scipy.optimize import linear_sum_assignment
 
 from projectq.meta import LogicalQubitIDTag
 from projectq.ops import (
@@ -37,6 +39,7 @@ from projectq.ops import (
 from projectq.types import WeakQubitRef
 
 from ._basicmapper import BasicMapperEngine
+from ._commandbuffer import CommandBuffer
 from ._linearmapper import LinearMapper, return_swap_depth
 
 
@@ -94,8 +97,8 @@ class GridMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attrib
             storage: Number of gates to temporarily store
             optimization_function: Function which takes a list of swaps and returns a cost value. Mapper chooses a
                                    permutation which minimizes this cost.  Default optimizes for circuit depth.
-            num_optimization_steps(int): Number of different permutations to of the matching to try and minimize the
-                                         cost.
+            num_optimization_steps(int): Maximal number of permutations of the rows after the first sorting step
+                                         to try in order to minimize the cost (see _return_best_swaps).
         Raises:
             RuntimeError: if incorrect `mapped_ids_to_backend_ids` parameter
         """
@@ -124,13 +127,8 @@ class GridMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attrib
         self.storage = storage
         self.optimization_function = optimization_function
         self.num_optimization_steps = num_optimization_steps
-        # Randomness to pick permutations if there are too many.
-        # This creates an own instance of Random in order to not influence
-        # the bound methods of the random module which might be used in other
-        # places.
-        self._rng = random.Random(11)
         # Storing commands
-        self._stored_commands = []
+        self._stored_commands = CommandBuffer()
         # Logical qubit ids for which the Allocate gate has already been
         # processed and sent to the next engine but which are not yet
         # deallocated:
@@ -171,6 +169,16 @@ class GridMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attrib
             for logical_id, backend_id in current_mapping.items():
                 self._current_row_major_mapping[logical_id] = self._backend_ids_to_mapped_ids[backend_id]
 
+    @property
+    def _stored_commands(self):
+        """Buffer of the commands which have not been sent yet."""
+        return self._command_buffer
+
+    @_stored_commands.setter
+    def _stored_commands(self, commands):
+        """Replace the stored commands."""
+        self._command_buffer = CommandBuffer(commands)
+
     def is_available(self, cmd):
         """Only allow 1 or two qubit gates."""
         num_qubits = 0
@@ -274,6 +282,40 @@ class GridMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attrib
                         swap_operations.append(swap)
         return swap_operations
 
+    def _assign_rows_after_step_1(self, final_positions, permutation):
+        """
+        Assign the row of each element after the first sort inside the columns.
+
+        After the first sort, every row has to contain, for every column, exactly one element whose final column is
+        that column. The rows are filled one after the other, starting with the outermost rows which can only be
+        reached from one side: for each row, a min-cost perfect matching between the current columns and the final
+        columns picks, in every column, one of the remaining elements such that they move as little as possible in the
+        two sorts inside the columns (squared distance from their current row to the row and from there to their final
+        row). Such a matching always exists as the remaining elements form a regular bipartite multigraph between the
+        current and the final columns.
+
+        Args:
+            final_positions: final_positions[i][j] is the info container of the element in row i and column j
+            permutation: list of int from 0, 1, ..., self.num_rows-1. The elements assigned to row i are moved to row
+                         permutation[i].
+        """
+        remaining = [
+            [final_positions[row][column] for row in range(self.num_rows)] for column in range(self.num_columns)
+        ]
+        for row in sorted(range(self.num_rows), key=lambda row: min(row, self.num_rows - 1 - row)):
+            costs = np.full((self.num_columns, self.num_columns), np.inf)
+            best_elements = {}
+            for column, elements in enumerate(remaining):
+                for element in elements:
+                    cost = (element.current_row - row) ** 2 + (element.final_row - row) ** 2
+                    if cost < costs[column, element.final_column]:
+                        costs[column, element.final_column] = cost
+                        best_elements[column, element.final_column] = element
+            for column, final_column in zip(*linear_sum_assignment(costs)):
+                element = best_elements[column, final_column]
+                element.row_after_step_1 = permutation[row]
+                remaining[column].remove(element)
+
     def return_swaps(  # pylint: disable=too-many-locals,too-many-branches,too-many-statements
         self, old_mapping, new_mapping, permutation=None
     ):
@@ -283,8 +325,9 @@ class GridMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attrib
         Args:
             old_mapping: dict: keys are logical ids and values are mapped qubit ids
             new_mapping: dict: keys are logical ids and values are mapped qubit ids
-            permutation: list of int from 0, 1, ..., self.num_rows-1. It is used to permute the found perfect
-                         matchings. Default is None which keeps the original order.
+            permutation: list of int from 0, 1, ..., self.num_rows-1. It is used to permute the rows after the first
+                         sorting step: the elements assigned to row i (see _assign_rows_after_step_1) are moved to
+                         row permutation[i] instead. Default is None which keeps the original order.
         Returns:
             List of tuples. Each tuple is a swap operation which needs to be applied. Tuple contains the two mapped
             qubit ids for the Swap.
@@ -349,56 +392,8 @@ class GridMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attrib
                     final_positions[row][column] = info_container
         if len(not_used_mapped_ids) > 0:  # pragma: no cover
             raise RuntimeError('Internal compiler error: len(not_used_mapped_ids) > 0')
-        # 1. Assign column_after_step_1 for each element
-        # Matching contains the num_columns matchings
-        matchings = [None for i in range(self.num_rows)]
-        # Build bipartite graph. Nodes are the current columns numbered (0, 1, ...) and the destination columns
-        # numbered with an offset of self.num_columns (0 + offset, 1+offset, ...)
-        graph = nx.Graph()
-        offset = self.num_columns
-        graph.add_nodes_from(range(self.num_columns), bipartite=0)
-        graph.add_nodes_from(range(offset, offset + self.num_columns), bipartite=1)
-        # Add an edge to the graph from (i, j+offset) for every element currently in column i which should go to
-        # column j for the new mapping
-        for row in range(self.num_rows):
-            for column in range(self.num_columns):
-                destination_column = final_positions[row][column].final_column
-                if not graph.has_edge(column, destination_column + offset):
-                    graph.add_edge(column, destination_column + offset)
-                    # Keep manual track of multiple edges between nodes
-                    graph[column][destination_column + offset]['num'] = 1
-                else:
-                    graph[column][destination_column + offset]['num'] += 1
-        # Find perfect matching, remove those edges from the graph and do it again:
-        for i in range(self.num_rows):
-            top_nodes = range(self.num_columns)
-            matching = nx.bipartite.maximum_matching(graph, top_nodes)
-            matchings[i] = matching
-            # Remove all edges of the current perfect matching
-            for node in range(self.num_columns):
-                if graph[node][matching[node]]['num'] == 1:
-                    graph.remove_edge(node, matching[node])
-                else:
-                    graph[node][matching[node]]['num'] -= 1
-        # permute the matchings:
-        tmp = deepcopy(matchings)
-        for i in range(self.num_rows):
-            matchings[i] = tmp[permutation[i]]
-        # Assign row_after_step_1
-        for column in range(self.num_columns):
-            for row_after_step_1 in range(self.num_rows):
-                dest_column = matchings[row_after_step_1][column] - offset
-                best_element = None
-                for row in range(self.num_rows):
-                    element = final_positions[row][column]
-                    if element.row_after_step_1 is not None:
-                        continue
-                    if element.final_column == dest_column:
-                        if best_element is None:
-                            best_element = element
-                        elif best_element.final_row > element.final_row:
-                            best_element = element
-                best_element.row_after_step_1 = row_after_step_1
+        # 1. Assign row_after_step_1 for each element
+        self._assign_rows_after_step_1(final_positions, permutation)
         # 2. Sort inside all the rows
         swaps = self._sort_within_columns(final_positions=final_positions, key=lambda x: x.row_after_step_1)
         swap_operations += swaps
@@ -410,81 +405,121 @@ class GridMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attrib
         swap_operations += swaps
         return swap_operations
 
-    def _send_possible_commands(self):  # pylint: disable=too-many-branches
+    def _is_executable(self, cmd):
+        """
+        Check if a command can be sent using the current mapping.
+
+        Note: self._current_row_major_mapping must exist already
+        """
+        qubit_ids = [qubit.id for qureg in cmd.all_qubits for qubit in qureg]
+        if any(qubit_id not in self._current_row_major_mapping for qubit_id in qubit_ids):
+            return False
+        # Check that mapped ids are nearest neighbour on 2D grid
+        mapped_ids = {self._current_row_major_mapping[qubit_id] for qubit_id in qubit_ids}
+        if len(mapped_ids) == 2:
+            qb0, qb1 = sorted(mapped_ids)
+            return qb1 - qb0 == self.num_columns or (qb1 - qb0 == 1 and qb1 % self.num_columns != 0)
+        return True
+
+    def _send_possible_commands(self):
         """
         Send the stored commands possible without changing the mapping.
 
+        Only the front layer of the stored commands is inspected: the ready commands are processed in their original
+        order and every command which is sent makes the commands it was blocking ready.
+
         Note: self._current_row_major_mapping (hence also self.current_mapping) must exist already
         """
-        active_ids = deepcopy(self._currently_allocated_ids)
-        for logical_id in self._current_row_major_mapping:
-            # So that loop doesn't stop before AllocateGate applied
-            active_ids.add(logical_id)
-
-        new_stored_commands = []
-        for i, cmd in enumerate(self._stored_commands):
-            if len(active_ids) == 0:
-                new_stored_commands += self._stored_commands[i:]
-                break
+        stored_commands = self._stored_commands
+        ready_indices = stored_commands.get_ready_indices()
+        while ready_indices:
+            index = heapq.heappop(ready_indices)
+            cmd = stored_commands.get_command(index)
+            if not self._is_executable(cmd):
+                continue
             if isinstance(cmd.gate, AllocateQubitGate):
-                if cmd.qubits[0][0].id in self._current_row_major_mapping:
-                    self._currently_allocated_ids.add(cmd.qubits[0][0].id)
-
-                    mapped_id = self._current_row_major_mapping[cmd.qubits[0][0].id]
-                    qb = WeakQubitRef(engine=self, idx=self._mapped_ids_to_backend_ids[mapped_id])
-                    new_cmd = Command(
-                        engine=self,
-                        gate=AllocateQubitGate(),
-                        qubits=([qb],),
-                        tags=[LogicalQubitIDTag(cmd.qubits[0][0].id)],
-                    )
-                    self.send([new_cmd])
-                else:
-                    new_stored_commands.append(cmd)
+                self._currently_allocated_ids.add(cmd.qubits[0][0].id)
+
+                mapped_id = self._current_row_major_mapping[cmd.qubits[0][0].id]
+                qb = WeakQubitRef(engine=self, idx=self._mapped_ids_to_backend_ids[mapped_id])
+                new_cmd = Command(
+                    engine=self,
+                    gate=AllocateQubitGate(),
+                    qubits=([qb],),
+                    tags=[LogicalQubitIDTag(cmd.qubits[0][0].id)],
+                )
+                self.send([new_cmd])
             elif isinstance(cmd.gate, DeallocateQubitGate):
-                if cmd.qubits[0][0].id in active_ids:
-                    mapped_id = self._current_row_major_mapping[cmd.qubits[0][0].id]
-                    qb = WeakQubitRef(engine=self, idx=self._mapped_ids_to_backend_ids[mapped_id])
-                    new_cmd = Command(
-                        engine=self,
-                        gate=DeallocateQubitGate(),
-                        qubits=([qb],),
-                        tags=[LogicalQubitIDTag(cmd.qubits[0][0].id)],
-                    )
-                    self._currently_allocated_ids.remove(cmd.qubits[0][0].id)
-                    active_ids.remove(cmd.qubits[0][0].id)
-                    self._current_row_major_mapping.pop(cmd.qubits[0][0].id)
-                    self._current_mapping.pop(cmd.qubits[0][0].id)
-                    self.send([new_cmd])
-                else:
-                    new_stored_commands.append(cmd)
+                mapped_id = self._current_row_major_mapping[cmd.qubits[0][0].id]
+                qb = WeakQubitRef(engine=self, idx=self._mapped_ids_to_backend_ids[mapped_id])
+                new_cmd = Command(
+                    engine=self,
+                    gate=DeallocateQubitGate(),
+                    qubits=([qb],),
+                    tags=[LogicalQubitIDTag(cmd.qubits[0][0].id)],
+                )
+                self._currently_allocated_ids.remove(cmd.qubits[0][0].id)
+                self._current_row_major_mapping.pop(cmd.qubits[0][0].id)
+                self._current_mapping.pop(cmd.qubits[0][0].id)
+                self.send([new_cmd])
             else:
-                send_gate = True
-                mapped_ids = set()
-                for qureg in cmd.all_qubits:
-                    for qubit in qureg:
-                        if qubit.id not in active_ids:
-                            send_gate = False
-                            break
-                        mapped_ids.add(self._current_row_major_mapping[qubit.id])
-                # Check that mapped ids are nearest neighbour on 2D grid
-                if len(mapped_ids) == 2:
-                    qb0, qb1 = sorted(mapped_ids)
-                    send_gate = False
-                    if qb1 - qb0 == self.num_columns:
-                        send_gate = True
-                    elif qb1 - qb0 == 1 and qb1 % self.num_columns != 0:
-                        send_gate = True
-                if send_gate:
-                    # Note: This sends the cmd correctly with the backend ids as it looks up the mapping in
-                    #       self.current_mapping and not our internal mapping self._current_row_major_mapping
-                    self._send_cmd_with_mapped_ids(cmd)
-                else:
-                    for qureg in cmd.all_qubits:
-                        for qubit in qureg:
-                            active_ids.discard(qubit.id)
-                    new_stored_commands.append(cmd)
-        self._stored_commands = new_stored_commands
+                # Note: This sends the cmd correctly with the backend ids as it looks up the mapping in
+                #       self.current_mapping and not our internal mapping self._current_row_major_mapping
+                self._send_cmd_with_mapped_ids(cmd)
+            for successor in stored_commands.remove(index):
+                heapq.heappush(ready_indices, successor)
+
+    def _return_best_swaps(self, new_row_major_mapping):
+        """
+        Return the swaps to the new mapping which minimize self.optimization_function.
+
+        The rows after the first sorting step found by return_swaps are permuted to lower the cost: if there are at
+        most self.num_optimization_steps permutations of the rows, all of them are tried. Otherwise, starting from the
+        original order, transpositions of two rows (closest rows first) are kept whenever they lower the cost until
+        self.num_optimization_steps permutations have been tried or no transposition lowers the cost anymore.
+
+        Args:
+            new_row_major_mapping: dict: keys are logical ids and values are mapped qubit ids
+        Returns:
+            List of tuples. Each tuple is a swap operation (see return_swaps).
+        """
+
+        def evaluate(permutation):
+            trial_swaps = self.return_swaps(
+                old_mapping=self._current_row_major_mapping,
+                new_mapping=new_row_major_mapping,
+                permutation=permutation,
+            )
+            return self.optimization_function(trial_swaps), trial_swaps
+
+        best_permutation = list(range(self.num_rows))
+        lowest_cost, swaps = evaluate(best_permutation)
+        if not swaps:
+            # e.g. the first mapping, which is reached without moving any qubit
+            return swaps
+        if math.factorial(self.num_rows) <= self.num_optimization_steps:
+            for permutation in itertools.islice(itertools.permutations(best_permutation), 1, None):
+                cost, trial_swaps = evaluate(permutation)
+                if cost < lowest_cost:
+                    lowest_cost, swaps = cost, trial_swaps
+            return swaps
+
+        transpositions = sorted(itertools.combinations(range(self.num_rows), 2), key=lambda pair: pair[1] - pair[0])
+        num_evaluations = 1
+        improved = True
+        while improved:
+            improved = False
+            for row0, row1 in transpositions:
+                if num_evaluations >= self.num_optimization_steps:
+                    return swaps
+                permutation = list(best_permutation)
+                permutation[row0], permutation[row1] = permutation[row1], permutation[row0]
+                cost, trial_swaps = evaluate(permutation)
+                num_evaluations += 1
+                if cost < lowest_cost:
+                    lowest_cost, swaps, best_permutation = cost, trial_swaps, permutation
+                    improved = True
+        return swaps
 
     def _run(self):  # pylint: disable=too-many-locals.too-many-branches,too-many-statements
         """
@@ -502,28 +537,7 @@ class GridMapper(BasicMapperEngine):  # pylint: disable=too-many-instance-attrib
             if len(self._stored_commands) == 0:
                 return
         new_row_major_mapping = self._return_new_mapping()
-        # Find permutation of matchings with lowest cost
-        swaps = None
-        lowest_cost = None
-        matchings_numbers = list(range(self.num_rows))
-        if self.num_optimization_steps <= math.factorial(self.num_rows):
-            permutations = itertools.permutations(matchings_numbers, self.num_rows)
-        else:
-            permutations = []
-            for _ in range(self.num_optimization_steps):
-                permutations.append(self._rng.sample(matchings_numbers, self.num_rows))
-        for permutation in permutations:
-            trial_swaps = self.return_swaps(
-                old_mapping=self._current_row_major_mapping,
-                new_mapping=new_row_major_mapping,
-                permutation=permutation,
-            )
-            if swaps is None:
-                swaps = trial_swaps
-                lowest_cost = self.optimization_function(trial_swaps)
-            elif lowest_cost > self.optimization_function(trial_swaps):
-                swaps = trial_swaps
-                lowest_cost = self.optimization_function(trial_swaps)
+        swaps = self._return_best_swaps(new_row_major_mapping)
         if swaps:  # first mapping requires no swaps
             # Allocate all mapped qubit ids (which are not already allocated,
             # i.e., contained in self._currently_allocated_ids)
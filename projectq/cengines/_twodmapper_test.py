@@ -22,6 +22,7 @@ import pytest
 import projectq
 from projectq.cengines import DummyEngine, LocalOptimizer
 from projectq.cengines import _twodmapper as two_d
+from projectq.cengines._linearmapper import return_swap_depth
 from projectq.meta import LogicalQubitIDTag
 from projectq.ops import Allocate, BasicGate, Command, Deallocate, FlushGate, X
 from projectq.types import WeakQubitRef
@@ -192,6 +193,35 @@ def test_return_swaps_random(num_rows, num_columns, seed, none_old, none_new):
             assert test_chain[i] == new_chain[i]
 
 
+@pytest.mark.parametrize(
+    "num_rows, num_columns, num_optimization_steps",
+    [(2, 3, 50), (6, 5, 50), (6, 5, 1)],
+)
+def test_return_best_swaps(num_rows, num_columns, num_optimization_steps):
+    random.seed(5)
+    num_qubits = num_rows * num_columns
+    old_chain = random.sample(range(num_qubits), num_qubits)
+    new_chain = random.sample(range(num_qubits), num_qubits)
+    old_mapping = {logical_id: i for i, logical_id in enumerate(old_chain)}
+    new_mapping = {logical_id: i for i, logical_id in enumerate(new_chain)}
+    mappers = []
+    for _ in range(2):
+        mapper = two_d.GridMapper(
+            num_rows=num_rows, num_columns=num_columns, num_optimization_steps=num_optimization_steps
+        )
+        mapper.current_mapping = old_mapping
+        mappers.append(mapper)
+    swaps = mappers[0]._return_best_swaps(new_mapping)
+    # The search is deterministic
+    assert mappers[1]._return_best_swaps(new_mapping) == swaps
+    assert return_swap_depth(swaps) <= return_swap_depth(mappers[0].return_swaps(old_mapping, new_mapping))
+    test_chain = deepcopy(old_chain)
+    for pos0, pos1 in swaps:
+        test_chain[pos0], test_chain[pos1] = test_chain[pos1], test_chain[pos0]
+    assert test_chain == new_chain
+    assert mappers[0]._return_best_swaps(old_mapping) == []
+
+
 @pytest.mark.parametrize("different_backend_ids", [False, True])
 def test_send_possible_commands(different_backend_ids):
     if different_backend_ids:
@@ -16,8 +16,6 @@
 
 import matplotlib.pyplot as plt
 
-from projectq.backends import Simulator
-
 
 def histogram(backend, qureg):
     """
@@ -51,18 +49,7 @@ def histogram(backend, qureg):
         print("Consider calling histogram() with a sublist of the qubits.")
 
     if hasattr(backend, 'get_probabilities'):
-        probabilities = backend.get_probabilities(qureg)
-    elif isinstance(backend, Simulator):
-        outcome = [0] * len(qubit_list)
-        n_outcomes = 1 << len(qubit_list)
-        probabilities = {}
-        for i in range(n_outcomes):
-            for pos in range(len(qubit_list)):
-                if (1 << pos) & i:
-                    outcome[pos] = 1
-                else:
-                    outcome[pos] = 0
-            probabilities[''.join([str(bit) for bit in outcome])] = backend.get_probability(outcome, qubit_list)
+        probabilities = backend.get_probabilities(qubit_list)
     else:
         raise RuntimeError('Unable to retrieve probabilities from backend')
 
@@ -0,0 +1,211 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Functions to evaluate a circuit for many parameter sets in parallel."""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from projectq.backends import Simulator
+from projectq.cengines import MainEngine
+from projectq.ops import All, Measure
+
+# State of a worker process: the MainEngine which is reused for all evaluations and the settings of the sweep
+_worker_state = {}
+
+
+class SweepResult:  # pylint: disable=too-few-public-methods
+    """
+    Result of the evaluation of a circuit for a single parameter set (see run_parameter_sweep).
+
+    Attributes:
+        index (int): Position of the parameter set in the iterable of parameter sets.
+        parameters (object): The parameter set.
+        expectation_values (dict): Expectation values of the observables, indexed by the names of the observables.
+        counts (dict): Dictionary mapping bit strings (in the order of the qubits returned by the circuit function) to
+            the number of times they were sampled (None if no samples were requested).
+        duration (float): Time (in seconds) spent evaluating the circuit.
+    """
+
+    def __init__(self, index, parameters, expectation_values, counts, duration):  # pylint: disable=too-many-arguments
+        """Initialize a SweepResult."""
+        self.index = index
+        self.parameters = parameters
+        self.expectation_values = expectation_values
+        self.counts = counts
+        self.duration = duration
+
+    def __repr__(self):
+        """Return a string representation of the object."""
+        return (
+            f'SweepResult(index={self.index}, parameters={self.parameters!r}, '
+            f'expectation_values={self.expectation_values}, counts={self.counts})'
+        )
+
+
+def _make_engine(engine_list_factory, backend_factory):
+    """Return a new MainEngine using the backend and the compiler engines returned by the factories."""
+    backend = backend_factory() if backend_factory is not None else Simulator()
+    engine_list = engine_list_factory() if engine_list_factory is not None else None
+    return MainEngine(backend, engine_list)
+
+
+def _sample(probabilities, shots, rng):
+    """Return a dictionary of counts of shots outcomes drawn from an array of outcome probabilities."""
+    num_qubits = len(probabilities).bit_length() - 1
+    samples = rng.multinomial(shots, probabilities / probabilities.sum())
+    return {
+        ''.join(str((outcome >> k) & 1) for k in range(num_qubits)): int(samples[outcome])
+        for outcome in np.flatnonzero(samples)
+    }
+
+
+def _evaluate(eng, index, parameters, settings):
+    """
+    Evaluate the circuit for one parameter set and reset the MainEngine afterwards.
+
+    Args:
+        eng (MainEngine): Engine to run the circuit on.
+        index (int): Position of the parameter set.
+        parameters (object): Parameter set passed to the circuit function.
+        settings (tuple): Circuit function, observables, number of shots and seed of the sweep.
+    """
+    circuit, observables, shots, seed = settings
+    start = time.perf_counter()
+    try:
+        qureg = circuit(eng, parameters)
+        eng.flush()
+        expectation_values = {}
+        counts = None
+        if observables or shots:
+            if qureg is None:
+                raise ValueError('The circuit function has to return the qubits to evaluate the observables on.')
+            backend = eng.backend
+            if not hasattr(backend, 'get_probabilities') or not hasattr(backend, 'get_expectation_value'):
+                raise RuntimeError('Unable to retrieve expectation values and probabilities from the backend.')
+            qureg = list(qureg)
+            expectation_values = {
+                name: float(np.real(backend.get_expectation_value(observable, qureg)))
+                for name, observable in observables.items()
+            }
+            if shots:
+                rng = np.random.default_rng(None if seed is None else [seed, index])
+                counts = _sample(backend.get_probabilities(qureg, as_array=True), shots, rng)
+    finally:
+        # Reset the engine for the next evaluation (the compiler engines and the backend are kept warm)
+        All(Measure) | sorted(eng.active_qubits, key=lambda qubit: qubit.id)
+        eng.flush(deallocate_qubits=True)
+    return SweepResult(index, parameters, expectation_values, counts, time.perf_counter() - start)
+
+
+def _init_worker(engine_list_factory, backend_factory, settings):
+    """Create the MainEngine of a worker process."""
+    _worker_state['engine'] = _make_engine(engine_list_factory, backend_factory)
+    _worker_state['settings'] = settings
+
+
+def _run_task(index, parameters):
+    """Evaluate the circuit for one parameter set in a worker process."""
+    return _evaluate(_worker_state['engine'], index, parameters, _worker_state['settings'])
+
+
+def _wait_for_results(pending):
+    """Wait until at least one of the pending futures is done and return their results and the remaining futures."""
+    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+    return sorted((future.result() for future in done), key=lambda result: result.index), pending
+
+
+def run_parameter_sweep(  # pylint: disable=too-many-arguments,too-many-locals
+    circuit,
+    parameters,
+    engine_list_factory=None,
+    backend_factory=None,
+    observables=None,
+    shots=0,
+    seed=None,
+    processes=None,
+):
+    """
+    Evaluate a circuit for many parameter sets on a pool of worker processes.
+
+    Each worker process creates a single MainEngine, which is reused for all the parameter sets it evaluates: after
+    each evaluation, all qubits are measured and deallocated but the compiler engines and the backend (including,
+    e.g., their caches) are kept. The results are yielded as soon as they are available, i.e., not necessarily in the
+    order of the parameter sets (see SweepResult.index).
+
+    The circuit function is called as ``circuit(eng, parameters)`` and has to return the list of qubits on which the
+    observables are evaluated and the samples are drawn (after flushing the engine). Expectation values and samples are
+    computed from the final state of the backend, which therefore has to provide get_expectation_value() and
+    get_probabilities() (e.g., the Simulator).
+
+    The circuit function, the factories, the parameter sets and the observables are sent to the worker processes and
+    therefore have to be picklable (e.g., functions defined at the top level of a module).
+
+    Example:
+        .. code-block:: python
+
+            def circuit(eng, angle):
+                qureg = eng.allocate_qureg(2)
+                Rx(angle) | qureg[0]
+                CNOT | (qureg[0], qureg[1])
+                return qureg
+
+
+            for result in run_parameter_sweep(circuit, angles, observables={'ZZ': QubitOperator('Z0 Z1')}, shots=100):
+                print(result.parameters, result.expectation_values['ZZ'], result.counts)
+
+    Args:
+        circuit (callable): Function building the circuit for a parameter set.
+        parameters (iterable): Parameter sets to evaluate the circuit for.
+        engine_list_factory (callable): Function returning the list of compiler engines of a MainEngine (default: the
+            default compiler engines of the MainEngine).
+        backend_factory (callable): Function returning the backend of a MainEngine (default: Simulator).
+        observables (dict): Dictionary mapping names to QubitOperators whose expectation values are computed.
+        shots (int): Number of samples of the measurement outcomes of the qubits returned by the circuit function.
+        seed (int): Seed of the sampling. If given, the samples of each parameter set only depend on the seed and the
+            position of the parameter set (and not on the worker process evaluating it).
+        processes (int): Number of worker processes (default: number of CPUs). If 0, the parameter sets are evaluated
+            one after the other in the calling process.
+
+    Yields:
+        SweepResult for every parameter set.
+    """
+    settings = (circuit, dict(observables or {}), shots, seed)
+    if processes == 0:
+        eng = _make_engine(engine_list_factory, backend_factory)
+        for index, parameter_set in enumerate(parameters):
+            yield _evaluate(eng, index, parameter_set, settings)
+        return
+
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker, initargs=(engine_list_factory, backend_factory, settings)
+    ) as executor:
+        pending = set()
+        try:
+            for index, parameter_set in enumerate(parameters):
+                pending.add(executor.submit(_run_task, index, parameter_set))
+                # Limit the number of queued parameter sets in case the iterable is long (or infinite)
+                if len(pending) >= 2 * processes:
+                    results, pending = _wait_for_results(pending)
+                    yield from results
+            while pending:
+                results, pending = _wait_for_results(pending)
+                yield from results
+        finally:
+            for future in pending:
+                future.cancel()
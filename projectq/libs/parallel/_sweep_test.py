@@ -0,0 +1,91 @@
+#   Copyright 2017 ProjectQ-Framework (www.projectq.ch)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""Tests for projectq.libs.parallel._sweep.py."""
+
+import math
+
+import pytest
+
+from projectq.backends import Simulator
+from projectq.cengines import DummyEngine, LocalOptimizer
+from projectq.libs.parallel import SweepResult, run_parameter_sweep
+from projectq.ops import CNOT, QubitOperator, Rx
+
+_OBSERVABLES = {'Z0': QubitOperator('Z0'), 'Z0 Z1': QubitOperator('Z0 Z1')}
+
+
+def _circuit(eng, angle):
+    qureg = eng.allocate_qureg(2)
+    Rx(angle) | qureg[0]
+    CNOT | (qureg[0], qureg[1])
+    return qureg
+
+
+def _engine_list():
+    return [LocalOptimizer(5)]
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_run_parameter_sweep(processes):
+    angles = [0.1 * i for i in range(7)]
+    results = list(
+        run_parameter_sweep(
+            _circuit,
+            angles,
+            engine_list_factory=_engine_list,
+            observables=_OBSERVABLES,
+            shots=100,
+            seed=3,
+            processes=processes,
+        )
+    )
+    assert sorted(result.index for result in results) == list(range(len(angles)))
+    for result in results:
+        assert isinstance(result, SweepResult)
+        assert result.parameters == angles[result.index]
+        assert result.expectation_values['Z0'] == pytest.approx(math.cos(result.parameters))
+        assert result.expectation_values['Z0 Z1'] == pytest.approx(1.0)
+        assert set(result.counts) <= {'00', '11'}
+        assert sum(result.counts.values()) == 100
+        assert result.duration >= 0
+        assert 'SweepResult(index=' in repr(result)
+
+    # the samples only depend on the seed and the position of the parameter set
+    reference = {result.index: result.counts for result in run_parameter_sweep(_circuit, angles, shots=100, seed=3)}
+    assert {result.index: result.counts for result in results} == reference
+
+
+def test_run_parameter_sweep_reuses_engine():
+    backends = []
+
+    def backend_factory():
+        backends.append(Simulator())
+        return backends[-1]
+
+    results = list(run_parameter_sweep(_circuit, [0.5, 1.0, 1.5], backend_factory=backend_factory, processes=0))
+    assert len(backends) == 1
+    assert [result.expectation_values for result in results] == [{}, {}, {}]
+    assert [result.counts for result in results] == [None, None, None]
+    # all qubits are deallocated after each evaluation
+    assert backends[0].cheat()[0] == {}
+
+
+def test_run_parameter_sweep_errors():
+    with pytest.raises(ValueError):
+        list(run_parameter_sweep(lambda eng, angle: None, [0.5], shots=10, processes=0))
+    with pytest.raises(RuntimeError):
+        list(run_parameter_sweep(_circuit, [0.5], backend_factory=DummyEngine, shots=10, processes=0))
+    # exceptions raised in the worker processes are raised by the generator
+    with pytest.raises(ValueError):
+        list(run_parameter_sweep(_circuit, ['angle', 0.5], processes=2))
@@ -25,7 +25,7 @@ from projectq.cengines import BasicEngine, CommandModifier
 from projectq.ops import Allocate, Deallocate
 
 from ._exceptions import QubitManagementError
-from ._util import drop_engine_after, insert_engine
+from ._util import drop_engine_after, insert_engine, send_buffered_commands
 
 
 class NoComputeSectionError(Exception):
@@ -314,6 +314,8 @@ class Compute:
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
         """Context manager exit function."""
+        # the compute engine has to receive all the commands of the compute section first
+        send_buffered_commands(self.engine)
         # notify ComputeEngine that the compute section is done
         self._compute_eng.end_compute()
         self._compute_eng = None
@@ -352,6 +354,7 @@ class CustomUncompute:
 
     def __enter__(self):
         """Context manager enter function."""
+        send_buffered_commands(self.engine)
         # first, remove the compute engine
         compute_eng = self.engine.next_engine
         if not isinstance(compute_eng, ComputeEngine):
@@ -375,6 +378,7 @@ class CustomUncompute:
         # so don't check and raise an additional error.
         if exc_type is not None:
             return
+        send_buffered_commands(self.engine)
         # Check that all qubits allocated within Compute or within
         # CustomUncompute have been deallocated.
         all_allocated_qubits = self._allocated_qubit_ids.union(self._uncompute_eng._allocated_qubit_ids)
@@ -404,5 +408,7 @@ def Uncompute(engine):  # pylint: disable=invalid-name
     compute_eng = engine.next_engine
     if not isinstance(compute_eng, ComputeEngine):
         raise NoComputeSectionError("Invalid call to Uncompute: No corresponding 'with Compute' statement found.")
+    # the compute engine has to receive all the commands issued before uncomputing
+    send_buffered_commands(engine)
     compute_eng.run_uncompute()
     drop_engine_after(engine)
@@ -393,3 +393,29 @@ def test_only_single_error_in_costum_uncompute():
     with pytest.raises(RuntimeError):
         with _compute.CustomUncompute(eng):
             raise RuntimeError
+
+
+@pytest.mark.parametrize(
+    "main_engine_kwargs",
+    [{'batch_size': 64}, {'pipeline_size': 1}, {'pipeline_size': 4}, {'batch_size': 8, 'pipeline_size': 4}],
+)
+def test_compute_uncompute_buffering_main_engine(main_engine_kwargs):
+    def run(**kwargs):
+        backend = DummyEngine(save_commands=True)
+        eng = MainEngine(backend=backend, engine_list=[DummyEngine()], **kwargs)
+        qureg = eng.allocate_qureg(2)
+        with _compute.Compute(eng):
+            Rx(0.5) | qureg[0]
+            ancilla = eng.allocate_qubit()
+            H | ancilla
+        Ry(0.2) | qureg[1]
+        _compute.Uncompute(eng)
+        with _compute.Compute(eng):
+            H | qureg[1]
+        Rx(0.4) | qureg[0]
+        with _compute.CustomUncompute(eng):
+            H | qureg[1]
+        eng.flush()
+        return [str(cmd) for cmd in backend.received_commands]
+
+    assert run(**main_engine_kwargs) == run()
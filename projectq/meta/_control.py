@@ -113,12 +113,12 @@ class ControlEngine(BasicEngine):
     def _handle_command(self, cmd):
         if not _has_compute_uncompute_tag(cmd) and not isinstance(cmd.gate, ClassicalInstructionGate):
             cmd.add_control_qubits(self._qubits, self._state)
-        self.send([cmd])
 
     def receive(self, command_list):
         """Receive a list of commands."""
         for cmd in command_list:
             self._handle_command(cmd)
+        self.send(command_list)
 
 
 class Control:
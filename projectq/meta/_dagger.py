@@ -25,7 +25,7 @@ from projectq.cengines import BasicEngine
 from projectq.ops import Allocate, Deallocate
 
 from ._exceptions import QubitManagementError
-from ._util import drop_engine_after, insert_engine
+from ._util import drop_engine_after, insert_engine, send_buffered_commands
 
 
 class DaggerEngine(BasicEngine):
@@ -134,6 +134,8 @@ class Dagger:
         # so don't check and raise an additional error.
         if exc_type is not None:
             return
+        # the dagger engine has to receive all the commands of the section before running
+        send_buffered_commands(self.engine)
         # run dagger engine
         self._dagger_eng.run()
         self._dagger_eng = None
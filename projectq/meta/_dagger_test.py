@@ -67,3 +67,23 @@ def test_dagger_raises_only_single_error():
         with _dagger.Dagger(eng):
             ancilla = eng.allocate_qubit()  # noqa: F841
             raise RuntimeError
+
+
+@pytest.mark.parametrize(
+    "main_engine_kwargs",
+    [{'batch_size': 64}, {'pipeline_size': 1}, {'pipeline_size': 4}, {'batch_size': 8, 'pipeline_size': 4}],
+)
+def test_dagger_buffering_main_engine(main_engine_kwargs):
+    def run(**kwargs):
+        backend = DummyEngine(save_commands=True)
+        eng = MainEngine(backend=backend, engine_list=[DummyEngine()], **kwargs)
+        qureg = eng.allocate_qureg(2)
+        H | qureg[0]
+        with _dagger.Dagger(eng):
+            Rx(0.3) | qureg[0]
+            H | qureg[1]
+        X | qureg[1]
+        eng.flush()
+        return [str(cmd) for cmd in backend.received_commands]
+
+    assert run(**main_engine_kwargs) == run()
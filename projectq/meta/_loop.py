@@ -28,7 +28,7 @@ from projectq.cengines import BasicEngine
 from projectq.ops import Allocate, Deallocate
 
 from ._exceptions import QubitManagementError
-from ._util import drop_engine_after, insert_engine
+from ._util import drop_engine_after, insert_engine, send_buffered_commands
 
 
 class LoopTag:  # pylint: disable=too-few-public-methods
@@ -249,6 +249,8 @@ class Loop:
     def __exit__(self, exc_type, exc_value, exc_traceback):
         """Context manager exit function."""
         if self.num != 1:
+            # the loop engine has to receive all the commands of the loop body before running
+            send_buffered_commands(self.engine)
             # remove loop handler from engine list (i.e. skip it)
             self._loop_eng.run()
             self._loop_eng = None
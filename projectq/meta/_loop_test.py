@@ -249,3 +249,23 @@ def test_qubit_management_error_when_loop_tag_supported():
     with pytest.raises(_loop.QubitManagementError):
         with _loop.Loop(eng, 3):
             ancilla = eng.allocate_qubit()  # noqa: F841
+
+
+@pytest.mark.parametrize(
+    "main_engine_kwargs",
+    [{'batch_size': 64}, {'pipeline_size': 1}, {'pipeline_size': 4}, {'batch_size': 8, 'pipeline_size': 4}],
+)
+def test_loop_buffering_main_engine(main_engine_kwargs):
+    def run(**kwargs):
+        backend = DummyEngine(save_commands=True)
+        eng = MainEngine(backend=backend, engine_list=[DummyEngine()], **kwargs)
+        qureg = eng.allocate_qureg(2)
+        H | qureg[0]
+        with _loop.Loop(eng, 3):
+            X | qureg[0]
+            H | qureg[1]
+        H | qureg[1]
+        eng.flush()
+        return [str(cmd) for cmd in backend.received_commands]
+
+    assert run(**main_engine_kwargs) == run()
@@ -14,6 +14,35 @@
 
 """Tools to add/remove compiler engines to the MainEngine list."""
 
+from projectq.cengines import BasicEngine
+
+
+def _invalidate_capabilities(main_engine, engine):
+    """
+    Clear the capability cache of the MainEngine if an engine may change the capabilities of the engine list.
+
+    Engines which only forward is_available to the next engine and do not handle any meta tags leave the capabilities
+    unchanged, which avoids clearing the cache for every meta engine (e.g. `with Control(...)`).
+    """
+    if main_engine is None:
+        return
+    if type(engine).is_available is not BasicEngine.is_available or hasattr(engine, 'is_meta_tag_handler'):
+        main_engine.clear_capability_cache()
+
+
+def send_buffered_commands(engine):
+    """
+    Send the commands buffered by the MainEngine of an engine on to the compiler engines.
+
+    Meta engines (e.g., the DaggerEngine) have to call this before they process the commands they received, as the
+    MainEngine may buffer commands (batch_size > 1) or queue them for a worker thread (pipeline_size > 0).
+
+    Args:
+        engine (projectq.cengines.BasicEngine): Engine whose MainEngine buffers the commands.
+    """
+    if engine.main_engine is not None:
+        engine.main_engine.send_buffered_commands()
+
 
 def insert_engine(prev_engine, engine_to_insert):
     """
@@ -25,6 +54,8 @@ def insert_engine(prev_engine, engine_to_insert):
         prev_engine (projectq.cengines.BasicEngine): The engine just before the insertion point.
         engine_to_insert (projectq.cengines.BasicEngine): The engine to insert at the insertion point.
     """
+    # Commands buffered by the MainEngine were issued before the engine list changed
+    send_buffered_commands(prev_engine)
     if prev_engine.main_engine is not None:
         prev_engine.main_engine.n_engines += 1
 
@@ -34,6 +65,7 @@ def insert_engine(prev_engine, engine_to_insert):
     engine_to_insert.main_engine = prev_engine.main_engine
     engine_to_insert.next_engine = prev_engine.next_engine
     prev_engine.next_engine = engine_to_insert
+    _invalidate_capabilities(prev_engine.main_engine, engine_to_insert)
 
 
 def drop_engine_after(prev_engine):
@@ -46,10 +78,12 @@ def drop_engine_after(prev_engine):
     Returns:
         Engine: The dropped engine.
     """
+    send_buffered_commands(prev_engine)
     dropped_engine = prev_engine.next_engine
     prev_engine.next_engine = dropped_engine.next_engine
     if prev_engine.main_engine is not None:
         prev_engine.main_engine.n_engines -= 1
+    _invalidate_capabilities(prev_engine.main_engine, dropped_engine)
     dropped_engine.next_engine = None
     dropped_engine.main_engine = None
     return dropped_engine
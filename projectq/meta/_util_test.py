@@ -15,7 +15,7 @@
 import pytest
 
 from projectq import MainEngine
-from projectq.cengines import DummyEngine
+from projectq.cengines import CommandModifier, DummyEngine, InstructionFilter
 
 from . import _util
 
@@ -53,6 +53,22 @@ def test_insert_then_drop():
     assert eng.n_engines == 2
 
 
+def test_insert_and_drop_invalidate_capabilities():
+    backend = DummyEngine()
+    eng = MainEngine(backend=backend, engine_list=[], cache_capabilities=True)
+    config = eng._capability_config
+
+    _util.insert_engine(eng, CommandModifier(lambda cmd: cmd))
+    _util.drop_engine_after(eng)
+    assert eng._capability_config is config
+
+    _util.insert_engine(eng, InstructionFilter(lambda self, cmd: False))
+    assert eng._capability_config is not config
+    config = eng._capability_config
+    _util.drop_engine_after(eng)
+    assert eng._capability_config is not config
+
+
 def test_too_many_engines():
     N = 10
 
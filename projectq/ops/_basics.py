@@ -255,10 +255,12 @@ class MatrixGate(BasicGate):
         Initialize a MatrixGate object.
 
         Args:
-            matrix(numpy.matrix): matrix which defines the gate. Default: None
+            matrix(numpy.ndarray): matrix which defines the gate. Default: None
         """
         super().__init__()
-        self._matrix = np.matrix(matrix) if matrix is not None else None
+        self._matrix = None
+        if matrix is not None:
+            self.matrix = matrix
 
     @property
     def matrix(self):
@@ -267,8 +269,9 @@ class MatrixGate(BasicGate):
 
     @matrix.setter
     def matrix(self, matrix):
-        """Set the matrix property of this gate."""
-        self._matrix = np.matrix(matrix)
+        """Set the matrix property of this gate (stored as a read-only copy)."""
+        self._matrix = np.array(matrix, ndmin=2)
+        self._matrix.flags.writeable = False
 
     def __eq__(self, other):
         """
@@ -279,8 +282,8 @@ class MatrixGate(BasicGate):
         """
         if not hasattr(other, 'matrix'):
             return False
-        if not isinstance(self.matrix, np.matrix) or not isinstance(other.matrix, np.matrix):
-            raise TypeError("One of the gates doesn't have the correct type (numpy.matrix) for the matrix attribute.")
+        if not isinstance(self.matrix, np.ndarray) or not isinstance(other.matrix, np.ndarray):
+            raise TypeError("One of the gates doesn't have the correct type (numpy.ndarray) for the matrix attribute.")
         if self.matrix.shape == other.matrix.shape and np.allclose(
             self.matrix, other.matrix, rtol=RTOL, atol=ATOL, equal_nan=False
         ):
@@ -622,3 +625,17 @@ class BasicMathGate(BasicGate):
             an example).
         """
         return self._math_function
+
+
+def _has_value_equality(gate):
+    """
+    Return True if two gates comparing equal to each other are guaranteed to be the same operation.
+
+    BasicGate.__eq__ only compares the classes of the gates, which is only sufficient for gates without any attribute
+    of their own (e.g., H or X). Other gates need to define their own __eq__ (e.g., rotation gates), and gates
+    wrapping another gate (e.g., daggered gates) additionally require the wrapped gate to fulfill this condition.
+    """
+    if type(gate).__eq__ is BasicGate.__eq__:
+        return set(vars(gate)) <= {'interchangeable_qubit_indices'}
+    wrapped_gate = getattr(gate, '_gate', None)
+    return not isinstance(wrapped_gate, BasicGate) or _has_value_equality(wrapped_gate)
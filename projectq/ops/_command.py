@@ -68,6 +68,19 @@ def apply_command(cmd):
     engine.receive([cmd])
 
 
+def _get_canonical_ctrl_state(state, num_qubits):
+    """Return the canonical form of a control state (see projectq.meta.canonical_ctrl_state)."""
+    if state is CtrlAll.One:
+        return '1' * num_qubits
+
+    # NB: avoid circular imports
+    from projectq.meta import (  # pylint: disable=import-outside-toplevel
+        canonical_ctrl_state,
+    )
+
+    return canonical_ctrl_state(state, num_qubits)
+
+
 class Command:  # pylint: disable=too-many-instance-attributes
     """
     Class used as a container to store commands.
@@ -89,6 +102,8 @@ class Command:  # pylint: disable=too-many-instance-attributes
         all_qubits: A tuple of control_qubits + qubits
     """
 
+    __slots__ = ('gate', 'tags', '_qubits', '_control_qubits', '_control_state', '_engine')
+
     def __init__(
         self, engine, gate, qubits, controls=(), tags=(), control_state=CtrlAll.One
     ):  # pylint: disable=too-many-arguments
@@ -108,14 +123,15 @@ class Command:  # pylint: disable=too-many-instance-attributes
             tags (list[object]): Tags associated with the command.
             control_state(int,str,projectq.meta.CtrlAll) Control state for any control qubits
         """
-        qubits = tuple([WeakQubitRef(qubit.engine, qubit.id) for qubit in qreg] for qreg in qubits)
-
         self.gate = gate
         self.tags = list(tags)
-        self.qubits = qubits  # property
-        self.control_qubits = controls  # property
-        self.engine = engine  # property
-        self.control_state = control_state  # property
+        # All qubits are copied into WeakQubitRefs owned by the engine of the command (see the engine property)
+        self._engine = engine
+        self._qubits = self._order_qubits(tuple([WeakQubitRef(engine, qubit.id) for qubit in qreg] for qreg in qubits))
+        self._control_qubits = [WeakQubitRef(engine, qubit.id) for qubit in controls]
+        if len(self._control_qubits) > 1:
+            self._control_qubits.sort(key=lambda x: x.id)
+        self._control_state = _get_canonical_ctrl_state(control_state, len(self._control_qubits))
 
     @property
     def qubits(self):
@@ -129,13 +145,16 @@ class Command:  # pylint: disable=too-many-instance-attributes
 
     def __deepcopy__(self, memo):
         """Deepcopy implementation. Engine should stay a reference."""
-        return Command(
-            self.engine,
-            deepcopy(self.gate),
-            self.qubits,
-            list(self.control_qubits),
-            deepcopy(self.tags),
-        )
+        # The qubits of a command are already in canonical order, only copy them
+        engine = self._engine
+        cmd = Command.__new__(Command)
+        cmd.gate = deepcopy(self.gate)
+        cmd.tags = deepcopy(self.tags)
+        cmd._engine = engine
+        cmd._qubits = tuple([WeakQubitRef(engine, qubit.id) for qubit in qreg] for qreg in self._qubits)
+        cmd._control_qubits = [WeakQubitRef(engine, qubit.id) for qubit in self._control_qubits]
+        cmd._control_state = self._control_state
+        return cmd
 
     def get_inverse(self):
         """
@@ -192,9 +211,11 @@ class Command:  # pylint: disable=too-many-instance-attributes
 
         Returns: Ordered tuple of quantum registers
         """
-        ordered_qubits = list(qubits)
         # e.g. [[0,4],[1,2,3]]
         interchangeable_qubit_indices = self.interchangeable_qubit_indices
+        if not interchangeable_qubit_indices:
+            return tuple(qubits)
+        ordered_qubits = list(qubits)
         for old_positions in interchangeable_qubit_indices:
             new_positions = sorted(old_positions, key=lambda x: ordered_qubits[x][0].id)
             qubits_new_order = [ordered_qubits[i] for i in new_positions]
@@ -244,12 +265,7 @@ class Command:  # pylint: disable=too-many-instance-attributes
         Args:
             state (int,str,projectq.meta.CtrtAll): state of control qubit (ie. positive or negative)
         """
-        # NB: avoid circular imports
-        from projectq.meta import (  # pylint: disable=import-outside-toplevel
-            canonical_ctrl_state,
-        )
-
-        self._control_state = canonical_ctrl_state(state, len(self._control_qubits))
+        self._control_state = _get_canonical_ctrl_state(state, len(self._control_qubits))
 
     def add_control_qubits(self, qubits, state=CtrlAll.One):
         """
@@ -264,15 +280,10 @@ class Command:  # pylint: disable=too-many-instance-attributes
             state (int,str,CtrlAll): Control state (ie. positive or negative) for the qubits being added as
                 control qubits.
         """
-        # NB: avoid circular imports
-        from projectq.meta import (  # pylint: disable=import-outside-toplevel
-            canonical_ctrl_state,
-        )
-
         if not isinstance(qubits, list):
             raise ValueError('Control qubits must be a list of qubits!')
         self._control_qubits.extend([WeakQubitRef(qubit.engine, qubit.id) for qubit in qubits])
-        self._control_state += canonical_ctrl_state(state, len(qubits))
+        self._control_state += _get_canonical_ctrl_state(state, len(qubits))
 
         zipped = sorted(zip(self._control_qubits, self._control_state), key=lambda x: x[0].id)
         unzipped_qubit, unzipped_state = zip(*zipped)
@@ -85,6 +85,16 @@ def test_command_deepcopy(main_engine):
     assert copied_cmd.gate == gate
 
 
+def test_command_deepcopy_control_state(main_engine):
+    qureg0 = Qureg([Qubit(main_engine, 0)])
+    qureg1 = Qureg([Qubit(main_engine, 1), Qubit(main_engine, 2)])
+    cmd = _command.Command(main_engine, BasicGate(), (qureg0,), controls=qureg1, control_state='01')
+    copied_cmd = deepcopy(cmd)
+    assert copied_cmd.control_state == '01'
+    assert [qubit.id for qubit in copied_cmd.control_qubits] == [1, 2]
+    assert not hasattr(copied_cmd, '__dict__')
+
+
 def test_command_get_inverse(main_engine):
     qubit = main_engine.allocate_qubit()
     ctrl_qubit = main_engine.allocate_qubit()
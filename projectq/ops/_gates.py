@@ -59,9 +59,35 @@ from ._command import apply_command
 from ._metagates import get_inverse
 
 
+def _read_only_matrix(matrix):
+    """Return a read-only complex array of a gate matrix (shared between all users of the gate)."""
+    matrix = np.array(matrix, dtype=complex)
+    matrix.flags.writeable = False
+    return matrix
+
+
+def _get_cached_matrix(gate, compute_matrix):
+    """
+    Return the matrix of a parametrized gate.
+
+    The matrix is computed on first access and recomputed only if the angle of the gate changed.
+
+    Args:
+        gate (BasicRotationGate|BasicPhaseGate): Gate for which to return the matrix
+        compute_matrix (function): Function returning the matrix of the gate for a given angle
+    """
+    cache = gate.__dict__.get('_matrix_cache')
+    if cache is None or cache[0] != gate.angle:
+        cache = (gate.angle, _read_only_matrix(compute_matrix(gate.angle)))
+        gate._matrix_cache = cache  # pylint: disable=protected-access
+    return cache[1]
+
+
 class HGate(SelfInverseGate):
     """Hadamard gate class."""
 
+    _MATRIX = _read_only_matrix(1.0 / cmath.sqrt(2.0) * np.array([[1, 1], [1, -1]]))
+
     def __str__(self):
         """Return a string representation of the object."""
         return "H"
@@ -69,7 +95,7 @@ class HGate(SelfInverseGate):
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return 1.0 / cmath.sqrt(2.0) * np.matrix([[1, 1], [1, -1]])
+        return self._MATRIX
 
 
 #: Shortcut (instance of) :class:`projectq.ops.HGate`
@@ -79,6 +105,8 @@ H = HGate()
 class XGate(SelfInverseGate):
     """Pauli-X gate class."""
 
+    _MATRIX = _read_only_matrix([[0, 1], [1, 0]])
+
     def __str__(self):
         """Return a string representation of the object."""
         return "X"
@@ -86,7 +114,7 @@ class XGate(SelfInverseGate):
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix([[0, 1], [1, 0]])
+        return self._MATRIX
 
 
 #: Shortcut (instance of) :class:`projectq.ops.XGate`
@@ -96,6 +124,8 @@ X = NOT = XGate()
 class YGate(SelfInverseGate):
     """Pauli-Y gate class."""
 
+    _MATRIX = _read_only_matrix([[0, -1j], [1j, 0]])
+
     def __str__(self):
         """Return a string representation of the object."""
         return "Y"
@@ -103,7 +133,7 @@ class YGate(SelfInverseGate):
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix([[0, -1j], [1j, 0]])
+        return self._MATRIX
 
 
 #: Shortcut (instance of) :class:`projectq.ops.YGate`
@@ -113,6 +143,8 @@ Y = YGate()
 class ZGate(SelfInverseGate):
     """Pauli-Z gate class."""
 
+    _MATRIX = _read_only_matrix([[1, 0], [0, -1]])
+
     def __str__(self):
         """Return a string representation of the object."""
         return "Z"
@@ -120,7 +152,7 @@ class ZGate(SelfInverseGate):
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix([[1, 0], [0, -1]])
+        return self._MATRIX
 
 
 #: Shortcut (instance of) :class:`projectq.ops.ZGate`
@@ -130,10 +162,12 @@ Z = ZGate()
 class SGate(BasicGate):
     """S gate class."""
 
+    _MATRIX = _read_only_matrix([[1, 0], [0, 1j]])
+
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix([[1, 0], [0, 1j]])
+        return self._MATRIX
 
     def __str__(self):
         """Return a string representation of the object."""
@@ -149,10 +183,12 @@ Sdag = Sdagger = get_inverse(S)
 class TGate(BasicGate):
     """T gate class."""
 
+    _MATRIX = _read_only_matrix([[1, 0], [0, cmath.exp(1j * cmath.pi / 4)]])
+
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix([[1, 0], [0, cmath.exp(1j * cmath.pi / 4)]])
+        return self._MATRIX
 
     def __str__(self):
         """Return a string representation of the object."""
@@ -168,10 +204,12 @@ Tdag = Tdagger = get_inverse(T)
 class SqrtXGate(BasicGate):
     """Square-root X gate class."""
 
+    _MATRIX = _read_only_matrix(0.5 * np.array([[1 + 1j, 1 - 1j], [1 - 1j, 1 + 1j]]))
+
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return 0.5 * np.matrix([[1 + 1j, 1 - 1j], [1 - 1j, 1 + 1j]])
+        return self._MATRIX
 
     def tex_str(self):
         """Return the Latex string representation of a SqrtXGate."""
@@ -189,6 +227,13 @@ SqrtX = SqrtXGate()
 class SwapGate(SelfInverseGate):
     """Swap gate class (swaps 2 qubits)."""
 
+    # fmt: off
+    _MATRIX = _read_only_matrix([[1, 0, 0, 0],
+                                 [0, 0, 1, 0],
+                                 [0, 1, 0, 0],
+                                 [0, 0, 0, 1]])
+    # fmt: on
+
     def __init__(self):
         """Initialize a Swap gate."""
         super().__init__()
@@ -201,12 +246,7 @@ class SwapGate(SelfInverseGate):
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        # fmt: off
-        return np.matrix([[1, 0, 0, 0],
-                          [0, 0, 1, 0],
-                          [0, 1, 0, 0],
-                          [0, 0, 0, 1]])
-        # fmt: on
+        return self._MATRIX
 
 
 #: Shortcut (instance of) :class:`projectq.ops.SwapGate`
@@ -216,6 +256,15 @@ Swap = SwapGate()
 class SqrtSwapGate(BasicGate):
     """Square-root Swap gate class."""
 
+    _MATRIX = _read_only_matrix(
+        [
+            [1, 0, 0, 0],
+            [0, 0.5 + 0.5j, 0.5 - 0.5j, 0],
+            [0, 0.5 - 0.5j, 0.5 + 0.5j, 0],
+            [0, 0, 0, 1],
+        ]
+    )
+
     def __init__(self):
         """Initialize a SqrtSwap gate."""
         super().__init__()
@@ -228,14 +277,7 @@ class SqrtSwapGate(BasicGate):
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix(
-            [
-                [1, 0, 0, 0],
-                [0, 0.5 + 0.5j, 0.5 - 0.5j, 0],
-                [0, 0.5 - 0.5j, 0.5 + 0.5j, 0],
-                [0, 0, 0, 1],
-            ]
-        )
+        return self._MATRIX
 
 
 #: Shortcut (instance of) :class:`projectq.ops.SqrtSwapGate`
@@ -261,109 +303,137 @@ Entangle = EntangleGate()
 class Ph(BasicPhaseGate):
     """Phase gate (global phase)."""
 
+    @staticmethod
+    def _compute_matrix(angle):
+        """Return the matrix of the gate for a given angle."""
+        return [[cmath.exp(1j * angle), 0], [0, cmath.exp(1j * angle)]]
+
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix([[cmath.exp(1j * self.angle), 0], [0, cmath.exp(1j * self.angle)]])
+        return _get_cached_matrix(self, self._compute_matrix)
 
 
 class Rx(BasicRotationGate):
     """RotationX gate class."""
 
+    @staticmethod
+    def _compute_matrix(angle):
+        """Return the matrix of the gate for a given angle."""
+        return [
+            [math.cos(0.5 * angle), -1j * math.sin(0.5 * angle)],
+            [-1j * math.sin(0.5 * angle), math.cos(0.5 * angle)],
+        ]
+
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix(
-            [
-                [math.cos(0.5 * self.angle), -1j * math.sin(0.5 * self.angle)],
-                [-1j * math.sin(0.5 * self.angle), math.cos(0.5 * self.angle)],
-            ]
-        )
+        return _get_cached_matrix(self, self._compute_matrix)
 
 
 class Ry(BasicRotationGate):
     """RotationY gate class."""
 
+    @staticmethod
+    def _compute_matrix(angle):
+        """Return the matrix of the gate for a given angle."""
+        return [
+            [math.cos(0.5 * angle), -math.sin(0.5 * angle)],
+            [math.sin(0.5 * angle), math.cos(0.5 * angle)],
+        ]
+
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix(
-            [
-                [math.cos(0.5 * self.angle), -math.sin(0.5 * self.angle)],
-                [math.sin(0.5 * self.angle), math.cos(0.5 * self.angle)],
-            ]
-        )
+        return _get_cached_matrix(self, self._compute_matrix)
 
 
 class Rz(BasicRotationGate):
     """RotationZ gate class."""
 
+    @staticmethod
+    def _compute_matrix(angle):
+        """Return the matrix of the gate for a given angle."""
+        return [
+            [cmath.exp(-0.5 * 1j * angle), 0],
+            [0, cmath.exp(0.5 * 1j * angle)],
+        ]
+
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix(
-            [
-                [cmath.exp(-0.5 * 1j * self.angle), 0],
-                [0, cmath.exp(0.5 * 1j * self.angle)],
-            ]
-        )
+        return _get_cached_matrix(self, self._compute_matrix)
 
 
 class Rxx(BasicRotationGate):
     """RotationXX gate class."""
 
+    @staticmethod
+    def _compute_matrix(angle):
+        """Return the matrix of the gate for a given angle."""
+        return [
+            [cmath.cos(0.5 * angle), 0, 0, -1j * cmath.sin(0.5 * angle)],
+            [0, cmath.cos(0.5 * angle), -1j * cmath.sin(0.5 * angle), 0],
+            [0, -1j * cmath.sin(0.5 * angle), cmath.cos(0.5 * angle), 0],
+            [-1j * cmath.sin(0.5 * angle), 0, 0, cmath.cos(0.5 * angle)],
+        ]
+
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix(
-            [
-                [cmath.cos(0.5 * self.angle), 0, 0, -1j * cmath.sin(0.5 * self.angle)],
-                [0, cmath.cos(0.5 * self.angle), -1j * cmath.sin(0.5 * self.angle), 0],
-                [0, -1j * cmath.sin(0.5 * self.angle), cmath.cos(0.5 * self.angle), 0],
-                [-1j * cmath.sin(0.5 * self.angle), 0, 0, cmath.cos(0.5 * self.angle)],
-            ]
-        )
+        return _get_cached_matrix(self, self._compute_matrix)
 
 
 class Ryy(BasicRotationGate):
     """RotationYY gate class."""
 
+    @staticmethod
+    def _compute_matrix(angle):
+        """Return the matrix of the gate for a given angle."""
+        return [
+            [cmath.cos(0.5 * angle), 0, 0, 1j * cmath.sin(0.5 * angle)],
+            [0, cmath.cos(0.5 * angle), -1j * cmath.sin(0.5 * angle), 0],
+            [0, -1j * cmath.sin(0.5 * angle), cmath.cos(0.5 * angle), 0],
+            [1j * cmath.sin(0.5 * angle), 0, 0, cmath.cos(0.5 * angle)],
+        ]
+
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix(
-            [
-                [cmath.cos(0.5 * self.angle), 0, 0, 1j * cmath.sin(0.5 * self.angle)],
-                [0, cmath.cos(0.5 * self.angle), -1j * cmath.sin(0.5 * self.angle), 0],
-                [0, -1j * cmath.sin(0.5 * self.angle), cmath.cos(0.5 * self.angle), 0],
-                [1j * cmath.sin(0.5 * self.angle), 0, 0, cmath.cos(0.5 * self.angle)],
-            ]
-        )
+        return _get_cached_matrix(self, self._compute_matrix)
 
 
 class Rzz(BasicRotationGate):
     """RotationZZ gate class."""
 
+    @staticmethod
+    def _compute_matrix(angle):
+        """Return the matrix of the gate for a given angle."""
+        return [
+            [cmath.exp(-0.5 * 1j * angle), 0, 0, 0],
+            [0, cmath.exp(0.5 * 1j * angle), 0, 0],
+            [0, 0, cmath.exp(0.5 * 1j * angle), 0],
+            [0, 0, 0, cmath.exp(-0.5 * 1j * angle)],
+        ]
+
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix(
-            [
-                [cmath.exp(-0.5 * 1j * self.angle), 0, 0, 0],
-                [0, cmath.exp(0.5 * 1j * self.angle), 0, 0],
-                [0, 0, cmath.exp(0.5 * 1j * self.angle), 0],
-                [0, 0, 0, cmath.exp(-0.5 * 1j * self.angle)],
-            ]
-        )
+        return _get_cached_matrix(self, self._compute_matrix)
 
 
 class R(BasicPhaseGate):
     """Phase-shift gate (equivalent to Rz up to a global phase)."""
 
+    @staticmethod
+    def _compute_matrix(angle):
+        """Return the matrix of the gate for a given angle."""
+        return [[1, 0], [0, cmath.exp(1j * angle)]]
+
     @property
     def matrix(self):
         """Access to the matrix property of this gate."""
-        return np.matrix([[1, 0], [0, cmath.exp(1j * self.angle)]])
+        return _get_cached_matrix(self, self._compute_matrix)
 
 
 class FlushGate(FastForwardingGate):
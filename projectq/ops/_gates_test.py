@@ -78,7 +78,7 @@ def test_sqrtx_gate():
     gate = _gates.SqrtXGate()
     assert str(gate) == "SqrtX"
     assert np.array_equal(gate.matrix, np.matrix([[0.5 + 0.5j, 0.5 - 0.5j], [0.5 - 0.5j, 0.5 + 0.5j]]))
-    assert np.array_equal(gate.matrix * gate.matrix, np.matrix([[0j, 1], [1, 0]]))
+    assert np.array_equal(gate.matrix @ gate.matrix, np.matrix([[0j, 1], [1, 0]]))
     assert isinstance(_gates.SqrtX, _gates.SqrtXGate)
 
 
@@ -95,7 +95,7 @@ def test_sqrtswap_gate():
     sqrt_gate = _gates.SqrtSwapGate()
     swap_gate = _gates.SwapGate()
     assert str(sqrt_gate) == "SqrtSwap"
-    assert np.array_equal(sqrt_gate.matrix * sqrt_gate.matrix, swap_gate.matrix)
+    assert np.array_equal(sqrt_gate.matrix @ sqrt_gate.matrix, swap_gate.matrix)
     assert np.array_equal(
         sqrt_gate.matrix,
         np.matrix(
@@ -195,6 +195,22 @@ def test_rzz(angle):
     assert np.allclose(gate.matrix, expected_matrix)
 
 
+def test_gate_matrices_are_cached_and_read_only():
+    assert _gates.H.matrix is _gates.HGate().matrix
+    assert not _gates.X.matrix.flags.writeable
+    with pytest.raises(ValueError):
+        _gates.X.matrix[0, 0] = 1
+
+    gate = _gates.Rx(0.5)
+    matrix = gate.matrix
+    assert gate.matrix is matrix
+    assert not matrix.flags.writeable
+    gate.angle = 1.0
+    assert np.allclose(gate.matrix, _gates.Rx(1.0).matrix)
+    assert not np.allclose(gate.matrix, matrix)
+    assert np.allclose(get_inverse(_gates.T).matrix, np.conj(_gates.T.matrix).T)
+
+
 @pytest.mark.parametrize("angle", [0, 0.2, 2.1, 4.1, 2 * math.pi])
 def test_ph(angle):
     gate = _gates.Ph(angle)
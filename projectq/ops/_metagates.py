@@ -28,6 +28,8 @@ As well as the meta functions
 * C (Creates an n-ary controlled version of an arbitrary gate)
 """
 
+import numpy as np
+
 from ._basics import BasicGate, NotInvertible
 
 
@@ -68,9 +70,12 @@ class DaggeredGate(BasicGate):
 
         try:
             # Hermitian conjugate is inverse matrix
-            self.matrix = gate.matrix.getH()
+            matrix = np.conj(gate.matrix).T
         except AttributeError:
             pass
+        else:
+            matrix.flags.writeable = False
+            self.matrix = matrix
 
     def __str__(self):
         r"""Return string representation (str(gate) + \"^\dagger\")."""
@@ -123,6 +123,7 @@ def test_weak_qubit_ref():
     qubit = _qubit.WeakQubitRef("Engine without deallocate_qubit()", 0)
     with pytest.raises(AttributeError):
         qubit.__del__()
+    assert not hasattr(qubit, '__dict__')
 
 
 def test_qureg_str():